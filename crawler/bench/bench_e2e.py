@@ -0,0 +1,237 @@
+"""
+End-to-end throughput benchmark against local stand-ins (see standins.py).
+
+    python bench/bench_e2e.py                                  # all scenarios, 50 listing items
+    python bench/bench_e2e.py --scenarios aigc_cn --items 200 --llm-latency 1.5
+    python bench/bench_e2e.py --json bench-result.json         # machine-readable, e.g. for CI
+
+Runs the real crawler entry points (run_aigc_cn, crawl_news, crawl_github_trending,
+crawl_producthunt_ai, run_enrichment_cycle, run_health_sweep) with every external endpoint pointed at
+the stand-in server. State (dedup index, caches, journal) lives in a fresh temp dir,
+so results do not depend on previous runs. Reports items/sec, p50/p95 per pipeline
+stage and per LLM call, and peak RSS.
+
+Needs the crawler's own requirements (boto3, openai, ...). Screenshots are served
+from a stub PNG unless --browser is given, which uses real Playwright on the
+stand-in homepages.
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import Future
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from standins import StandinServer, StubS3, FakeDDGS, tiny_png  # noqa: E402
+
+SCENARIOS = ["aigc_cn", "news", "github", "producthunt", "enrichment", "health"]
+
+
+def _percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def _peak_rss_mb() -> tuple[float, float]:
+    # Linux 上 ru_maxrss 以 KB 计, macOS 以字节计
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return round(own / scale, 1), round(children / scale, 1)
+
+
+def configure_env(server: StandinServer, state_dir: str, args):
+    """Points every crawler endpoint at the stand-ins. Must run before the crawler modules are imported."""
+    env_file = os.path.join(state_dir, "bench.env")
+    open(env_file, "w").close()
+    base = server.base
+    os.environ.update(
+        {
+            "CRAWLER_ENV_FILE": env_file,
+            "CRAWLER_STATE_DIR": state_dir,
+            "CRAWLER_API_URL": f"{base}/api/admin/tools/inject",
+            "API_SECRET_KEY": "bench",
+            "ENRICH_API_URL": f"{base}/api/admin/tools/enrich",
+            "R2_ENDPOINT_URL": "http://127.0.0.1:9",
+            "R2_ACCESS_KEY_ID": "bench",
+            "R2_SECRET_ACCESS_KEY": "bench",
+            "R2_BUCKET_NAME": "bench",
+            "R2_REGION": "auto",
+            "R2_PUBLIC_URL": "https://cdn.bench.local",
+            "DEEPSEEK_API_KEY": "bench",
+            "DEEPSEEK_BASE_URL": f"{base}/v1",
+            "LLM_RPM": str(args.rpm),
+            "LLM_TPM": str(args.tpm),
+            "LLM_CACHE_ENABLED": "0",
+            "AIGC_CN_URL": f"{base}/aigc/",
+            "NEWS_RSS_FEEDS": ",".join(f"{base}/rss/feed{i}.xml" for i in range(4)),
+            "GITHUB_API_URL": f"{base}/github/search",
+            "PH_FEED_URL": f"{base}/rss/producthunt.xml",
+        }
+    )
+
+
+def run_scenario(name, server, s3, crawlers):
+    before = server.snapshot()
+    s3_before = dict(s3.calls)
+    captured = {}
+
+    main = crawlers["main"]
+    build = main.build_ingest_pipeline
+
+    def _capturing_build():
+        pipe = build()
+        captured["pipeline"] = pipe
+        return pipe
+
+    main.build_ingest_pipeline = _capturing_build
+    wall_started = time.time()
+    started = time.monotonic()
+    try:
+        if name == "aigc_cn":
+            main.run_aigc_cn()
+        elif name == "news":
+            crawlers["news"].crawl_news()
+        elif name == "github":
+            crawlers["github"].crawl_github_trending()
+        elif name == "producthunt":
+            crawlers["ph"].crawl_producthunt_ai()
+        elif name == "enrichment":
+            crawlers["enrichment"].run_enrichment_cycle(limit=crawlers["enrich_limit"])
+        elif name == "health":
+            crawlers["health"].run_health_sweep()
+    finally:
+        main.build_ingest_pipeline = build
+    elapsed = time.monotonic() - started
+
+    after = server.snapshot()
+    delta = {
+        k: v - before["counters"].get(k, 0)
+        for k, v in after["counters"].items()
+        if v != before["counters"].get(k, 0)
+    }
+    llm = after["llm_durations"][len(before["llm_durations"]):]
+    if name == "health":
+        items = crawlers["metrics"].span_stats(since=wall_started).get("health.check", {}).get("count", 0)
+    else:
+        items = delta.get("injected", 0) + delta.get("patched", 0)
+    result = {
+        "scenario": name,
+        "seconds": round(elapsed, 2),
+        "items": items,
+        "items_per_sec": round(items / elapsed, 2) if elapsed else None,
+        "llm_calls": len(llm),
+        "llm_p50_s": round(statistics.median(llm), 3) if llm else None,
+        "llm_p95_s": round(_percentile(llm, 0.95), 3) if llm else None,
+        "requests": delta,
+        "s3_calls": {k: v - s3_before.get(k, 0) for k, v in s3.calls.items() if v != s3_before.get(k, 0)},
+    }
+    if "pipeline" in captured:
+        result["stages"] = captured["pipeline"].summary()["stages"]
+    result["spans"] = crawlers["metrics"].span_stats(since=wall_started)
+    return result
+
+
+def print_report(results, rss):
+    print("\n=== Crawler benchmark ===")
+    for r in results:
+        print(
+            f"{r['scenario']:<12} {r['items']:>5} items in {r['seconds']:>7.2f}s  "
+            f"{r['items_per_sec'] or 0:>7.2f} items/s  llm calls {r['llm_calls']:>4}  "
+            f"llm p50 {r['llm_p50_s'] or 0:.3f}s p95 {r['llm_p95_s'] or 0:.3f}s"
+        )
+        for stage, s in (r.get("stages") or {}).items():
+            print(
+                f"    {stage:<8} n={s['count']:<5} err={s['errors']:<3} "
+                f"p50 {s.get('p50_s', 0):.3f}s p95 {s.get('p95_s', 0):.3f}s busy {s.get('busy_s', 0):.1f}s"
+            )
+        for span, s in sorted(r.get("spans", {}).items(), key=lambda kv: -kv[1]["total_s"])[:6]:
+            print(f"    span {span:<24} n={s['count']:<5} p50 {s['p50_s']:.3f}s p95 {s['p95_s']:.3f}s total {s['total_s']:.1f}s")
+    print(f"peak RSS: {rss[0]} MB (children {rss[1]} MB)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--items", type=int, default=50, help="tools on the stand-in listing page")
+    parser.add_argument("--feed-items", type=int, default=20)
+    parser.add_argument("--enrich-limit", type=int, default=10)
+    parser.add_argument("--health-items", type=int, default=1000, help="tools in the health sweep catalog")
+    parser.add_argument("--llm-latency", type=float, default=0.8, help="seconds per fake DeepSeek call")
+    parser.add_argument("--llm-jitter", type=float, default=0.2)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="share of calls answered with 429")
+    parser.add_argument("--search-latency", type=float, default=0.3)
+    parser.add_argument("--s3-latency", type=float, default=0.0)
+    parser.add_argument("--rpm", type=int, default=100000, help="LLM_RPM for the run (real DeepSeek limits are far lower)")
+    parser.add_argument("--tpm", type=int, default=100000000)
+    parser.add_argument("--browser", action="store_true", help="take real Playwright screenshots")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+
+    with open(os.path.join(BENCH_DIR, "fixtures", "homepage.html"), encoding="utf-8") as f:
+        homepage = f.read()
+    server = StandinServer(
+        items=args.items,
+        feed_items=args.feed_items,
+        llm_latency=args.llm_latency,
+        llm_jitter=args.llm_jitter,
+        llm_error_rate=args.llm_error_rate,
+        homepage_template=homepage,
+        health_items=args.health_items,
+    ).start()
+    state_dir = tempfile.mkdtemp(prefix="crawler-bench-")
+    configure_env(server, state_dir, args)
+
+    import main as crawler_main
+    import news_crawler
+    import github_crawler
+    import ph_crawler
+    import enrichment_crawler
+    import health_sweeper
+    import screenshot_service
+    import search_service
+    from metrics import METRICS
+
+    s3 = StubS3(latency=args.s3_latency)
+    crawler_main.s3 = s3
+    if not args.browser:
+        def _stub_submit(url, full_page=False):
+            future = Future()
+            future.set_result(screenshot_service.Shot(url, tiny_png(hash(url) & 0xFFFF, 64), full_page=full_page))
+            return future
+
+        screenshot_service.submit = _stub_submit
+    FakeDDGS.latency = args.search_latency
+    search_service.DDGS = FakeDDGS
+
+    crawlers = {
+        "main": crawler_main,
+        "news": news_crawler,
+        "github": github_crawler,
+        "ph": ph_crawler,
+        "enrichment": enrichment_crawler,
+        "health": health_sweeper,
+        "enrich_limit": args.enrich_limit,
+        "metrics": METRICS,
+    }
+    results = [run_scenario(name.strip(), server, s3, crawlers) for name in args.scenarios.split(",") if name.strip()]
+    rss = _peak_rss_mb()
+    print_report(results, rss)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"results": results, "peak_rss_mb": rss[0], "children_peak_rss_mb": rss[1],
+                       "args": vars(args)}, f, indent=2, ensure_ascii=False)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
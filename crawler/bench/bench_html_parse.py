@@ -0,0 +1,89 @@
+"""
+Micro-benchmark for the html_parse backends on saved fixture pages.
+
+    python bench/bench_html_parse.py                 # every fixture, every backend
+    python bench/bench_html_parse.py --scale 200     # repeat the page body to mimic big listings
+    python bench/bench_html_parse.py --save https://www.aigc.cn/ aigc_cn_live.html
+
+Fixtures named *listing*.html are benchmarked with extract_cards, everything
+else with extract_text. Results are also checked against html.parser so a
+faster backend that extracts different records is caught.
+"""
+import argparse
+import os
+import re
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from html_parse import available_backends, extract_cards, extract_text  # noqa: E402
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def _scaled(html: str, scale: int) -> str:
+    if scale <= 1:
+        return html
+    m = re.search(r"<body[^>]*>(.*)</body>", html, re.S | re.I)
+    if not m:
+        return html * scale
+    return html[: m.start(1)] + m.group(1) * scale + html[m.end(1) :]
+
+
+def _time(fn, html, backend, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(html, backend=backend)
+        samples.append(time.perf_counter() - started)
+    return result, samples
+
+
+def run(scale: int, repeat: int):
+    backends = available_backends()
+    print(f"Backends: {', '.join(backends)} | scale={scale} repeat={repeat}")
+    for name in sorted(os.listdir(FIXTURE_DIR)):
+        if not name.endswith(".html"):
+            continue
+        with open(os.path.join(FIXTURE_DIR, name), encoding="utf-8") as f:
+            html = _scaled(f.read(), scale)
+        fn = extract_cards if "listing" in name else extract_text
+        print(f"\n{name} ({len(html) / 1024:.0f} KB, {fn.__name__})")
+
+        baseline, _ = _time(fn, html, "html.parser", 1)
+        for backend in backends:
+            result, samples = _time(fn, html, backend, repeat)
+            median = statistics.median(samples) * 1000
+            if fn is extract_cards:
+                size = f"{len(result)} cards"
+                same = result == baseline
+            else:
+                size = f"{len(result)} chars"
+                same = result.split() == baseline.split()
+            flag = "" if same else "  (differs from html.parser)"
+            print(f"  {backend:<12} median {median:8.2f} ms  min {min(samples) * 1000:8.2f} ms  {size}{flag}")
+
+
+def save(url: str, name: str):
+    import requests
+
+    r = requests.get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=30)
+    r.raise_for_status()
+    path = os.path.join(FIXTURE_DIR, name)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(r.text)
+    print(f"Saved {len(r.text)} chars to {path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save", nargs=2, metavar=("URL", "NAME"))
+    args = parser.parse_args()
+    if args.save:
+        save(*args.save)
+    else:
+        run(args.scale, args.repeat)
@@ -0,0 +1,363 @@
+"""
+Local stand-ins for everything the crawler talks to, so runs can be timed
+offline: one HTTP server plays aigc.cn, tool homepages, RSS feeds, GitHub
+search, the DeepSeek (OpenAI-compatible) API and the Next.js inject/enrich
+API; StubS3 replaces the R2 client in-process and FakeDDGS the web search.
+"""
+import json
+import random
+import re
+import struct
+import threading
+import time
+import zlib
+import hashlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+
+def tiny_png(seed: int, size: int = 16) -> bytes:
+    """A valid solid-colour PNG; different seeds give different bytes (and digests)."""
+    rng = random.Random(seed)
+    pixel = bytes(rng.randrange(256) for _ in range(3))
+    raw = b"".join(b"\x00" + pixel * size for _ in range(size))
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    header = struct.pack(">IIBBBBB", size, size, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(raw)) + chunk(b"IEND", b"")
+
+
+def listing_html(base: str, count: int) -> str:
+    """OneNav-style listing page (same markup as fixtures/aigc_cn_listing.html)."""
+    cards = []
+    for i in range(count):
+        cards.append(
+            f'<div class="url-card col-6"><div class="url-body default">'
+            f'<a href="javascript:;" data-url="{base}/site/{i}" class="card" title="Bench Tool {i}">'
+            f'<div class="url-img"><img class="lazy" src="/favicon.png" data-src="{base}/logo/{i}.png"></div>'
+            f'<div class="url-info"><strong>Bench Tool {i}</strong>'
+            f'<p class="item-desc">Bench Tool {i} 是一个用于基准测试的 AI 写作与绘画工具</p></div>'
+            f"</a></div></div>"
+        )
+    return (
+        '<!DOCTYPE html><html lang="zh-CN"><head><meta charset="UTF-8"><title>AIGC bench</title>'
+        "<script>window.__onenav = {};</script></head><body><header><nav>nav</nav></header>"
+        f'<main class="content"><div class="row">{"".join(cards)}</div></main><footer>footer</footer></body></html>'
+    )
+
+
+def homepage_html(template: str, index: int) -> str:
+    return template.replace("Acme AI", f"Bench Tool {index}")
+
+
+NEWS_TOPICS = ["video generation", "speech recognition", "code completion", "protein folding",
+               "robot planning", "image editing", "legal search", "music composition"]
+NEWS_VERBS = ["releases", "launches", "unveils", "ships"]
+
+
+def news_item(base: str, feed: str, i: int) -> tuple[str, str]:
+    """(title, link) of one feed item. Every 4th item is a story all feeds cover, worded per feed."""
+    if i % 4:
+        return f"AI model news {feed} #{i}", f"{base}/news/{feed}/{i}"
+    story = i // 4
+    verb = NEWS_VERBS[sum(map(ord, feed)) % len(NEWS_VERBS)]
+    title = f"Lab{story} {verb} Model{story} LLM for {NEWS_TOPICS[story % len(NEWS_TOPICS)]}"
+    # 偶数事件各源链接到同一篇原文, 奇数事件只有标题相近
+    link = f"{base}/news/story/{story}" if story % 2 == 0 else f"{base}/news/{feed}/{i}"
+    return title, link
+
+
+def rss_xml(base: str, feed: str, count: int) -> str:
+    items = "".join(
+        f"<item><title>{title}</title><link>{link}</link>"
+        f"<guid>{feed}-{i}</guid><description>LLM release notes number {i} for {feed}.</description></item>"
+        for i, (title, link) in ((i, news_item(base, feed, i)) for i in range(count))
+    )
+    return f'<?xml version="1.0"?><rss version="2.0"><channel><title>{feed}</title>{items}</channel></rss>'
+
+
+# 所有 LLM 提示词需要的字段的并集
+LLM_REPLY = {
+    "title_zh": "基准测试工具",
+    "title_en": "Bench Tool",
+    "summary_zh": "用于基准测试的 AI 工具",
+    "summary_en": "An AI tool used for benchmarking.",
+    "coreValue": "稳定可复现",
+    "useCases": "压测, 回归",
+    "prosCons": "优点: 快; 缺点: 假",
+    "aiScore": 7.5,
+    "content_zh": "# 基准测试\n\n" + "这是一段用于模拟长文本输出的内容。" * 40,
+    "content_en": "# Benchmark\n\n" + "This paragraph simulates a long completion. " * 40,
+    "notes": "- 基准测试要点一\n- 基准测试要点二",
+}
+
+
+class StandinServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, items: int = 50, feed_items: int = 20, llm_latency: float = 0.8,
+                 llm_jitter: float = 0.2, llm_error_rate: float = 0.0, homepage_template: str = "",
+                 health_items: int = 1000):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.items = items
+        self.feed_items = feed_items
+        self.llm_latency = llm_latency
+        self.llm_jitter = llm_jitter
+        self.llm_error_rate = llm_error_rate
+        self.health_items = health_items
+        self.homepage_template = homepage_template or "<html><body><h1>Acme AI</h1></body></html>"
+        self.base = f"http://127.0.0.1:{self.server_address[1]}"
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.llm_durations = []
+
+    def count(self, name: str, n: int = 1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {"counters": dict(self.counters), "llm_durations": list(self.llm_durations)}
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True, name="standin-server").start()
+        return self
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: StandinServer
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status: int, body=b"", content_type="application/json", headers=None):
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body, ensure_ascii=False)
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _conditional(self, body: str, content_type: str):
+        etag = '"' + hashlib.sha1(body.encode("utf-8")).hexdigest() + '"'
+        if self.headers.get("If-None-Match") == etag:
+            self.server.count("304")
+            self._send(304, headers={"ETag": etag})
+        else:
+            self._send(200, body, content_type, {"ETag": etag})
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_GET(self):
+        srv = self.server
+        parts = urlsplit(self.path)
+        path, query = parts.path, parse_qs(parts.query)
+        srv.count(f"GET {path.split('/')[1] if '/' in path else path}")
+
+        if path == "/aigc/":
+            self._send(200, listing_html(srv.base, srv.items), "text/html; charset=utf-8")
+        elif path.startswith("/gone/"):
+            self._send(404, "gone", "text/plain")
+        elif path.startswith("/moved/"):
+            self._send(301, headers={"Location": f"/site/{path.split('/')[2]}"})
+        elif path.startswith("/nohead/"):
+            if self.command == "HEAD":
+                self._send(405, "", "text/plain")
+            else:
+                self._send(200, homepage_html(srv.homepage_template, int(path.split("/")[2])), "text/html; charset=utf-8")
+        elif path.startswith("/site/"):
+            self._send(200, homepage_html(srv.homepage_template, int(path.split("/")[2])), "text/html; charset=utf-8")
+        elif path.startswith("/logo/"):
+            self._send(200, tiny_png(int(path.split("/")[2].split(".")[0])), "image/png")
+        elif path.startswith("/rss/"):
+            feed = path.split("/")[2].split(".")[0]
+            self._conditional(rss_xml(srv.base, feed, srv.feed_items), "application/rss+xml")
+        elif path == "/github/search":
+            per_page = int(query.get("per_page", ["5"])[0])
+            items = [
+                {
+                    "name": f"repo{i}",
+                    "owner": {"login": "bench", "avatar_url": f"{srv.base}/logo/{1000 + i}.png"},
+                    "description": f"Open-source LLM toolkit #{i}",
+                    "html_url": f"{srv.base}/gh/bench/repo{i}",
+                }
+                for i in range(per_page)
+            ]
+            self._send(200, {"items": items})
+        elif path == "/api/tools":
+            self._send(200, {"urls": [], "cursor": None, "hasMore": False})
+        elif path == "/api/admin/tools/enrich" and query.get("mode") == ["health"]:
+            # 每 10 个里: 1 个 404, 1 个 301 跳转, 1 个拒绝 HEAD, 其余正常
+            limit = int(query.get("limit", ["1000"])[0])
+            start = int(query.get("cursor", ["0"])[0] or 0)
+            kinds = ["site"] * 7 + ["gone", "moved", "nohead"]
+            tools = [
+                {"id": f"{i:08d}", "url": f"{srv.base}/{kinds[i % 10]}/{i}",
+                 "status": "OFFLINE" if i % 20 == 19 else "PUBLISHED"}
+                for i in range(start, min(start + limit, srv.health_items))
+            ]
+            self._send(200, {"tools": tools, "cursor": str(start + len(tools)),
+                             "hasMore": start + len(tools) < srv.health_items})
+        elif path == "/api/admin/tools/enrich":
+            limit = int(query.get("limit", ["5"])[0])
+            tools = [
+                {"id": f"bench-{i}", "url": f"{srv.base}/site/{i}", "title_en": f"Bench Tool {i}",
+                 "title_zh": f"基准工具 {i}", "screenshotUrl": None, "coreValue": None, "useCases": None,
+                 "content_en": i % 3 == 0, "isHot": i % 7 == 0, "likesCount": (i * 37) % 100,
+                 "updatedAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(time.time() - i * 86400)),
+                 "status": "PUBLISHED"}
+                for i in range(min(limit, srv.items))
+            ]
+            self._send(200, {"tools": tools})
+        else:
+            self._send(404, {"error": "not found"})
+
+    def do_POST(self):
+        srv = self.server
+        path = urlsplit(self.path).path
+        body = self._body()
+
+        if path.endswith("/chat/completions"):
+            started = time.monotonic()
+            # 输出越长越慢: 批量请求每多一个工具, 延迟按 60% 递增
+            prompt = "".join(m.get("content", "") for m in body.get("messages", []))
+            scale = 1 + 0.6 * max(0, len(re.findall(r'"id": "t\d+"', prompt)) - 1)
+            time.sleep(max(0.0, srv.llm_latency * scale + random.uniform(-srv.llm_jitter, srv.llm_jitter)))
+            if random.random() < srv.llm_error_rate:
+                srv.count("llm 429")
+                self._send(429, {"error": {"message": "rate limited"}}, headers={"Retry-After": "1"})
+                return
+            with srv.lock:
+                srv.llm_durations.append(time.monotonic() - started)
+            srv.count("llm")
+            prompt = "".join(m.get("content", "") for m in body.get("messages", []))
+            prompt_chars = len(prompt)
+            ids = re.findall(r'"id": "(t\d+)"', prompt)
+            if ids:
+                srv.count("llm batch")
+                srv.count("llm batch items", len(ids))
+                content = json.dumps({"tools": [dict(LLM_REPLY, id=i) for i in ids]}, ensure_ascii=False)
+            else:
+                content = json.dumps(LLM_REPLY, ensure_ascii=False)
+            self._send(200, {
+                "id": "bench", "object": "chat.completion", "created": int(time.time()), "model": body.get("model"),
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": content}}],
+                "usage": {"prompt_tokens": prompt_chars // 3, "completion_tokens": len(content) // 3,
+                          "total_tokens": prompt_chars // 3 + len(content) // 3},
+            })
+        elif path.endswith("/inject/bulk"):
+            items = body.get("items", [])
+            srv.count("injected", len(items))
+            srv.count("bulk requests")
+            self._send(200, {"results": [{"index": i, "success": True} for i in range(len(items))]})
+        elif path.endswith("/inject"):
+            srv.count("injected")
+            self._send(200, {"success": True})
+        else:
+            self._send(404, {"error": "not found"})
+
+    def do_PATCH(self):
+        srv = self.server
+        body = self._body()
+        srv.count("patched", len(body.get("items", [])) if "items" in body else 1)
+        self._send(200, {"success": True})
+
+
+class StubS3:
+    """In-process stand-in for the boto3 S3 client calls the crawler makes."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.objects = {}
+        self.uploads = {}
+        self.calls = {}
+        self._lock = threading.Lock()
+
+    def _call(self, name):
+        with self._lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self._call("put_object")
+        with self._lock:
+            self.objects[Key] = bytes(Body)
+        return {"ETag": '"stub"'}
+
+    def head_object(self, Bucket, Key, **kwargs):
+        self._call("head_object")
+        with self._lock:
+            if Key not in self.objects:
+                raise KeyError(Key)
+            return {"ContentLength": len(self.objects[Key])}
+
+    def create_multipart_upload(self, Bucket, Key, **kwargs):
+        self._call("create_multipart_upload")
+        upload_id = hashlib.sha1(f"{Key}{time.time()}".encode()).hexdigest()
+        with self._lock:
+            self.uploads[upload_id] = {}
+        return {"UploadId": upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body, **kwargs):
+        self._call("upload_part")
+        with self._lock:
+            self.uploads[UploadId][PartNumber] = bytes(Body)
+        return {"ETag": f'"part-{PartNumber}"'}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload, **kwargs):
+        self._call("complete_multipart_upload")
+        with self._lock:
+            parts = self.uploads.pop(UploadId)
+            self.objects[Key] = b"".join(parts[p["PartNumber"]] for p in MultipartUpload["Parts"])
+        return {}
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId, **kwargs):
+        self._call("abort_multipart_upload")
+        with self._lock:
+            self.uploads.pop(UploadId, None)
+        return {}
+
+    def copy_object(self, Bucket, Key, CopySource, **kwargs):
+        self._call("copy_object")
+        with self._lock:
+            self.objects[Key] = self.objects[CopySource["Key"]]
+        return {}
+
+    def delete_object(self, Bucket, Key, **kwargs):
+        self._call("delete_object")
+        with self._lock:
+            self.objects.pop(Key, None)
+        return {}
+
+    def stored_bytes(self) -> int:
+        with self._lock:
+            return sum(len(v) for v in self.objects.values())
+
+
+class FakeDDGS:
+    """Drop-in for duckduckgo_search.DDGS with a fixed latency."""
+
+    latency = 0.3
+
+    def text(self, query, max_results=5):
+        time.sleep(self.latency)
+        return [
+            {"title": f"Result {i} for {query[:40]}", "href": f"https://example.com/{i}", "body": "Snippet text. " * 10}
+            for i in range(max_results)
+        ]
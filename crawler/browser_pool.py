@@ -0,0 +1,202 @@
+import os
+import queue
+import threading
+import time
+import atexit
+from concurrent.futures import Future
+from playwright.sync_api import sync_playwright
+import crawler_env  # noqa: F401
+
+# --- 浏览器池配置 ---
+# 常驻的浏览器上下文数量 (每个上下文独占一个工作线程, Playwright sync API 不能跨线程使用)
+BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "2"))
+# 每个上下文服务多少个页面后回收重建, 防止内存/缓存无限增长
+BROWSER_POOL_MAX_PAGES = int(os.getenv("BROWSER_POOL_MAX_PAGES", "50"))
+
+DEFAULT_VIEWPORT = {"width": 1280, "height": 720}
+
+
+class CaptureStats:
+    """
+    Per-lease timings, split into cold (browser/context had to be created)
+    and warm (reused context) so the startup cost is visible.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.cold = []
+        self.warm = []
+        self.recycled = 0
+        self.crashed = 0
+
+    def record(self, cold: bool, elapsed: float):
+        with self._lock:
+            (self.cold if cold else self.warm).append(elapsed)
+
+    def incr(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def summary(self) -> dict:
+        with self._lock:
+            def _avg(xs):
+                return round(sum(xs) / len(xs), 3) if xs else None
+
+            return {
+                "cold_count": len(self.cold),
+                "cold_avg_s": _avg(self.cold),
+                "warm_count": len(self.warm),
+                "warm_avg_s": _avg(self.warm),
+                "recycled": self.recycled,
+                "crashed": self.crashed,
+            }
+
+
+class _Slot(threading.Thread):
+    """
+    One warm browser context living on its own thread. Jobs are pulled from
+    the pool's shared queue and run against a fresh page of this context.
+    """
+
+    def __init__(self, pool: "BrowserPool", index: int):
+        super().__init__(name=f"browser-slot-{index}", daemon=True)
+        self.pool = pool
+        self.playwright = None
+        self.browser = None
+        self.context = None
+        self.pages_served = 0
+
+    def _ensure_context(self) -> bool:
+        """Returns True when something had to be (re)started."""
+        cold = False
+        if self.browser is None or not self.browser.is_connected():
+            self._close_browser()
+            self.browser = self.playwright.chromium.launch(headless=self.pool.headless)
+            cold = True
+        if self.context is None:
+            self.context = self.browser.new_context(viewport=self.pool.viewport)
+            self.pages_served = 0
+            cold = True
+        return cold
+
+    def _close_context(self):
+        if self.context is not None:
+            try:
+                self.context.close()
+            except Exception:
+                pass
+            self.context = None
+
+    def _close_browser(self):
+        self._close_context()
+        if self.browser is not None:
+            try:
+                self.browser.close()
+            except Exception:
+                pass
+            self.browser = None
+
+    def run(self):
+        with sync_playwright() as p:
+            self.playwright = p
+            while True:
+                job = self.pool._jobs.get()
+                if job is None:
+                    break
+                fn, args, kwargs, future = job
+                if not future.set_running_or_notify_cancel():
+                    continue
+
+                started = time.monotonic()
+                page = None
+                try:
+                    cold = self._ensure_context()
+                    page = self.context.new_page()
+                    result = fn(page, *args, **kwargs)
+                    future.set_result(result)
+                except Exception as e:
+                    # 浏览器崩溃 (断开连接) 时整体重启, 否则只丢弃当前上下文
+                    if self.browser is None or not self.browser.is_connected():
+                        self.pool.stats.incr("crashed")
+                        self._close_browser()
+                    else:
+                        self._close_context()
+                    future.set_exception(e)
+                    continue
+                finally:
+                    if page is not None:
+                        try:
+                            page.close()
+                        except Exception:
+                            pass
+
+                self.pool.stats.record(cold, time.monotonic() - started)
+                self.pages_served += 1
+                if self.pages_served >= self.pool.max_pages:
+                    self.pool.stats.incr("recycled")
+                    self._close_context()
+
+            self._close_browser()
+
+
+class BrowserPool:
+    """
+    Long-lived pool of warm Chromium contexts.
+
+    `run(fn, *args)` leases a fresh page from whichever context is free,
+    calls `fn(page, *args)` on that context's thread and returns the result.
+    """
+
+    def __init__(
+        self,
+        size: int = BROWSER_POOL_SIZE,
+        max_pages: int = BROWSER_POOL_MAX_PAGES,
+        viewport: dict | None = None,
+        headless: bool = True,
+    ):
+        self.size = max(1, size)
+        self.max_pages = max(1, max_pages)
+        self.viewport = viewport or DEFAULT_VIEWPORT
+        self.headless = headless
+        self.stats = CaptureStats()
+        self._jobs = queue.Queue()
+        self._slots = [_Slot(self, i) for i in range(self.size)]
+        for slot in self._slots:
+            slot.start()
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        future = Future()
+        self._jobs.put((fn, args, kwargs, future))
+        return future
+
+    def run(self, fn, *args, timeout: float | None = None, **kwargs):
+        return self.submit(fn, *args, **kwargs).result(timeout=timeout)
+
+    def close(self):
+        for _ in self._slots:
+            self._jobs.put(None)
+        for slot in self._slots:
+            slot.join(timeout=30)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> BrowserPool:
+    """Process-wide shared pool, started lazily on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BrowserPool()
+            atexit.register(shutdown_pool)
+        return _pool
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            print(f"Browser pool stats: {_pool.stats.summary()}")
+            _pool.close()
+            _pool = None
@@ -0,0 +1,91 @@
+import json
+import time
+import threading
+import state_db
+from dedup_index import normalize_url
+
+# 每个条目依次完成的阶段
+STAGES = ("parsed", "llm", "screenshot", "media", "injected")
+
+
+def reached(item: dict, stage: str) -> bool:
+    """True when `item` has already completed `stage` (or a later one)."""
+    return STAGES.index(item.get("stage", "parsed")) >= STAGES.index(stage)
+
+
+class CrawlJournal:
+    """
+    Per-item stage checkpoints for listing crawls (AIGC_CN, IZZI_CN, ...).
+
+    Each row holds the item's intermediate results as JSON plus the raw
+    screenshot between the browser and media stages, so a restarted run picks
+    an item up after its last finished stage. Injected rows are pruned once a
+    pass completes; anything else stays until it gets through.
+    """
+
+    def __init__(self, filename: str = "crawl_journal.sqlite"):
+        self._filename = filename
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _db(self):
+        if self._conn is None:
+            self._conn = state_db.connect(self._filename)
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS journal (
+                    source TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    stage TEXT NOT NULL,
+                    item TEXT NOT NULL,
+                    shot BLOB,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (source, key)
+                )
+                """
+            )
+        return self._conn
+
+    def record(self, source: str, item: dict, stage: str):
+        item["stage"] = stage
+        data = {k: v for k, v in item.items() if not isinstance(v, bytes)}
+        shot = item.get("shot_bytes") if stage == "screenshot" else None
+        with self._lock:
+            self._db().execute(
+                "INSERT OR REPLACE INTO journal (source, key, stage, item, shot, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (source, normalize_url(item["url"]), stage, json.dumps(data, ensure_ascii=False), shot, time.time()),
+            )
+
+    def _load(self, row) -> dict:
+        item = json.loads(row[0])
+        if row[1] is not None:
+            item["shot_bytes"] = row[1]
+        return item
+
+    def get(self, source: str, url: str) -> dict | None:
+        with self._lock:
+            row = self._db().execute(
+                "SELECT item, shot FROM journal WHERE source = ? AND key = ?",
+                (source, normalize_url(url)),
+            ).fetchone()
+        return self._load(row) if row else None
+
+    def pending(self, source: str) -> list[dict]:
+        """Items of `source` that have not been injected yet, oldest first."""
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT item, shot FROM journal WHERE source = ? AND stage != 'injected' ORDER BY updated_at",
+                (source,),
+            ).fetchall()
+        return [self._load(row) for row in rows]
+
+    def prune(self, source: str) -> int:
+        with self._lock:
+            cur = self._db().execute(
+                "DELETE FROM journal WHERE source = ? AND stage = 'injected'", (source,)
+            )
+        return cur.rowcount
+
+
+# 进程级共享
+JOURNAL = CrawlJournal()
@@ -0,0 +1,13 @@
+"""
+Loads crawler/.env (or CRAWLER_ENV_FILE) into the process environment.
+
+Modules that read settings with os.getenv at import time import this module
+before anything else, so values that only live in the env file are seen no
+matter which module happens to be imported first. Variables already set in
+the environment win over the file.
+"""
+import os
+from dotenv import load_dotenv
+
+CRAWLER_ENV_PATH = os.getenv("CRAWLER_ENV_FILE") or os.path.join(os.path.dirname(__file__), ".env")
+load_dotenv(CRAWLER_ENV_PATH)
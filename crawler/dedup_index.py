@@ -0,0 +1,175 @@
+import os
+import time
+import threading
+import requests
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+import crawler_env  # noqa: F401
+import state_db
+
+
+def api_origin(url: str | None) -> str:
+    if not url:
+        return "http://localhost:3000"
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+# 返回全部工具 URL 的列表接口 (Next.js /api/tools?urlsOnly=true)
+TOOLS_LIST_API_URL = os.getenv("TOOLS_LIST_API_URL") or (
+    api_origin(os.getenv("CRAWLER_API_URL")) + "/api/tools"
+)
+
+# 常见的追踪参数, 归一化时去掉
+TRACKING_PARAMS = {
+    "ref", "ref_src", "spm", "from",
+    "fbclid", "gclid", "dclid", "msclkid", "yclid", "igshid",
+    "mc_cid", "mc_eid", "_hsenc", "_hsmi",
+}
+
+
+def normalize_url(url: str | None) -> str | None:
+    """
+    Canonical form used as the dedup key: http/https folded, host lowercased
+    without `www.` or default port, tracking params and fragment dropped,
+    remaining params sorted, trailing slash removed.
+    """
+    if not url:
+        return None
+    url = url.strip()
+    if "://" not in url:
+        url = "https://" + url
+    parts = urlsplit(url)
+
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    port = parts.port
+    if port and port not in (80, 443):
+        host = f"{host}:{port}"
+
+    query = [
+        (k, v)
+        for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_") and k.lower() not in TRACKING_PARAMS
+    ]
+    path = parts.path.rstrip("/")
+
+    return urlunsplit(("https", host, path, urlencode(sorted(query)), ""))
+
+
+class DedupIndex:
+    """
+    Persistent set of already-ingested URLs, shared by every crawler.
+
+    Entries live in namespaces ("tool", "news", ...). The "tool" namespace is
+    mirrored from the Next.js API incrementally by `(updatedAt, id)` cursor.
+    """
+
+    def __init__(self, filename: str = "dedup_index.sqlite"):
+        self._filename = filename
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _db(self):
+        if self._conn is None:
+            self._conn = state_db.connect(self._filename)
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS seen (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    source TEXT,
+                    added_at REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                ) WITHOUT ROWID
+                """
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sync_cursor (namespace TEXT PRIMARY KEY, cursor TEXT)"
+            )
+        return self._conn
+
+    def contains(self, url: str | None, namespace: str = "tool") -> bool:
+        key = normalize_url(url)
+        if key is None:
+            return False
+        with self._lock:
+            row = self._db().execute(
+                "SELECT 1 FROM seen WHERE namespace = ? AND key = ?", (namespace, key)
+            ).fetchone()
+        return row is not None
+
+    def add(self, url: str | None, namespace: str = "tool", source: str | None = None):
+        self.add_many([url], namespace, source)
+
+    def add_many(self, urls, namespace: str = "tool", source: str | None = None):
+        now = time.time()
+        rows = [(namespace, k, source, now) for k in map(normalize_url, urls) if k]
+        if not rows:
+            return
+        with self._lock:
+            db = self._db()
+            db.execute("BEGIN")
+            db.executemany(
+                "INSERT OR IGNORE INTO seen (namespace, key, source, added_at) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            db.execute("COMMIT")
+
+    def count(self, namespace: str = "tool") -> int:
+        with self._lock:
+            return self._db().execute(
+                "SELECT COUNT(*) FROM seen WHERE namespace = ?", (namespace,)
+            ).fetchone()[0]
+
+    def _cursor(self, namespace: str) -> str | None:
+        with self._lock:
+            row = self._db().execute(
+                "SELECT cursor FROM sync_cursor WHERE namespace = ?", (namespace,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def _set_cursor(self, namespace: str, cursor: str):
+        with self._lock:
+            self._db().execute(
+                "INSERT OR REPLACE INTO sync_cursor (namespace, cursor) VALUES (?, ?)",
+                (namespace, cursor),
+            )
+
+    def sync_tools(self, api_url: str = TOOLS_LIST_API_URL) -> int:
+        """Pulls tool URLs changed since the last sync. Returns how many were fetched."""
+        fetched = 0
+        cursor = self._cursor("tool")
+        while True:
+            r = requests.get(
+                api_url,
+                params={"urlsOnly": "true", "updatedSince": cursor or ""},
+                timeout=30,
+            )
+            r.raise_for_status()
+            data = r.json()
+            urls = data.get("urls", [])
+            self.add_many(urls, "tool", source="api")
+            fetched += len(urls)
+
+            next_cursor = data.get("cursor")
+            if next_cursor:
+                self._set_cursor("tool", next_cursor)
+            # 游标是 "updatedAt|id", 同一时间戳的记录超过一页也能继续翻; 游标不前进时结束, 防止死循环
+            if not data.get("hasMore") or not next_cursor or next_cursor == cursor:
+                break
+            cursor = next_cursor
+        return fetched
+
+
+# 进程级共享索引
+DEDUP = DedupIndex()
+
+
+def refresh_tool_index():
+    """Incremental tool URL sync; failures only cost dedup freshness, so they are logged."""
+    try:
+        fetched = DEDUP.sync_tools()
+        print(f"Synced {fetched} changed tools; dedup index holds {DEDUP.count()} URLs.")
+    except Exception as e:
+        print(f"Could not sync existing URLs: {e}")
@@ -0,0 +1,165 @@
+import os
+import math
+import time
+import threading
+import datetime
+import crawler_env  # noqa: F401
+import state_db
+
+# 缺失字段的权重: 没有截图 / 没有核心价值的工具在前台最显眼
+ENRICH_FIELD_WEIGHTS = {
+    "screenshotUrl": 3.0,
+    "coreValue": 3.0,
+    "content_en": 2.0,
+    "useCases": 1.0,
+}
+# 距上次更新每满 N 天加 1 分, 最多加 ENRICH_AGE_CAP 分
+ENRICH_AGE_DAYS = float(os.getenv("ENRICH_AGE_DAYS", "30"))
+ENRICH_AGE_CAP = float(os.getenv("ENRICH_AGE_CAP", "3"))
+# 失败后的退避: 第 n 次失败后等待 base * 2^(n-1) 小时, 最长 ENRICH_BACKOFF_MAX_HOURS
+ENRICH_BACKOFF_HOURS = float(os.getenv("ENRICH_BACKOFF_HOURS", "6"))
+ENRICH_BACKOFF_MAX_HOURS = float(os.getenv("ENRICH_BACKOFF_MAX_HOURS", "168"))
+
+
+def _age_days(updated_at: str | None, now: float) -> float:
+    if not updated_at:
+        return ENRICH_AGE_DAYS * ENRICH_AGE_CAP
+    try:
+        ts = datetime.datetime.fromisoformat(updated_at.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return 0.0
+    return max(0.0, (now - ts) / 86400)
+
+
+def score(tool: dict, failures: int = 0, now: float | None = None) -> float:
+    """
+    Value of enriching `tool` now: missing fields, staleness and popularity,
+    halved for every past failure. 0 means there is nothing to repair.
+    """
+    now = time.time() if now is None else now
+    missing = sum(w for field, w in ENRICH_FIELD_WEIGHTS.items() if not tool.get(field))
+    if not missing:
+        return 0.0
+    age = min(ENRICH_AGE_CAP, _age_days(tool.get("updatedAt"), now) / ENRICH_AGE_DAYS)
+    popularity = math.log1p(tool.get("likesCount") or 0) + (2.0 if tool.get("isHot") else 0.0)
+    return (missing + age + popularity) / (2 ** failures)
+
+
+class EnrichAttempts:
+    """Failure count and backoff deadline per tool, so broken tools stop eating the budget."""
+
+    def __init__(self, filename: str = "enrich_attempts.sqlite"):
+        self._filename = filename
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _db(self):
+        if self._conn is None:
+            self._conn = state_db.connect(self._filename)
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS attempts (
+                    tool_id TEXT PRIMARY KEY,
+                    failures INTEGER NOT NULL,
+                    last_attempt REAL NOT NULL,
+                    retry_after REAL NOT NULL,
+                    last_error TEXT
+                )
+                """
+            )
+        return self._conn
+
+    def states(self, tool_ids) -> dict:
+        """{tool_id: (failures, retry_after)} for the given tools that have a history."""
+        ids = list(tool_ids)
+        out = {}
+        with self._lock:
+            db = self._db()
+            for i in range(0, len(ids), 500):
+                chunk = ids[i : i + 500]
+                rows = db.execute(
+                    f"SELECT tool_id, failures, retry_after FROM attempts WHERE tool_id IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                out.update({r[0]: (r[1], r[2]) for r in rows})
+        return out
+
+    def succeeded(self, tool_id: str):
+        with self._lock:
+            self._db().execute("DELETE FROM attempts WHERE tool_id = ?", (tool_id,))
+
+    def failed(self, tool_id: str, error: str) -> float:
+        """Records a failure and returns the backoff in hours."""
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            row = db.execute("SELECT failures FROM attempts WHERE tool_id = ?", (tool_id,)).fetchone()
+            failures = (row[0] if row else 0) + 1
+            hours = min(ENRICH_BACKOFF_MAX_HOURS, ENRICH_BACKOFF_HOURS * 2 ** (failures - 1))
+            db.execute(
+                "INSERT OR REPLACE INTO attempts (tool_id, failures, last_attempt, retry_after, last_error) VALUES (?, ?, ?, ?, ?)",
+                (tool_id, failures, now, now + hours * 3600, error[:500]),
+            )
+        return hours
+
+
+# 进程级共享
+ATTEMPTS = EnrichAttempts()
+
+
+def prioritize(tools: list[dict], attempts: EnrichAttempts = ATTEMPTS, now: float | None = None) -> list:
+    """
+    Candidates that are out of backoff and still have something to repair,
+    as (score, tool) pairs, highest first.
+    """
+    now = time.time() if now is None else now
+    states = attempts.states(t["id"] for t in tools)
+    ranked = []
+    for t in tools:
+        failures, retry_after = states.get(t["id"], (0, 0.0))
+        if retry_after > now:
+            continue
+        s = score(t, failures, now)
+        if s > 0:
+            ranked.append((s, t))
+    ranked.sort(key=lambda pair: pair[0], reverse=True)
+    return ranked
+
+
+class Budget:
+    """
+    Per-cycle wall-clock and LLM-token allowance. `affords()` keeps a running
+    average of what one item costs, so the cycle stops before an item that
+    would overrun the budget rather than after.
+    """
+
+    def __init__(self, seconds: float, tokens: int, token_estimate: int):
+        self.seconds = seconds
+        self.tokens = tokens
+        self.started = time.monotonic()
+        self.spent_tokens = 0
+        self.items = 0
+        self._token_estimate = token_estimate
+        self._seconds_estimate = 0.0
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def charge(self, seconds: float, tokens: int):
+        self.items += 1
+        self.spent_tokens += tokens
+        # 滑动平均, 新样本占 1/3
+        if self.items == 1:
+            self._seconds_estimate = seconds
+        else:
+            self._seconds_estimate += (seconds - self._seconds_estimate) / 3
+        if tokens:
+            self._token_estimate += (tokens - self._token_estimate) / 3
+
+    def affords(self) -> str | None:
+        """None when one more item fits, otherwise the reason it does not."""
+        if self.elapsed() + self._seconds_estimate > self.seconds:
+            return f"time budget ({self.seconds:.0f}s) reached"
+        if self.spent_tokens + self._token_estimate > self.tokens:
+            return f"token budget ({self.tokens}) reached"
+        return None
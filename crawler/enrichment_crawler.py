@@ -1,55 +1,121 @@
 import os
 import requests
 import time
-from bs4 import BeautifulSoup
-from duckduckgo_search import DDGS
-from dotenv import load_dotenv
-from main import capture, _download_and_upload_media
-from llm_processor import client
-
-CRAWLER_ENV_PATH = os.path.join(os.path.dirname(__file__), ".env")
-load_dotenv(CRAWLER_ENV_PATH)
+import crawler_env  # noqa: F401
+from main import check_config, upload_screenshot
+import screenshot_service
+import search_service
+from llm_processor import chat_json, cache_key, cached_result, tokens_used, PROMPT_VERSIONS
+from llm_cache import LLM_CACHE
+from html_parse import parse_text
+from homepage_store import HOMEPAGES, simhash
+from metrics import METRICS
+from enrich_queue import ATTEMPTS, Budget, prioritize
+from health_sweeper import HEALTH, HEALTH_RECHECK_HOURS, check_tool, transition, patch_statuses
 
 API_URL = os.getenv("CRAWLER_API_URL")
-if API_URL:
+if os.getenv("ENRICH_API_URL"):
+    ENRICH_API_URL = os.getenv("ENRICH_API_URL")
+elif API_URL:
     ENRICH_API_URL = API_URL.replace("/tools/inject", "/tools/enrich")
 else:
     ENRICH_API_URL = "http://localhost:3000/api/admin/tools/enrich"
 
 API_KEY = os.getenv("API_SECRET_KEY")
 
+# 每轮从 API 取回的候选数量, 本地按优先级排序
+ENRICH_CANDIDATES = int(os.getenv("ENRICH_CANDIDATES", "200"))
+# 每轮的时间 / token 预算, 取代固定的条数
+ENRICH_TIME_BUDGET_MINUTES = float(os.getenv("ENRICH_TIME_BUDGET_MINUTES", "30"))
+ENRICH_TOKEN_BUDGET = int(os.getenv("ENRICH_TOKEN_BUDGET", "150000"))
+# 还没有实际用量时, 估算一个工具的 token 消耗
+ENRICH_TOKENS_PER_TOOL = int(os.getenv("ENRICH_TOKENS_PER_TOOL", "6000"))
+# 提前排队截图的工具数, 浏览器池与 LLM 改写并行
+ENRICH_SHOT_PREFETCH = int(os.getenv("ENRICH_SHOT_PREFETCH", "2"))
+# 提前排队网页搜索的工具数, 搜索与前面工具的 LLM 改写并行
+ENRICH_SEARCH_PREFETCH = int(os.getenv("ENRICH_SEARCH_PREFETCH", "3"))
+
+
+def fetch_homepage_text(url):
+    """
+    Cleaned homepage text (first 2500 chars) and its SimHash. Conditional GET
+    against the stored snapshot; a 304 reuses the stored text. Error statuses
+    raise, and so does a page with no extractable text (JS-only sites), so
+    neither is ever fingerprinted or rewritten.
+    """
+    headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
+    snap = HOMEPAGES.get(url)
+    if snap and snap["text"]:
+        if snap["etag"]:
+            headers["If-None-Match"] = snap["etag"]
+        if snap["last_modified"]:
+            headers["If-Modified-Since"] = snap["last_modified"]
+    with METRICS.span("enrich.homepage_fetch"):
+        r = requests.get(url, headers=headers, timeout=15)
+    if r.status_code == 304 and snap and snap["text"]:
+        METRICS.incr("homepage_fetches", status="not_modified")
+        HOMEPAGES.touch(url)
+        return snap["text"], snap["simhash"]
+    if not r.ok:
+        METRICS.incr("homepage_fetches", status="error")
+        r.raise_for_status()
+    text = parse_text(r.text, limit=2500) # Take first 2500 chars of pure homepage text
+    if not text:
+        METRICS.incr("homepage_fetches", status="empty")
+        raise ValueError("homepage has no extractable text")
+    METRICS.incr("homepage_fetches", status="ok")
+    fingerprint = simhash(text)
+    HOMEPAGES.put_fetch(url, text, fingerprint, r.headers.get("etag"), r.headers.get("last-modified"))
+    return text, fingerprint
+
+
+# deep_process_homepage 的返回值: 主页与上次改写时相比没有变化, 不需要再 PATCH
+HOMEPAGE_UNCHANGED = "unchanged"
+
+
+def search_query(tool_name):
+    return f"{tool_name} AI tool tutorial OR review OR news"
+
 
-def deep_process_homepage(url, tool_name):
+def deep_process_homepage(url, tool_name, search_future=None):
     """
     Spins up playwright (or requests) to get the REAL text of the homepage,
     searches the web for news/tutorials,
     then asks DeepSeek to rewrite a perfect, deep curation of the tool.
+    `search_future` is a search already queued by the caller (see prefetch_searches).
+    Returns the rewrite, None when it failed, or HOMEPAGE_UNCHANGED when the
+    page is still the version the last rewrite was made from.
     """
     print(f"  [Deep Scrape] Fetching actual HTML for {tool_name} at {url}...")
     real_text = ""
-    headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
+    fingerprint = None
     try:
-        r = requests.get(url, headers=headers, timeout=15)
-        soup = BeautifulSoup(r.text, 'html.parser')
-        
-        # Kill noise
-        for script in soup(["script", "style", "nav", "footer", "header", "noscript"]):
-            script.extract()
-            
-        real_text = soup.get_text(separator=' ', strip=True)[:2500] # Take first 2500 chars of pure homepage text
+        real_text, fingerprint = fetch_homepage_text(url)
     except Exception as e:
         print(f"  [Error] Official HP Scrape failed/timed out: {e}")
         real_text = "Homepage text unavailable. Rely strictly on external search data."
-        
+
+    # Homepage within a few SimHash bits of the version we last rewrote -> that rewrite is already in the DB
+    if fingerprint is not None:
+        if HOMEPAGES.unchanged_result(url, fingerprint, PROMPT_VERSIONS["homepage"]) is not None:
+            print("  [Deep Scrape] Homepage unchanged since last rewrite, skipping search + LLM.")
+            METRICS.incr("homepage_rewrites", result="unchanged")
+            return HOMEPAGE_UNCHANGED
+
+    # Same homepage text as last time -> reuse the rewrite and skip search + LLM entirely.
+    # 主页抓取失败时 real_text 只是固定的兜底文案: 不查也不写缓存, 否则以后每次抓取失败都会复用这份没看过主页的改写
+    key = cache_key("homepage", tool_name, real_text) if fingerprint is not None else None
+    cached = cached_result(key, tool_name) if key else None
+    if cached is not None:
+        HOMEPAGES.put_processed(url, fingerprint, PROMPT_VERSIONS["homepage"], cached)
+        return cached
+
     # --- EXTERNAL SEARCH FOR ENRICHMENT ---
     print(f"  [Web Search] Searching external reviews and tutorials for {tool_name}...")
-    external_context = ""
-    try:
-        results = DDGS().text(f"{tool_name} AI tool tutorial OR review OR news", max_results=5)
-        for res in results:
-            external_context += f"- [{res['title']}]({res['href']}): {res['body']}\n"
-    except Exception as e:
-        print(f"  [Web Search] DDG search failed: {e}")
+    if search_future is None:
+        search_future = search_service.submit(search_query(tool_name), max_results=5)
+    with METRICS.span("enrich.search_wait"):
+        external_context = search_service.format_context(search_future.result())
 
     try:
         print(f"  [LLM] Feeding {len(real_text)} chars of HP data + web context to DeepSeek...")
@@ -78,104 +144,200 @@ def deep_process_homepage(url, tool_name):
         }}
         """
         
-        response = client.chat.completions.create(
-            model="deepseek-chat",
-            messages=[{"role": "user", "content": prompt}],
-            response_format={"type": "json_object"}
-        )
-        content = response.choices[0].message.content
-        import json
-        
-        if "```json" in content:
-            content = content.split("```json")[1].split("```")[0].strip()
-        elif "```" in content:
-            content = content.split("```")[1].split("```")[0].strip()
-            
-        return json.loads(content)
+        result = chat_json([{"role": "user", "content": prompt}])
+        if key:
+            LLM_CACHE.put(key, "homepage", result)
+        if fingerprint is not None:
+            HOMEPAGES.put_processed(url, fingerprint, PROMPT_VERSIONS["homepage"], result)
+        METRICS.incr("homepage_rewrites", result="rewritten")
+        return result
         
     except Exception as e:
         print(f"  [Error] Deep Scrape failed: {e}")
         return None
 
 
-def run_enrichment_cycle(limit=5):
-    print(f"\n--- Starting Data Enrichment Engine (Batch: {limit}) ---")
+def heal_tool(t, headers, shot_future=None, search_future=None):
+    """
+    Health check, screenshot repair, LLM rewrite and PATCH for one tool.
+    `shot_future` / `search_future` are a screenshot and a web search already
+    queued by the caller (see prefetch_shots / prefetch_searches).
+    Returns (outcome, error); error is set when the attempt should count as a failure.
+    """
+    tool_id = t["id"]
+    url = t["url"]
+    name = t["title_en"] or t["title_zh"]
+    patch_payload = {"id": tool_id}
+
+    # --- ACTION A: Health Check ---
+    # A recent sweep result is reused; otherwise the tool is checked now (HEAD -> GET fallback)
+    check = HEALTH.get(tool_id)
+    if check and check["checked_at"] >= time.time() - HEALTH_RECHECK_HOURS * 3600:
+        failures = check["failures"]
+    else:
+        print(f"  [Health] Pinging {url}...")
+        with METRICS.span("enrich.health"):
+            check, failures = check_tool(tool_id, url)
+    change = transition(t.get("status"), check, failures)
+    if change == "ONLINE":
+        # 候选列表目前不含 OFFLINE 的工具, 恢复上线通常由 run_health_sweep 处理; 这里随修复一起发出
+        print("  [Health] URL is back up. Restoring its previous status.")
+        patch_payload["status"] = "ONLINE"
+    if not check["alive"]:
+        detail = check["error"] or f"Status: {check['status_code']}"
+        # 死站不再花 LLM 改写; 连续失败达到阈值才下线
+        if change == "OFFLINE":
+            print(f"  [Health] URL appears dead ({detail}). Marking OFFLINE.")
+            patch_statuses([{"id": tool_id, "status": "OFFLINE"}])
+            if shot_future is not None:
+                shot_future.cancel()
+            return "offline", None
+        print(f"  [Health] URL failing ({detail}, {failures}x). Skipping until it recovers.")
+        if shot_future is not None:
+            shot_future.cancel()
+        return "unreachable", f"unreachable: {detail}"
+
+    # --- ACTION B: Screenshot Repair ---
+    # 截图直接拿字节上传, 不再经过 "上传 -> 用公网 URL 再下载一次" 的往返
+    if not t.get("screenshotUrl"):
+        print("  [Visuals] Missing screenshot. Capturing on the warm browser pool...")
+        with METRICS.span("enrich.screenshot"):
+            if shot_future is None:
+                shot_future = screenshot_service.submit(url)
+            shot = shot_future.result()
+        if shot.ok:
+            shot_url, _ = upload_screenshot(shot.data)
+            if shot_url:
+                patch_payload["screenshotUrl"] = shot_url
+                print("  [Visuals] Screenshot repaired and uploaded to R2.")
+        else:
+            print(f"  [Visuals] Screenshot repair failed: {shot.error}")
+
+    # --- ACTION C: Deep LLM Rewrite ---
+    # If the tool was scraped from somewhere cheap, it won't have the deep fields. Let's send the spider actually into their homepage.
+    with METRICS.span("enrich.rewrite"):
+        llm_repairs = deep_process_homepage(url, name, search_future)
+    homepage_unchanged = llm_repairs == HOMEPAGE_UNCHANGED
+    if homepage_unchanged:
+        # 上次的改写已经写进数据库, 不再重复 PATCH 同样的内容
+        llm_repairs = None
+    elif llm_repairs:
+        patch_payload.update(llm_repairs)
+        print("  [Rewriting] Success. Applied new deep-curation text.")
+
+    # Submit repairs
+    if len(patch_payload) == 1: # Just the ID
+        if homepage_unchanged:
+            # 记一次退避: 改写没补齐的字段, 在主页变化前再跑也补不上, 让它在排序里往后靠
+            print("  [Skip] Homepage unchanged since the last rewrite; nothing new to apply.")
+            return "unchanged", "homepage unchanged since last rewrite"
+        print("  [Skip] No repairs were necessary or possible.")
+        return "unchanged", "no repairs possible"
+    print(f"  [Patching] Updating database for {name}...")
+    with METRICS.span("enrich.patch"):
+        patch_req = requests.patch(ENRICH_API_URL, headers=headers, json=patch_payload, timeout=10)
+    if patch_req.status_code != 200:
+        print(f"  [Error] Patch failed: {patch_req.text}")
+        if llm_repairs:
+            # 改写没写进数据库, 下次不能当作 "主页未变" 跳过 (LLM 缓存仍在, 不会重新花 token)
+            HOMEPAGES.clear_processed(url)
+        return "patch_failed", f"patch HTTP {patch_req.status_code}"
+    print(f"  [Success] {name} has been fully healed.")
+    # 截图或改写缺了一样也算部分失败, 退避后再补
+    if homepage_unchanged:
+        return "healed", "homepage unchanged since last rewrite"
+    if not llm_repairs:
+        return "healed", "rewrite failed"
+    return "healed", None
+
+
+def prefetch_shots(ranked, start, futures):
+    """
+    Queues screenshots for the next ENRICH_SHOT_PREFETCH tools that lack one, so
+    the browser pool captures them while earlier tools are busy with search/LLM.
+    """
+    for _, t in ranked[start : start + ENRICH_SHOT_PREFETCH]:
+        if not t.get("screenshotUrl") and t["id"] not in futures:
+            futures[t["id"]] = screenshot_service.submit(t["url"])
+
+
+def prefetch_searches(ranked, start, futures):
+    """
+    Queues web searches for the next ENRICH_SEARCH_PREFETCH tools on the search
+    service, so tool N+1's search runs while tool N is in the LLM. A search
+    for a tool whose homepage turns out unchanged is wasted, but cached.
+    """
+    for _, t in ranked[start : start + ENRICH_SEARCH_PREFETCH]:
+        if t["id"] not in futures:
+            futures[t["id"]] = search_service.submit(search_query(t["title_en"] or t["title_zh"]), max_results=5)
+
+
+def run_enrichment_cycle(limit=None, time_budget=None, token_budget=None):
+    """
+    Pulls a wide candidate pool, ranks it (enrich_queue.prioritize) and heals
+    the best tools until the time or token budget of this cycle is spent.
+    `limit` optionally caps the number of tools as well.
+    """
+    budget = Budget(
+        ENRICH_TIME_BUDGET_MINUTES * 60 if time_budget is None else time_budget,
+        ENRICH_TOKEN_BUDGET if token_budget is None else token_budget,
+        ENRICH_TOKENS_PER_TOOL,
+    )
+    print(f"\n--- Starting Data Enrichment Engine (budget: {budget.seconds:.0f}s / {budget.tokens} tokens) ---")
     headers = {"Authorization": f"Bearer {API_KEY}", "Content-Type": "application/json"}
+    shots = {}
+    searches = {}
     
     try:
-        # 1. Fetch stale/incomplete jobs from DB
-        r = requests.get(f"{ENRICH_API_URL}?limit={limit}", headers=headers, timeout=10)
+        # 1. Fetch a wide pool of stale/incomplete tools and rank them locally
+        r = requests.get(f"{ENRICH_API_URL}?limit={ENRICH_CANDIDATES}", headers=headers, timeout=30)
         r.raise_for_status()
         data = r.json()
-        tools = data.get("tools", [])
+        ranked = prioritize(data.get("tools", []))
         
-        if not tools:
+        if not ranked:
             print("No tools currently need enrichment. Database is perfectly healthy.")
             return
             
-        print(f"Found {len(tools)} tools needing repair or enrichment.")
+        print(f"Found {len(ranked)} tools needing repair or enrichment.")
         
-        for t in tools:
-            tool_id = t["id"]
-            url = t["url"]
+        for i, (score, t) in enumerate(ranked):
+            if limit is not None and budget.items >= limit:
+                print(f"Stopping: limit of {limit} tools reached.")
+                break
+            reason = budget.affords()
+            if reason:
+                print(f"Stopping: {reason} after {budget.items} tools, {len(ranked) - budget.items} left for later.")
+                break
+
+            prefetch_shots(ranked, i, shots)
+            prefetch_searches(ranked, i, searches)
             name = t["title_en"] or t["title_zh"]
-            
-            print(f"\n-> Healing Tool: {name} (ID: {tool_id})")
-            patch_payload = {"id": tool_id}
-            
-            # --- ACTION A: Health Check ---
+            print(f"\n-> Healing Tool: {name} (ID: {t['id']}, priority {score:.1f})")
+            started, tokens_before = time.monotonic(), tokens_used()
             try:
-                print(f"  [Health] Pinging {url}...")
-                ping = requests.head(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=10, allow_redirects=True)
-                if ping.status_code >= 400 and ping.status_code != 403: # 403 is often antibot, don't mark offline immediately
-                    print(f"  [Health] URL appears dead (Status: {ping.status_code}). Marking OFFLINE.")
-                    patch_payload["status"] = "OFFLINE"
-                    # Send early patch and skip further enrichment
-                    requests.patch(ENRICH_API_URL, headers=headers, json=patch_payload)
-                    continue
+                outcome, error = heal_tool(t, headers, shots.pop(t["id"], None), searches.pop(t["id"], None))
             except Exception as e:
-                print(f"  [Health] Ping failed ({e}). Marking OFFLINE.")
-                patch_payload["status"] = "OFFLINE"
-                requests.patch(ENRICH_API_URL, headers=headers, json=patch_payload)
-                continue
-            
-            # --- ACTION B: Screenshot Repair ---
-            # Note: TBD integrate playwright from main.py if screenshotUrl is missing.
-            if not t.get("screenshotUrl"):
-                print("  [Visuals] Missing screenshot. Spinning up headless browser...")
-                try:
-                    shot_path = capture(url, name)
-                    if shot_path:
-                        shot_url = _download_and_upload_media(shot_path, "screenshots", ".webp")
-                        if shot_url:
-                            patch_payload["screenshotUrl"] = shot_url
-                            print("  [Visuals] Screenshot repaired and uploaded to R2.")
-                except Exception as e:
-                     print(f"  [Visuals] Screenshot repair failed: {e}")
-                     
-            
-            # --- ACTION C: Deep LLM Rewrite ---
-            # If the tool was scraped from somewhere cheap, it won't have the deep fields. Let's send the spider actually into their homepage.
-            llm_repairs = deep_process_homepage(url, name)
-            if llm_repairs:
-                patch_payload.update(llm_repairs)
-                print("  [Rewriting] Success. Applied new deep-curation text.")
-                
-            # Submit repairs
-            if len(patch_payload) > 1: # More than just the ID
-                print(f"  [Patching] Updating database for {name}...")
-                patch_req = requests.patch(ENRICH_API_URL, headers=headers, json=patch_payload, timeout=10)
-                if patch_req.status_code == 200:
-                    print(f"  [Success] {name} has been fully healed.")
-                else:
-                    print(f"  [Error] Patch failed: {patch_req.text}")
+                outcome, error = "error", str(e)
+                print(f"  [Error] Healing failed: {e}")
+            METRICS.incr("enrich_tools", result=outcome)
+            if error:
+                hours = ATTEMPTS.failed(t["id"], error)
+                print(f"  [Backoff] {error}; next attempt in {hours:.0f}h.")
             else:
-                print("  [Skip] No repairs were necessary or possible.")
-            
-            time.sleep(5) # Cooldown between tools
+                ATTEMPTS.succeeded(t["id"])
+            budget.charge(time.monotonic() - started, tokens_used() - tokens_before)
+
+        print(f"Enrichment spent {budget.elapsed():.0f}s and {budget.spent_tokens} tokens on {budget.items} tools.")
 
     except Exception as e:
         print(f"Enrichment Cycle Failed: {e}")
+    finally:
+        # 预算用完后还没轮到的截图 / 搜索不再需要
+        for future in [*shots.values(), *searches.values()]:
+            future.cancel()
+        print(f"LLM cache: {LLM_CACHE.stats()}")
 
 if __name__ == "__main__":
+    check_config()
     run_enrichment_cycle()
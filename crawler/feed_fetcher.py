@@ -0,0 +1,179 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import requests
+import feedparser
+from requests.adapters import HTTPAdapter
+import crawler_env  # noqa: F401
+import state_db
+from dedup_index import normalize_url
+from metrics import METRICS
+
+# 同时抓取的 RSS 数量
+FEED_FETCH_WORKERS = int(os.getenv("FEED_FETCH_WORKERS", "8"))
+FEED_TIMEOUT = float(os.getenv("FEED_TIMEOUT", "15"))
+
+# Reddit and some RSS endpoints block default python user-agents
+FEED_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_feed_session() -> requests.Session:
+    """Keep-alive session shared by all feed fetches (separate from the authenticated API session)."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=16, pool_maxsize=FEED_FETCH_WORKERS)
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+            _session.headers.update({"User-Agent": FEED_USER_AGENT})
+        return _session
+
+
+def entry_key(entry) -> str | None:
+    """Stable identity of a feed entry: its GUID, else its normalized link."""
+    return entry.get("id") or entry.get("guid") or normalize_url(entry.get("link"))
+
+
+class FeedResult:
+    def __init__(self, url, status, entries=(), new=(), error=None):
+        self.url = url
+        self.status = status  # "ok" / "not_modified" / "error"
+        self.entries = list(entries)
+        self.new = list(new)
+        self.error = error
+
+    def is_new(self, entry) -> bool:
+        return any(e is entry for e in self.new)
+
+
+class FeedStore:
+    """
+    Per-feed HTTP validators and last body, plus the set of entries already
+    handled. A 304 re-reads the stored body, so entries left over from the
+    previous cycle (e.g. beyond a per-run cap) are still offered.
+    """
+
+    def __init__(self, filename: str = "feed_state.sqlite"):
+        self._filename = filename
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _db(self):
+        if self._conn is None:
+            self._conn = state_db.connect(self._filename)
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS feeds (
+                    url TEXT PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT,
+                    body TEXT,
+                    checked_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS seen_entries (
+                    feed_url TEXT NOT NULL,
+                    entry_key TEXT NOT NULL,
+                    seen_at REAL NOT NULL,
+                    PRIMARY KEY (feed_url, entry_key)
+                ) WITHOUT ROWID
+                """
+            )
+        return self._conn
+
+    def feed(self, url: str) -> dict | None:
+        with self._lock:
+            row = self._db().execute(
+                "SELECT etag, last_modified, body FROM feeds WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"etag": row[0], "last_modified": row[1], "body": row[2]}
+
+    def put_feed(self, url: str, etag: str | None, last_modified: str | None, body: str):
+        with self._lock:
+            self._db().execute(
+                "INSERT OR REPLACE INTO feeds (url, etag, last_modified, body, checked_at) VALUES (?, ?, ?, ?, ?)",
+                (url, etag, last_modified, body, time.time()),
+            )
+
+    def touch_feed(self, url: str):
+        with self._lock:
+            self._db().execute("UPDATE feeds SET checked_at = ? WHERE url = ?", (time.time(), url))
+
+    def unseen(self, feed_url: str, entries) -> list:
+        with self._lock:
+            db = self._db()
+            return [
+                e
+                for e in entries
+                if entry_key(e)
+                and db.execute(
+                    "SELECT 1 FROM seen_entries WHERE feed_url = ? AND entry_key = ?",
+                    (feed_url, entry_key(e)),
+                ).fetchone() is None
+            ]
+
+    def mark_seen(self, feed_url: str, entries):
+        now = time.time()
+        rows = [(feed_url, k, now) for k in map(entry_key, entries) if k]
+        if not rows:
+            return
+        with self._lock:
+            db = self._db()
+            db.execute("BEGIN")
+            db.executemany(
+                "INSERT OR IGNORE INTO seen_entries (feed_url, entry_key, seen_at) VALUES (?, ?, ?)",
+                rows,
+            )
+            db.execute("COMMIT")
+
+
+# 进程级共享
+FEEDS = FeedStore()
+
+
+def fetch_feed(url: str, proxies=None, store: FeedStore = FEEDS) -> FeedResult:
+    """Conditional GET of one feed; returns all parsed entries and the not-yet-seen ones."""
+    known = store.feed(url)
+    headers = {}
+    if known:
+        if known["etag"]:
+            headers["If-None-Match"] = known["etag"]
+        if known["last_modified"]:
+            headers["If-Modified-Since"] = known["last_modified"]
+    try:
+        with METRICS.span("feed.fetch"):
+            r = get_feed_session().get(url, headers=headers, timeout=FEED_TIMEOUT, proxies=proxies)
+        if r.status_code == 304 and known and known["body"]:
+            store.touch_feed(url)
+            status, body = "not_modified", known["body"]
+        else:
+            r.raise_for_status()
+            status, body = "ok", r.text
+            store.put_feed(url, r.headers.get("etag"), r.headers.get("last-modified"), body)
+    except Exception as e:
+        METRICS.incr("feed_fetches", status="error")
+        return FeedResult(url, "error", error=str(e))
+    METRICS.incr("feed_fetches", status=status)
+
+    entries = feedparser.parse(body).entries
+    return FeedResult(url, status, entries, store.unseen(url, entries))
+
+
+def fetch_feeds(urls, proxies=None, store: FeedStore = FEEDS) -> dict[str, FeedResult]:
+    """Fetches every feed concurrently over the shared session. Keys keep the input order."""
+    urls = list(urls)
+    if not urls:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(FEED_FETCH_WORKERS, len(urls))) as pool:
+        results = pool.map(lambda u: fetch_feed(u, proxies, store), urls)
+        return dict(zip(urls, results))
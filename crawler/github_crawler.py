@@ -1,22 +1,42 @@
 import os
+import asyncio
 import requests
-import time
-from dotenv import load_dotenv
-from llm_processor import process_tool_content
+import crawler_env  # noqa: F401
+from llm_async import process_tool_contents_async
+from llm_processor import check_config
+from dedup_index import DEDUP, refresh_tool_index
+from inject_writer import BatchWriter, TOOLS_BULK_API_URL
+from metrics import METRICS
 
-CRAWLER_ENV_PATH = os.path.join(os.path.dirname(__file__), ".env")
-load_dotenv(CRAWLER_ENV_PATH)
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com/search/repositories")
 
-API_URL = os.getenv("CRAWLER_API_URL")
-if not API_URL:
-    API_URL = "http://localhost:3000/api/admin/tools/inject"
+def _full_name(repo):
+    return f"{repo.get('owner', {}).get('login')}/{repo.get('name')}"
 
-API_KEY = os.getenv("API_SECRET_KEY")
 
-GITHUB_API_URL = "https://api.github.com/search/repositories"
+async def _analyze_repos(repos):
+    tools = []
+    for repo in repos:
+        full_name = _full_name(repo)
+        desc_en = repo.get("description") or "An open-source AI project."
+        print(f"Processing Repo: {full_name}")
+        tools.append((desc_en, full_name))
+    return await process_tool_contents_async(tools)
+
+
+def _report(full_name, repo_url):
+    def on_result(_, result):
+        if result.get("success"):
+            print(f"✅ Success injected GitHub Tool: {full_name}")
+            DEDUP.add(repo_url, source="github")
+        else:
+            print(f"❌ Failed to inject tool: {result.get('status')} {result.get('error')}")
+    return on_result
+
 
 def crawl_github_trending():
     print("\n--- Starting GitHub Open-Source AI Crawler ---")
+    refresh_tool_index()
     
     # Query for repositories created in the last 7 days with >50 stars, topic AI/LLM
     # Date logic could be dynamic, but for simplicity we rely on 'sort=stars&order=desc'
@@ -40,7 +60,8 @@ def crawl_github_trending():
         headers["Authorization"] = f"token {gh_token}"
         
     try:
-        r = requests.get(GITHUB_API_URL, headers=headers, params=params, timeout=15)
+        with METRICS.span("github.search"):
+            r = requests.get(GITHUB_API_URL, headers=headers, params=params, timeout=15)
         if r.status_code != 200:
             print(f"GitHub API Error: {r.status_code} - {r.text}")
             return
@@ -48,41 +69,32 @@ def crawl_github_trending():
         data = r.json()
         repos = data.get("items", [])
         print(f"Found {len(repos)} trending AI repositories.")
-        
-        for repo in repos:
-            name = repo.get("name")
-            owner = repo.get("owner", {}).get("login")
-            full_name = f"{owner}/{name}"
-            repo_url = repo.get("html_url")
-            desc_en = repo.get("description") or "An open-source AI project."
-            
-            print(f"Processing Repo: {full_name}")
-            
-            # Use the existing deepseek brain. It expects text and name.
-            ai_info = process_tool_content(desc_en, full_name)
-            
-            # Ensure github urls go into an open-source or dev category
-            payload = {
-                **ai_info,
-                "url": repo_url,
-                "logo": repo.get("owner", {}).get("avatar_url"),
-                "region": "Global",
-                "categorySlug": "coding", # Default mapped to dev/coding
-            }
-            
-            # Post to Next.js API
-            inject_headers = {"Authorization": f"Bearer {API_KEY}", "Content-Type": "application/json"}
-            inject_res = requests.post(API_URL, headers=inject_headers, json=payload, timeout=15)
-            
-            if inject_res.status_code == 200:
-                print(f"✅ Success injected GitHub Tool: {full_name}")
-            else:
-                print(f"❌ Failed to inject tool: {inject_res.status_code}")
-                
-            time.sleep(3) # Throttle LLM calls
-            
+        repos = [r for r in repos if not DEDUP.contains(r.get("html_url"))]
+        print(f"{len(repos)} of them are not in the dedup index yet.")
+
+        # Use the existing deepseek brain. It expects text and name.
+        # All repos are analyzed concurrently; the shared rate limiter paces the calls.
+        with METRICS.span("github.analyze"):
+            ai_infos = asyncio.run(_analyze_repos(repos))
+
+        # Post to Next.js API in batches over one keep-alive session
+        with BatchWriter(TOOLS_BULK_API_URL) as writer:
+            for repo, ai_info in zip(repos, ai_infos):
+                repo_url = repo.get("html_url")
+
+                # Ensure github urls go into an open-source or dev category
+                payload = {
+                    **ai_info,
+                    "url": repo_url,
+                    "logo": repo.get("owner", {}).get("avatar_url"),
+                    "region": "Global",
+                    "categorySlug": "coding", # Default mapped to dev/coding
+                }
+                writer.add(payload, on_result=_report(_full_name(repo), repo_url))
+
     except Exception as e:
         print(f"Failed to crawl GitHub: {e}")
 
 if __name__ == "__main__":
+    check_config()
     crawl_github_trending()
@@ -0,0 +1,303 @@
+import os
+import json
+import time
+import asyncio
+import threading
+from urllib.parse import urlsplit
+import httpx
+import crawler_env  # noqa: F401
+import state_db
+from inject_writer import get_session
+from metrics import METRICS
+
+API_URL = os.getenv("CRAWLER_API_URL")
+if os.getenv("ENRICH_API_URL"):
+    ENRICH_API_URL = os.getenv("ENRICH_API_URL")
+elif API_URL:
+    ENRICH_API_URL = API_URL.replace("/tools/inject", "/tools/enrich")
+else:
+    ENRICH_API_URL = "http://localhost:3000/api/admin/tools/enrich"
+
+# 全局并发与单个主机的并发上限
+HEALTH_CONCURRENCY = int(os.getenv("HEALTH_CONCURRENCY", "200"))
+HEALTH_PER_HOST = int(os.getenv("HEALTH_PER_HOST", "4"))
+HEALTH_TIMEOUT = float(os.getenv("HEALTH_TIMEOUT", "10"))
+HEALTH_MAX_REDIRECTS = int(os.getenv("HEALTH_MAX_REDIRECTS", "10"))
+# 连续失败多少次才标记 OFFLINE, 避免一次抖动就下线
+HEALTH_OFFLINE_AFTER = int(os.getenv("HEALTH_OFFLINE_AFTER", "2"))
+# 这段时间内检查过的工具不再重复检查
+HEALTH_RECHECK_HOURS = float(os.getenv("HEALTH_RECHECK_HOURS", "6"))
+HEALTH_LIST_PAGE = int(os.getenv("HEALTH_LIST_PAGE", "1000"))
+HEALTH_PATCH_BATCH = int(os.getenv("HEALTH_PATCH_BATCH", "100"))
+
+HEALTH_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+# 反爬 / 限流的状态码说明站点还活着
+BLOCKED_STATUSES = {401, 403, 429}
+
+
+def is_alive(status_code: int | None) -> bool:
+    return status_code is not None and (status_code < 400 or status_code in BLOCKED_STATUSES)
+
+
+class HealthStore:
+    """
+    Last liveness result per tool: status code, redirect chain, latency and
+    the number of consecutive failed checks (reset by any successful one).
+    """
+
+    def __init__(self, filename: str = "health.sqlite"):
+        self._filename = filename
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _db(self):
+        if self._conn is None:
+            self._conn = state_db.connect(self._filename)
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS health (
+                    tool_id TEXT PRIMARY KEY,
+                    url TEXT NOT NULL,
+                    alive INTEGER NOT NULL,
+                    status_code INTEGER,
+                    method TEXT,
+                    final_url TEXT,
+                    redirects TEXT,
+                    latency_ms INTEGER,
+                    error TEXT,
+                    failures INTEGER NOT NULL,
+                    checked_at REAL NOT NULL
+                )
+                """
+            )
+        return self._conn
+
+    def get(self, tool_id: str) -> dict | None:
+        with self._lock:
+            cur = self._db().execute("SELECT * FROM health WHERE tool_id = ?", (tool_id,))
+            row = cur.fetchone()
+            if row is None:
+                return None
+            result = dict(zip([c[0] for c in cur.description], row))
+        result["alive"] = bool(result["alive"])
+        result["redirects"] = json.loads(result["redirects"] or "[]")
+        return result
+
+    def checked_since(self, since: float) -> set:
+        with self._lock:
+            rows = self._db().execute("SELECT tool_id FROM health WHERE checked_at >= ?", (since,)).fetchall()
+        return {r[0] for r in rows}
+
+    def record(self, tool_id: str, url: str, check: dict) -> int:
+        """Stores one check and returns the consecutive failure count after it."""
+        with self._lock:
+            db = self._db()
+            row = db.execute("SELECT failures FROM health WHERE tool_id = ?", (tool_id,)).fetchone()
+            failures = 0 if check["alive"] else (row[0] if row else 0) + 1
+            db.execute(
+                """
+                INSERT OR REPLACE INTO health
+                    (tool_id, url, alive, status_code, method, final_url, redirects, latency_ms, error, failures, checked_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    tool_id, url, int(check["alive"]), check["status_code"], check["method"],
+                    check["final_url"], json.dumps(check["redirects"]), check["latency_ms"],
+                    check["error"], failures, time.time(),
+                ),
+            )
+        return failures
+
+
+# 进程级共享
+HEALTH = HealthStore()
+
+
+def new_client(concurrency: int = HEALTH_CONCURRENCY) -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        follow_redirects=True,
+        max_redirects=HEALTH_MAX_REDIRECTS,
+        timeout=HEALTH_TIMEOUT,
+        headers={"User-Agent": HEALTH_USER_AGENT},
+        limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=min(concurrency, 50)),
+    )
+
+
+async def _request(client: httpx.AsyncClient, method: str, url: str) -> httpx.Response:
+    # GET 只读响应头, 不下载正文
+    async with client.stream(method, url) as response:
+        return response
+
+
+async def check_url(client: httpx.AsyncClient, url: str) -> dict:
+    """
+    HEAD, falling back to GET when the server rejects HEAD (405/501 or any other
+    error status; many sites only answer GET properly). Returns the outcome with
+    the redirect chain and total latency.
+    """
+    started = time.monotonic()
+    response, method, error = None, "HEAD", None
+    try:
+        with METRICS.span("health.check"):
+            try:
+                response = await _request(client, "HEAD", url)
+            except (httpx.RemoteProtocolError, httpx.ReadError, httpx.ReadTimeout) as e:
+                # 部分服务器对 HEAD 直接断开连接
+                error = f"HEAD: {e!r}"
+            if response is None or response.status_code >= 400:
+                method = "GET"
+                response = await _request(client, "GET", url)
+                error = None
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+
+    if response is not None:
+        chain = [{"url": str(r.url), "status": r.status_code} for r in response.history]
+        status_code, final_url = response.status_code, str(response.url)
+    else:
+        chain, status_code, final_url = [], None, None
+    alive = is_alive(status_code)
+    METRICS.incr("health_checks", result="alive" if alive else ("dead" if status_code else "error"))
+    return {
+        "alive": alive,
+        "status_code": status_code,
+        "method": method,
+        "final_url": final_url,
+        "redirects": chain,
+        "latency_ms": int((time.monotonic() - started) * 1000),
+        "error": error,
+    }
+
+
+async def sweep(tools: list[dict], concurrency: int = HEALTH_CONCURRENCY, per_host: int = HEALTH_PER_HOST) -> list:
+    """Checks every `{id, url}` concurrently; at most `per_host` requests hit one host at a time."""
+    overall = asyncio.Semaphore(concurrency)
+    hosts = {}
+
+    async def one(tool):
+        host = (urlsplit(tool["url"]).hostname or "").lower()
+        limit = hosts.setdefault(host, asyncio.Semaphore(per_host))
+        # 先占主机名额再占全局名额, 热门主机排队时不占用全局并发
+        async with limit, overall:
+            return tool, await check_url(client, tool["url"])
+
+    async with new_client(concurrency) as client:
+        return await asyncio.gather(*(one(t) for t in tools))
+
+
+def check_tool(tool_id: str, url: str, store: HealthStore = HEALTH) -> tuple[dict, int]:
+    """Synchronous single check for callers outside an event loop; the result is stored."""
+
+    async def run():
+        async with new_client(1) as client:
+            return await check_url(client, url)
+
+    check = asyncio.run(run())
+    return check, store.record(tool_id, url, check)
+
+
+def transition(current_status: str | None, check: dict, failures: int) -> str | None:
+    """
+    The status change to send for one tool, if any. "ONLINE" asks the API to
+    restore whatever status the tool had before it went OFFLINE.
+    """
+    if current_status == "OFFLINE":
+        return "ONLINE" if check["alive"] else None
+    if not check["alive"] and failures >= HEALTH_OFFLINE_AFTER:
+        return "OFFLINE"
+    return None
+
+
+def patch_statuses(changes: list[dict]) -> dict:
+    """
+    Sends `{id, status}` changes to the enrich API in batches. Falls back to
+    one PATCH per tool when the deployed route has no batch form yet.
+    Returns per-id success.
+    """
+    session = get_session()
+    outcome = {}
+    for i in range(0, len(changes), HEALTH_PATCH_BATCH):
+        batch = changes[i : i + HEALTH_PATCH_BATCH]
+        try:
+            with METRICS.span("health.patch_batch"):
+                r = session.patch(ENRICH_API_URL, json={"items": batch}, timeout=60)
+            if r.status_code == 400 and "Missing Tool ID" in r.text:
+                for change in batch:
+                    single = session.patch(ENRICH_API_URL, json=change, timeout=10)
+                    outcome[change["id"]] = single.status_code == 200
+                continue
+            r.raise_for_status()
+            for res in r.json().get("results", []):
+                outcome[batch[res["index"]]["id"]] = bool(res.get("success"))
+        except Exception as e:
+            print(f"  [Health] Status PATCH failed for {len(batch)} tools: {e}")
+            for change in batch:
+                outcome.setdefault(change["id"], False)
+    return outcome
+
+
+def fetch_catalog() -> list[dict]:
+    """All sweepable tools ({id, url, status}), paged from the enrich API."""
+    session = get_session()
+    tools, cursor = [], ""
+    while True:
+        r = session.get(
+            ENRICH_API_URL,
+            params={"mode": "health", "limit": HEALTH_LIST_PAGE, "cursor": cursor},
+            timeout=30,
+        )
+        r.raise_for_status()
+        data = r.json()
+        tools.extend(data.get("tools", []))
+        if not data.get("hasMore") or not data.get("cursor"):
+            return tools
+        cursor = data["cursor"]
+
+
+def run_health_sweep(limit: int | None = None, store: HealthStore = HEALTH):
+    print("\n--- Starting Tool Health Sweep ---")
+    try:
+        catalog = fetch_catalog()
+    except Exception as e:
+        print(f"Health sweep could not list tools: {e}")
+        return
+
+    recent = store.checked_since(time.time() - HEALTH_RECHECK_HOURS * 3600)
+    due = [t for t in catalog if t.get("url") and t["id"] not in recent]
+    if limit:
+        due = due[:limit]
+    print(f"{len(catalog)} tools in catalog, {len(due)} due for a check.")
+    if not due:
+        return
+
+    started = time.monotonic()
+    results = asyncio.run(sweep(due))
+    elapsed = time.monotonic() - started
+
+    changes, alive = [], 0
+    for tool, check in results:
+        failures = store.record(tool["id"], tool["url"], check)
+        alive += check["alive"]
+        status = transition(tool.get("status"), check, failures)
+        if status:
+            changes.append({"id": tool["id"], "status": status})
+            detail = check["error"] or f"HTTP {check['status_code']}"
+            print(f"  [Health] {tool['url']} -> {status} ({detail})")
+
+    outcome = patch_statuses(changes) if changes else {}
+    for change in changes:
+        METRICS.incr(
+            "health_transitions",
+            to=change["status"].lower(),
+            result="ok" if outcome.get(change["id"]) else "failed",
+        )
+    print(
+        f"Checked {len(results)} tools in {elapsed:.1f}s ({len(results) / max(elapsed, 0.001):.0f}/s): "
+        f"{alive} alive, {len(results) - alive} failing, "
+        f"{sum(outcome.values())}/{len(changes)} status changes applied."
+    )
+
+
+if __name__ == "__main__":
+    run_health_sweep()
@@ -0,0 +1,158 @@
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+from collections import Counter
+import crawler_env  # noqa: F401
+import state_db
+from dedup_index import normalize_url
+
+# 汉明距离不超过该值 (64 位中) 视为内容没有实质变化
+HOMEPAGE_SIMHASH_DISTANCE = int(os.getenv("HOMEPAGE_SIMHASH_DISTANCE", "3"))
+# 超过这个天数即使主页没变也重新改写一次
+HOMEPAGE_REWRITE_MAX_DAYS = float(os.getenv("HOMEPAGE_REWRITE_MAX_DAYS", "90"))
+
+_MASK = (1 << 64) - 1
+_WORD_RE = re.compile(r"[a-z0-9]+|[\u4e00-\u9fff]+")
+
+
+def _features(text: str) -> Counter:
+    """Latin words as-is, CJK runs as character bigrams (there are no spaces to split on)."""
+    feats = Counter()
+    for token in _WORD_RE.findall(text.lower()):
+        if token[0] >= "\u4e00" and len(token) > 1:
+            feats.update(token[i : i + 2] for i in range(len(token) - 1))
+        else:
+            feats[token] += 1
+    return feats
+
+
+def simhash(text: str) -> int:
+    """64-bit SimHash of `text`; near-identical pages land within a few bits of each other."""
+    weights = [0] * 64
+    for feat, count in _features(text).items():
+        h = int.from_bytes(hashlib.blake2b(feat.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(64):
+            weights[bit] += count if h >> bit & 1 else -count
+    return sum(1 << bit for bit in range(64) if weights[bit] > 0)
+
+
+def hamming(a: int, b: int) -> int:
+    return bin((a ^ b) & _MASK).count("1")
+
+
+def _to_db(h: int) -> int:
+    # SQLite INTEGER 是有符号 64 位
+    return h - (1 << 64) if h >= 1 << 63 else h
+
+
+def _from_db(v: int | None) -> int | None:
+    return None if v is None else v & _MASK
+
+
+class HomepageStore:
+    """
+    Last fetched snapshot of each tool homepage (cleaned text, SimHash and
+    HTTP validators) plus the fingerprint and LLM result of the version that
+    was last rewritten, so an unchanged site does not get rewritten again.
+    """
+
+    def __init__(self, filename: str = "homepages.sqlite"):
+        self._filename = filename
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _db(self):
+        if self._conn is None:
+            self._conn = state_db.connect(self._filename)
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS homepages (
+                    key TEXT PRIMARY KEY,
+                    url TEXT NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    text TEXT,
+                    simhash INTEGER,
+                    fetched_at REAL,
+                    processed_simhash INTEGER,
+                    processed_version INTEGER,
+                    processed_result TEXT,
+                    processed_at REAL
+                )
+                """
+            )
+        return self._conn
+
+    def get(self, url: str) -> dict | None:
+        with self._lock:
+            cur = self._db().execute("SELECT * FROM homepages WHERE key = ?", (normalize_url(url),))
+            row = cur.fetchone()
+            if row is None:
+                return None
+            snap = dict(zip([c[0] for c in cur.description], row))
+        snap["simhash"] = _from_db(snap["simhash"])
+        snap["processed_simhash"] = _from_db(snap["processed_simhash"])
+        return snap
+
+    def put_fetch(self, url: str, text: str, fingerprint: int, etag: str | None, last_modified: str | None):
+        with self._lock:
+            self._db().execute(
+                """
+                INSERT INTO homepages (key, url, etag, last_modified, text, simhash, fetched_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    url = excluded.url, etag = excluded.etag, last_modified = excluded.last_modified,
+                    text = excluded.text, simhash = excluded.simhash, fetched_at = excluded.fetched_at
+                """,
+                (normalize_url(url), url, etag, last_modified, text, _to_db(fingerprint), time.time()),
+            )
+
+    def touch(self, url: str):
+        with self._lock:
+            self._db().execute("UPDATE homepages SET fetched_at = ? WHERE key = ?", (time.time(), normalize_url(url)))
+
+    def put_processed(self, url: str, fingerprint: int, version: int, result: dict):
+        with self._lock:
+            self._db().execute(
+                """
+                UPDATE homepages SET processed_simhash = ?, processed_version = ?, processed_result = ?, processed_at = ?
+                WHERE key = ?
+                """,
+                (_to_db(fingerprint), version, json.dumps(result, ensure_ascii=False), time.time(), normalize_url(url)),
+            )
+
+    def clear_processed(self, url: str):
+        """Forgets the last rewrite, e.g. when it never made it into the database."""
+        with self._lock:
+            self._db().execute(
+                """
+                UPDATE homepages SET processed_simhash = NULL, processed_version = NULL, processed_result = NULL,
+                    processed_at = NULL
+                WHERE key = ?
+                """,
+                (normalize_url(url),),
+            )
+
+    def unchanged_result(self, url: str, fingerprint: int, version: int) -> dict | None:
+        """
+        The stored rewrite when the page is within HOMEPAGE_SIMHASH_DISTANCE of
+        the version it was made from, with the same prompt version and not
+        older than HOMEPAGE_REWRITE_MAX_DAYS; None when a rewrite is due.
+        """
+        snap = self.get(url)
+        if not snap or snap["processed_simhash"] is None or not snap["processed_result"]:
+            return None
+        if snap["processed_version"] != version:
+            return None
+        if time.time() - snap["processed_at"] > HOMEPAGE_REWRITE_MAX_DAYS * 86400:
+            return None
+        if hamming(snap["processed_simhash"], fingerprint) > HOMEPAGE_SIMHASH_DISTANCE:
+            return None
+        return json.loads(snap["processed_result"])
+
+
+# 进程级共享
+HOMEPAGES = HomepageStore()
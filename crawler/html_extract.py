@@ -0,0 +1,128 @@
+"""
+Pure HTML extraction, the target of the html_parse process pool. Spawned
+workers import only this module (and the parser libraries), so keep crawler
+config, metrics and shared state out of it.
+"""
+try:
+    from selectolax.lexbor import LexborHTMLParser as _SelectolaxParser
+except ImportError:
+    try:
+        from selectolax.parser import HTMLParser as _SelectolaxParser
+    except ImportError:
+        _SelectolaxParser = None
+
+try:
+    import lxml  # noqa: F401  仅用于判断 BeautifulSoup 能否使用 lxml 解析器
+    _HAS_LXML = True
+except ImportError:
+    _HAS_LXML = False
+
+from bs4 import BeautifulSoup
+
+# OneNav 主题 (aigc.cn) 的工具卡片选择器
+AIGC_CN_CARDS = {
+    "card": ".url-card",
+    "title": ".item-title, strong, h4",
+    "link": "a",
+    "link_attrs": ("data-url", "href"),
+    "desc": ".item-desc, .xe-content",
+    "img": "img",
+    "img_attrs": ("data-src", "src"),
+}
+
+# 抽正文时整体丢弃的噪声标签
+NOISE_TAGS = ["script", "style", "nav", "footer", "header", "noscript"]
+
+
+def available_backends() -> list[str]:
+    backends = []
+    if _SelectolaxParser is not None:
+        backends.append("selectolax")
+    if _HAS_LXML:
+        backends.append("lxml")
+    backends.append("html.parser")
+    return backends
+
+
+def _first_attr(attrs, names) -> str | None:
+    for name in names:
+        if attrs.get(name):
+            return attrs[name]
+    return None
+
+
+def _cards_selectolax(html: str, spec: dict) -> list[dict]:
+    tree = _SelectolaxParser(html)
+    records = []
+    for card in tree.css(spec["card"]):
+        title_el = card.css_first(spec["title"])
+        link_el = card.css_first(spec["link"])
+        desc_el = card.css_first(spec["desc"])
+        img_el = card.css_first(spec["img"])
+        records.append(
+            {
+                "name": title_el.text(strip=True) if title_el else None,
+                "link": _first_attr(link_el.attributes, spec["link_attrs"]) if link_el else None,
+                "desc": desc_el.text(strip=True) if desc_el else None,
+                "logo": _first_attr(img_el.attributes, spec["img_attrs"]) if img_el else None,
+            }
+        )
+    return records
+
+
+def _cards_soup(html: str, spec: dict, features: str) -> list[dict]:
+    soup = BeautifulSoup(html, features)
+    records = []
+    for card in soup.select(spec["card"]):
+        title_el = card.select_one(spec["title"])
+        link_el = card.select_one(spec["link"])
+        desc_el = card.select_one(spec["desc"])
+        img_el = card.select_one(spec["img"])
+        records.append(
+            {
+                "name": title_el.get_text(strip=True) if title_el else None,
+                "link": _first_attr(link_el.attrs, spec["link_attrs"]) if link_el else None,
+                "desc": desc_el.get_text(strip=True) if desc_el else None,
+                "logo": _first_attr(img_el.attrs, spec["img_attrs"]) if img_el else None,
+            }
+        )
+    return records
+
+
+def extract_cards(html: str, spec: dict = AIGC_CN_CARDS, backend: str | None = None) -> list[dict]:
+    """
+    Turns a listing page into raw card records {name, link, desc, logo}.
+    Missing fields are None; filtering and defaults are left to the caller.
+    Without `backend` the fastest installed one is used.
+    """
+    backend = backend or available_backends()[0]
+    if backend == "selectolax":
+        return _cards_selectolax(html, spec)
+    return _cards_soup(html, spec, backend)
+
+
+def _text_selectolax(html: str) -> str:
+    tree = _SelectolaxParser(html)
+    tree.strip_tags(NOISE_TAGS)
+    # 从根节点取文本, 与 BeautifulSoup 一致地保留 <title>
+    root = tree.root
+    if root is None:
+        return ""
+    return " ".join(root.text(separator=" ", strip=True).split())
+
+
+def _text_soup(html: str, features: str) -> str:
+    soup = BeautifulSoup(html, features)
+    for el in soup(NOISE_TAGS):
+        el.decompose()
+    return soup.get_text(separator=" ", strip=True)
+
+
+def extract_text(html: str, limit: int | None = None, backend: str | None = None) -> str:
+    """Visible page text with scripts, styles and page chrome removed."""
+    backend = backend or available_backends()[0]
+    if backend == "selectolax":
+        text = _text_selectolax(html)
+    else:
+        text = _text_soup(html, backend)
+    return text[:limit] if limit else text
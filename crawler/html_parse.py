@@ -0,0 +1,57 @@
+import os
+import atexit
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import crawler_env  # noqa: F401
+from html_extract import AIGC_CN_CARDS, available_backends, extract_cards, extract_text  # noqa: F401
+from metrics import METRICS
+
+# 强制指定解析后端 (selectolax / lxml / html.parser), 留空自动选择最快的可用后端
+HTML_PARSER = os.getenv("HTML_PARSER", "").strip()
+# HTML 解析进程数 (0 = 在调用线程内直接解析)
+HTML_PARSE_WORKERS = int(os.getenv("HTML_PARSE_WORKERS", "2"))
+
+
+def default_backend() -> str:
+    backends = available_backends()
+    if HTML_PARSER in backends:
+        return HTML_PARSER
+    return backends[0]
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn: 父进程里有 Playwright 等线程, fork 出来的子进程可能死锁.
+            # 子进程只需要 html_extract; 入口模块仍会被重新导入, 所以入口模块导入时不能有副作用
+            _executor = ProcessPoolExecutor(
+                max_workers=HTML_PARSE_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            atexit.register(_executor.shutdown)
+        return _executor
+
+
+def _run(fn, *args):
+    # 后端在父进程里选好再传给子进程, 子进程不读配置
+    args = (*args, default_backend())
+    with METRICS.span(f"html.{fn.__name__}"):
+        if HTML_PARSE_WORKERS <= 0:
+            return fn(*args)
+        return _get_executor().submit(fn, *args).result(timeout=120)
+
+
+def parse_cards(html: str, spec: dict = AIGC_CN_CARDS) -> list[dict]:
+    """extract_cards in the parse process pool, keeping crawler threads free."""
+    return _run(extract_cards, html, spec)
+
+
+def parse_text(html: str, limit: int | None = None) -> str:
+    """extract_text in the parse process pool."""
+    return _run(extract_text, html, limit)
@@ -0,0 +1,158 @@
+import os
+import time
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+import crawler_env  # noqa: F401
+from dedup_index import api_origin
+from metrics import METRICS
+
+API_KEY = os.getenv("API_SECRET_KEY")
+_ORIGIN = api_origin(os.getenv("CRAWLER_API_URL"))
+
+TOOLS_BULK_API_URL = os.getenv("TOOLS_BULK_API_URL") or f"{_ORIGIN}/api/admin/tools/inject/bulk"
+NEWS_BULK_API_URL = os.getenv("NEWS_BULK_API_URL") or f"{_ORIGIN}/api/admin/news/inject/bulk"
+CRAWLER_LOG_API_URL = os.getenv("CRAWLER_LOG_API_URL") or f"{_ORIGIN}/api/admin/system/crawler-log"
+# 每次定时任务结束后把运行摘要写入 CrawlerLog
+CRAWLER_LOG_ENABLED = os.getenv("CRAWLER_LOG_ENABLED", "1") != "0"
+
+# 批量写入: 满 N 条或距第一条入队超过 T 秒即刷出
+INJECT_BATCH_SIZE = int(os.getenv("INJECT_BATCH_SIZE", "20"))
+INJECT_FLUSH_SECONDS = float(os.getenv("INJECT_FLUSH_SECONDS", "5"))
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Process-wide keep-alive session for talking to the Next.js API."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+            _session.headers.update(
+                {"Authorization": f"Bearer {API_KEY}", "Content-Type": "application/json"}
+            )
+        return _session
+
+
+class BatchWriter:
+    """
+    Collects inject payloads and POSTs them as `{"items": [...]}` to a bulk
+    route. `on_result(payload, result)` is called once per item with the
+    server's per-item result (`result["success"]` tells the outcome).
+
+    If the bulk route is missing (404/405) the batch is replayed item by item
+    against the single route, so older deployments keep working.
+    """
+
+    def __init__(
+        self,
+        bulk_url: str,
+        batch_size: int = INJECT_BATCH_SIZE,
+        flush_seconds: float = INJECT_FLUSH_SECONDS,
+        timeout: float = 60,
+    ):
+        self.bulk_url = bulk_url
+        self.single_url = bulk_url.rsplit("/bulk", 1)[0]
+        self.batch_size = max(1, batch_size)
+        self.flush_seconds = flush_seconds
+        self.timeout = timeout
+        self.session = get_session()
+        self._pending = []
+        self._oldest = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._closed = threading.Event()
+        # 第一次 add 时才启动定时刷新线程, 模块级的写入器导入时不起线程
+        self._timer = None
+
+    def add(self, payload: dict, on_result=None):
+        with self._lock:
+            if self._timer is None:
+                self._timer = threading.Thread(target=self._tick, daemon=True, name="inject-writer")
+                self._timer.start()
+            self._pending.append((payload, on_result))
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self.flush()
+
+    def _tick(self):
+        while not self._closed.wait(0.5):
+            with self._lock:
+                due = self._oldest is not None and time.monotonic() - self._oldest >= self.flush_seconds
+            if due:
+                self.flush()
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending, self._oldest = self._pending, [], None
+            for i in range(0, len(batch), self.batch_size):
+                self._send(batch[i : i + self.batch_size])
+
+    def close(self):
+        self._closed.set()
+        if self._timer is not None:
+            self._timer.join(timeout=5)
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _send(self, batch):
+        payloads = [p for p, _ in batch]
+        try:
+            with METRICS.span("api.inject_batch"):
+                r = self.session.post(self.bulk_url, json={"items": payloads}, timeout=self.timeout)
+            if r.status_code in (404, 405):
+                results = self._send_singly(payloads)
+            elif r.status_code == 200:
+                results = {res["index"]: res for res in r.json().get("results", [])}
+            else:
+                error = f"bulk inject HTTP {r.status_code}: {r.text[:200]}"
+                results = {i: {"success": False, "error": error} for i in range(len(batch))}
+        except Exception as e:
+            results = {i: {"success": False, "error": str(e)} for i in range(len(batch))}
+
+        for i, (payload, on_result) in enumerate(batch):
+            result = results.get(i, {"success": False, "error": "missing result"})
+            METRICS.incr("inject_items", result="ok" if result.get("success") else "failed")
+            if on_result is not None:
+                try:
+                    on_result(payload, result)
+                except Exception as e:
+                    print(f"Inject result handler failed: {e}")
+
+    def _send_singly(self, payloads):
+        results = {}
+        for i, payload in enumerate(payloads):
+            try:
+                r = self.session.post(self.single_url, json=payload, timeout=20)
+                if r.status_code == 200:
+                    results[i] = {"success": True}
+                else:
+                    results[i] = {"success": False, "status": r.status_code, "error": r.text[:200]}
+            except Exception as e:
+                results[i] = {"success": False, "error": str(e)}
+        return results
+
+
+def post_crawler_log(summary: dict):
+    """Stores a metrics.run_summary() as a CrawlerLog row through the admin API."""
+    if not CRAWLER_LOG_ENABLED:
+        return
+    try:
+        r = get_session().post(CRAWLER_LOG_API_URL, json=summary, timeout=10)
+        if r.status_code != 200:
+            print(f"CrawlerLog write failed: HTTP {r.status_code} {r.text[:200]}")
+    except Exception as e:
+        print(f"CrawlerLog write failed: {e}")
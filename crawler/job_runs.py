@@ -0,0 +1,91 @@
+import os
+import time
+import threading
+from contextlib import contextmanager
+import state_db
+
+try:
+    import fcntl
+except ImportError:  # Windows: 只保留进程内的 max_instances 保护
+    fcntl = None
+
+
+class JobRunStore:
+    """
+    Persisted start/finish times of scheduled jobs, so a restarted scheduler
+    knows what is actually due instead of re-running everything.
+    """
+
+    def __init__(self, filename: str = "job_runs.sqlite"):
+        self._filename = filename
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _db(self):
+        if self._conn is None:
+            self._conn = state_db.connect(self._filename)
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS job_runs (
+                    job_id TEXT PRIMARY KEY,
+                    last_start REAL,
+                    last_end REAL,
+                    last_status TEXT,
+                    last_error TEXT
+                )
+                """
+            )
+        return self._conn
+
+    def last_run(self, job_id: str) -> dict | None:
+        with self._lock:
+            row = self._db().execute(
+                "SELECT last_start, last_end, last_status, last_error FROM job_runs WHERE job_id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {"last_start": row[0], "last_end": row[1], "last_status": row[2], "last_error": row[3]}
+
+    def started(self, job_id: str):
+        with self._lock:
+            self._db().execute(
+                """
+                INSERT INTO job_runs (job_id, last_start, last_status) VALUES (?, ?, 'running')
+                ON CONFLICT(job_id) DO UPDATE SET last_start = excluded.last_start, last_status = 'running'
+                """,
+                (job_id, time.time()),
+            )
+
+    def finished(self, job_id: str, status: str, error: str | None = None):
+        with self._lock:
+            self._db().execute(
+                "UPDATE job_runs SET last_end = ?, last_status = ?, last_error = ? WHERE job_id = ?",
+                (time.time(), status, error, job_id),
+            )
+
+
+@contextmanager
+def job_lock(job_id: str):
+    """
+    Non-blocking cross-process lock per job (flock on a file in STATE_DIR).
+    Yields False when another process already runs the job.
+    """
+    if fcntl is None:
+        yield True
+        return
+    os.makedirs(state_db.STATE_DIR, exist_ok=True)
+    with open(os.path.join(state_db.STATE_DIR, f"{job_id}.lock"), "w") as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+# 进程级共享
+JOB_RUNS = JobRunStore()
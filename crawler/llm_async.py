@@ -0,0 +1,242 @@
+import asyncio
+import os
+import weakref
+from openai import AsyncOpenAI
+from llm_processor import (
+    DEEPSEEK_API_KEY,
+    DEEPSEEK_BASE_URL,
+    MODEL,
+    LLM_MAX_RETRIES,
+    LLM_TOOL_BATCH_SIZE,
+    YOUTUBE_SYSTEM_PROMPT,
+    YOUTUBE_TRANSCRIPT_LIMIT,
+    parse_json_content,
+    cache_key,
+    cached_result,
+    is_retryable,
+    retry_wait,
+    build_tool_prompt,
+    build_tool_batch_prompt,
+    tool_cache_lookup,
+    tool_batch_max_tokens,
+    tool_batches,
+    store_tool_batch,
+    build_news_prompt,
+    build_youtube_prompt,
+    build_youtube_chunk_prompt,
+    build_youtube_synthesis_prompt,
+    chunk_transcript,
+    YOUTUBE_CHUNK_FALLBACK_CHARS,
+    fallback_tool_content,
+    fallback_news_content,
+    fallback_youtube_content,
+)
+from rate_limiter import LLM_LIMITER, estimate_tokens
+from llm_cache import LLM_CACHE
+from metrics import METRICS
+
+# 同时在途的 DeepSeek 请求上限 (每个事件循环)
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "8"))
+
+# AsyncOpenAI 底层的 httpx 连接池与 Semaphore 都绑定在事件循环上,
+# 因此每个循环共享一份, 循环结束后自动回收
+_loop_state = weakref.WeakKeyDictionary()
+
+
+def _state():
+    loop = asyncio.get_running_loop()
+    state = _loop_state.get(loop)
+    if state is None:
+        state = (
+            AsyncOpenAI(api_key=DEEPSEEK_API_KEY, base_url=DEEPSEEK_BASE_URL, max_retries=0),
+            asyncio.Semaphore(LLM_MAX_IN_FLIGHT),
+        )
+        _loop_state[loop] = state
+    return state
+
+
+async def chat_json_async(messages, strict=True, max_tokens=None):
+    """Async counterpart of llm_processor.chat_json, sharing its process-wide rate limiter."""
+    client, in_flight = _state()
+    extra = {"max_tokens": max_tokens} if max_tokens else {}
+    est = estimate_tokens("".join(m["content"] for m in messages))
+    attempt = 0
+    while True:
+        with METRICS.span("llm.rate_wait"):
+            await LLM_LIMITER.acquire_async(est)
+        try:
+            async with in_flight:
+                with METRICS.span("llm.request"):
+                    response = await client.chat.completions.create(
+                        model=MODEL,
+                        messages=messages,
+                        response_format={"type": "json_object"},
+                        **extra,
+                    )
+        except Exception as e:
+            if not is_retryable(e) or attempt >= LLM_MAX_RETRIES:
+                raise
+            METRICS.incr("llm_retries")
+            wait = retry_wait(e, attempt)
+            print(f"DeepSeek transient error ({e.__class__.__name__}), retrying in {wait:.1f}s...")
+            await asyncio.sleep(wait)
+            attempt += 1
+            continue
+
+        usage = getattr(response, "usage", None)
+        LLM_LIMITER.settle(est, usage.total_tokens if usage else None)
+        if usage:
+            METRICS.incr("llm_tokens", usage.total_tokens)
+        return parse_json_content(response.choices[0].message.content, strict=strict)
+
+
+async def process_tool_content_async(raw_description, tool_name):
+    key = cache_key("tool", raw_description, tool_name)
+    cached = cached_result(key, tool_name)
+    if cached is not None:
+        return cached
+    return await _analyze_tool_async(key, raw_description, tool_name)
+
+
+async def _analyze_tool_async(key, raw_description, tool_name):
+    print(f"DeepSeek (async) is analyzing: {tool_name}...")
+    prompt = build_tool_prompt(raw_description, tool_name)
+    try:
+        result = await chat_json_async([{"role": "user", "content": prompt}])
+    except Exception as e:
+        print(f"DeepSeek Processing Error: {e}")
+        return fallback_tool_content(raw_description, tool_name)
+    LLM_CACHE.put(key, "tool", result)
+    return result
+
+
+async def _process_tool_batch_async(batch, results):
+    if len(batch) == 1:
+        i, key, desc, name = batch[0]
+        results[i] = await _analyze_tool_async(key, desc, name)
+        return
+    print(f"DeepSeek (async batch of {len(batch)}) is analyzing: {', '.join(name for _, _, _, name in batch)}...")
+    prompt = build_tool_batch_prompt([(f"t{n}", desc, name) for n, (_, _, desc, name) in enumerate(batch)])
+    try:
+        reply = await chat_json_async([{"role": "user", "content": prompt}], max_tokens=tool_batch_max_tokens(len(batch)))
+    except Exception as e:
+        print(f"DeepSeek Batch Processing Error: {e}")
+        reply = None
+    retry = store_tool_batch(batch, reply, results)
+    singles = await asyncio.gather(*(_analyze_tool_async(key, desc, name) for _, key, desc, name in retry))
+    for (i, _, _, _), result in zip(retry, singles):
+        results[i] = result
+
+
+async def process_tool_contents_async(tools, batch_size=LLM_TOOL_BATCH_SIZE):
+    """Async llm_processor.process_tool_contents: the batches run concurrently."""
+    results, misses = tool_cache_lookup(tools)
+    await asyncio.gather(*(_process_tool_batch_async(b, results) for b in tool_batches(misses, batch_size)))
+    return [results[i] for i in range(len(tools))]
+
+
+async def process_news_content_async(title_en, link, description_en="", external_context=""):
+    key = cache_key("news", title_en, link, description_en)
+    cached = cached_result(key, title_en)
+    if cached is not None:
+        return cached
+
+    print(f"DeepSeek (async) is deeply analyzing News: {title_en}...")
+    prompt = build_news_prompt(title_en, link, description_en, external_context)
+    try:
+        result = await chat_json_async([{"role": "user", "content": prompt}])
+    except Exception as e:
+        print(f"DeepSeek News Processing Error: {e}")
+        return fallback_news_content(title_en, link, description_en)
+    LLM_CACHE.put(key, "news", result)
+    return result
+
+
+async def process_youtube_transcript_async(title_en, channel_name, video_url, transcript_text):
+    transcript_text = transcript_text[:YOUTUBE_TRANSCRIPT_LIMIT]
+    key = cache_key("youtube", title_en, channel_name, video_url, transcript_text)
+    cached = cached_result(key, title_en)
+    if cached is not None:
+        return cached
+
+    print(f"DeepSeek (async) is deeply analyzing YouTube Transcript: {title_en} from {channel_name}...")
+    prompt = build_youtube_prompt(title_en, channel_name, video_url, transcript_text)
+    try:
+        result = await chat_json_async(
+            [
+                {"role": "system", "content": YOUTUBE_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt},
+            ],
+            strict=False,
+        )
+    except Exception as e:
+        print(f"DeepSeek YouTube Transcript Error: {e}")
+        return fallback_youtube_content(title_en, channel_name, video_url)
+    LLM_CACHE.put(key, "youtube", result)
+    return result
+
+
+async def _youtube_chunk_notes_async(title_en, label, chunk_text):
+    key = cache_key("youtube_chunk", title_en, label, chunk_text)
+    cached = cached_result(key, f"{title_en} [{label}]")
+    if cached is not None:
+        return cached["notes"]
+    try:
+        with METRICS.span("youtube.chunk_summary"):
+            result = await chat_json_async(
+                [
+                    {"role": "system", "content": YOUTUBE_SYSTEM_PROMPT},
+                    {"role": "user", "content": build_youtube_chunk_prompt(title_en, label, chunk_text)},
+                ],
+                strict=False,
+            )
+        notes = result.get("notes")
+        if isinstance(notes, list):
+            notes = "\n".join(f"- {n}" for n in notes)
+        if not notes:
+            raise ValueError("empty notes")
+    except Exception as e:
+        # 这一段降级为原始字幕开头, 其余段落不受影响
+        print(f"DeepSeek YouTube chunk {label} failed: {e}")
+        return chunk_text[:YOUTUBE_CHUNK_FALLBACK_CHARS]
+    LLM_CACHE.put(key, "youtube_chunk", {"notes": notes})
+    return notes
+
+
+async def summarize_youtube_transcript_async(title_en, channel_name, video_url, segments):
+    """
+    Map-reduce over the whole transcript: chunks (chunk_transcript) are turned
+    into compact notes concurrently under the shared rate limiter, then one
+    synthesis call writes the article from the notes. Chunk notes are cached
+    individually, so a rerun only pays for chunks it has not seen.
+    `segments` is [(start_seconds, text)] or a plain string. Transcripts that
+    fit in a single chunk go through process_youtube_transcript_async.
+    """
+    chunks = chunk_transcript(segments)
+    if len(chunks) <= 1:
+        text = chunks[0][1] if chunks else ""
+        return await process_youtube_transcript_async(title_en, channel_name, video_url, text)
+
+    print(f"DeepSeek (async) is summarizing {len(chunks)} transcript chunks of: {title_en} from {channel_name}...")
+    notes = await asyncio.gather(*(_youtube_chunk_notes_async(title_en, label, text) for label, text in chunks))
+    notes = [(label, n) for (label, _), n in zip(chunks, notes)]
+
+    key = cache_key("youtube_synthesis", title_en, channel_name, video_url, notes)
+    cached = cached_result(key, title_en)
+    if cached is not None:
+        return cached
+    prompt = build_youtube_synthesis_prompt(title_en, channel_name, video_url, notes)
+    try:
+        with METRICS.span("youtube.synthesis"):
+            result = await chat_json_async(
+                [
+                    {"role": "system", "content": YOUTUBE_SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt},
+                ],
+                strict=False,
+            )
+    except Exception as e:
+        print(f"DeepSeek YouTube Synthesis Error: {e}")
+        return fallback_youtube_content(title_en, channel_name, video_url)
+    LLM_CACHE.put(key, "youtube_synthesis", result)
+    return result
@@ -0,0 +1,152 @@
+import os
+import json
+import time
+import hashlib
+import threading
+import crawler_env  # noqa: F401
+import state_db
+
+# --- LLM 响应缓存配置 ---
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") != "0"
+LLM_CACHE_TTL_DAYS = float(os.getenv("LLM_CACHE_TTL_DAYS", "30"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "50000"))
+LLM_CACHE_MAX_MB = float(os.getenv("LLM_CACHE_MAX_MB", "512"))
+
+
+class LLMCache:
+    """
+    Content-addressed on-disk cache of parsed LLM responses.
+
+    Keys are a SHA-256 over (kind, model, prompt template version, inputs),
+    so editing a template only needs a version bump to invalidate it.
+    Entries expire after `ttl` seconds; past the entry/size bounds the least
+    recently used ones are evicted until the cache is back under 90% of both.
+    """
+
+    def __init__(
+        self,
+        filename: str = "llm_cache.sqlite",
+        ttl: float = LLM_CACHE_TTL_DAYS * 86400,
+        max_entries: int = LLM_CACHE_MAX_ENTRIES,
+        max_bytes: int = int(LLM_CACHE_MAX_MB * 1024 * 1024),
+        enabled: bool = LLM_CACHE_ENABLED,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        self._filename = filename
+        # 条目数与总字节数的运行值, 打开时统计一次, 之后随读写增减, 不必每次写入都扫全表
+        self._count = 0
+        self._bytes = 0
+
+    def _db(self):
+        if self._conn is None:
+            self._conn = state_db.connect(self._filename)
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used ON llm_cache(last_used)"
+            )
+            self._recount(self._conn)
+        return self._conn
+
+    def _recount(self, db):
+        self._count, self._bytes = db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache"
+        ).fetchone()
+
+    @staticmethod
+    def make_key(kind: str, model: str, version: int, *inputs) -> str:
+        raw = json.dumps([kind, model, version, *inputs], ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str):
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            row = db.execute(
+                "SELECT value, created_at, size FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                if row is not None:
+                    db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    self._count -= 1
+                    self._bytes -= row[2]
+                self.misses += 1
+                return None
+            db.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, kind: str, value):
+        if not self.enabled:
+            return
+        data = json.dumps(value, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            old = db.execute("SELECT size FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if old is not None:
+                self._count -= 1
+                self._bytes -= old[0]
+            db.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, kind, value, size, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, kind, data, len(data), now, now),
+            )
+            self._count += 1
+            self._bytes += len(data)
+            self._evict(db)
+
+    def _evict(self, db):
+        if self._count <= self.max_entries and self._bytes <= self.max_bytes:
+            return
+        db.execute("DELETE FROM llm_cache WHERE created_at < ?", (time.time() - self.ttl,))
+        # 过期清理之后重新统计 (也纠正其他进程写同一个文件造成的偏差)
+        self._recount(db)
+        if self._count <= self.max_entries and self._bytes <= self.max_bytes:
+            return
+        # 超限后按 LRU 清到两个上限的 90%, 避免每次写入都触发淘汰; 按大小累加, 大条目多时也能降到上限以下
+        max_count, max_bytes = int(self.max_entries * 0.9), int(self.max_bytes * 0.9)
+        doomed = []
+        count, total = self._count, self._bytes
+        for key, size in db.execute("SELECT key, size FROM llm_cache ORDER BY last_used ASC"):
+            if count <= max_count and total <= max_bytes:
+                break
+            doomed.append((key,))
+            count -= 1
+            total -= size
+        db.execute("BEGIN")
+        db.executemany("DELETE FROM llm_cache WHERE key = ?", doomed)
+        db.execute("COMMIT")
+        self._count, self._bytes = count, total
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else None,
+            }
+
+
+# 进程级共享缓存
+LLM_CACHE = LLMCache()
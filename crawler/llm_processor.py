@@ -1,35 +1,153 @@
 import os
+import re
 import json
 import sys
+import time
+import threading
+from concurrent.futures import Future
+import openai
 from openai import OpenAI
-from dotenv import load_dotenv
+from crawler_env import CRAWLER_ENV_PATH
+from rate_limiter import LLM_LIMITER, estimate_tokens, backoff_delay
+from llm_cache import LLM_CACHE
+from metrics import METRICS
 
-# 加载 .env 文件中的环境变量
-CRAWLER_ENV_PATH = os.path.join(os.path.dirname(__file__), ".env")
+# --- 配置 DeepSeek (使用 OpenAI v1.0+ 语法), .env 已由 crawler_env 加载 ---
+DEEPSEEK_API_KEY = os.getenv("DEEPSEEK_API_KEY")
+DEEPSEEK_BASE_URL = os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com")
+MODEL = "deepseek-chat"
+# 429 / 5xx / 网络错误的最大重试次数 (SDK 自带重试关闭, 统一走带抖动的指数退避)
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "5"))
+# 模型单次输出的 token 上限 (deepseek-chat 为 8K)
+LLM_MAX_OUTPUT_TOKENS = int(os.getenv("LLM_MAX_OUTPUT_TOKENS", "8192"))
+# 批量请求里每个工具预留的输出 token; 批量提示词限定了评测长度 (中文 300-400 字 + 英文 200-250 词), 约 900 token
+LLM_TOOL_ITEM_MAX_TOKENS = int(os.getenv("LLM_TOOL_ITEM_MAX_TOKENS", "1100"))
+# 批量模式下每个请求打包的工具数 (1 = 关闭批量); 不超过一次输出能容纳的工具数, 否则整批会被截断
+LLM_TOOL_BATCH_SIZE = max(
+    1, min(int(os.getenv("LLM_TOOL_BATCH_SIZE", "6")), LLM_MAX_OUTPUT_TOKENS // LLM_TOOL_ITEM_MAX_TOKENS)
+)
+# 流水线里凑批的最长等待
+LLM_TOOL_BATCH_WAIT_SECONDS = float(os.getenv("LLM_TOOL_BATCH_WAIT_SECONDS", "2"))
 
-if not os.path.exists(CRAWLER_ENV_PATH):
-    print(f"Startup aborted: crawler env file not found: {CRAWLER_ENV_PATH}")
-    sys.exit(1)
 
-load_dotenv(CRAWLER_ENV_PATH)
 
-# --- 配置 DeepSeek (使用 OpenAI v1.0+ 语法) ---
-DEEPSEEK_API_KEY = os.getenv("DEEPSEEK_API_KEY")
+def check_config():
+    """Startup check for entry points: aborts the process when DeepSeek is not configured."""
+    if not os.path.exists(CRAWLER_ENV_PATH):
+        print(f"Startup aborted: crawler env file not found: {CRAWLER_ENV_PATH}")
+        sys.exit(1)
+    if not DEEPSEEK_API_KEY:
+        print("Startup aborted: Missing required environment variable: DEEPSEEK_API_KEY")
+        sys.exit(1)
 
-if not DEEPSEEK_API_KEY:
-    print("Startup aborted: Missing required environment variable: DEEPSEEK_API_KEY")
-    sys.exit(1)
 
-client = OpenAI(api_key=DEEPSEEK_API_KEY, base_url="https://api.deepseek.com")
+# 首次调用时才创建: 解析/转码的 spawn 子进程会重新导入入口模块, 导入时不能有副作用
+_client = None
+_client_lock = threading.Lock()
 
 
-def process_tool_content(raw_description, tool_name):
+def get_client() -> OpenAI:
+    global _client
+    with _client_lock:
+        if _client is None:
+            if not DEEPSEEK_API_KEY:
+                raise RuntimeError("Missing required environment variable: DEEPSEEK_API_KEY")
+            _client = OpenAI(api_key=DEEPSEEK_API_KEY, base_url=DEEPSEEK_BASE_URL, max_retries=0)
+        return _client
+
+# 修改任何 prompt 模板时把对应版本号 +1, 旧的缓存结果即自动失效
+PROMPT_VERSIONS = {"tool": 1, "news": 1, "youtube": 1, "youtube_chunk": 1, "youtube_synthesis": 1, "homepage": 1}
+
+
+def cache_key(kind, *inputs):
+    return LLM_CACHE.make_key(kind, MODEL, PROMPT_VERSIONS[kind], *inputs)
+
+
+def cached_result(key, label):
+    result = LLM_CACHE.get(key)
+    if result is not None:
+        print(f"  [LLM Cache] Hit: {label}")
+    METRICS.incr("llm_cache_lookups", result="miss" if result is None else "hit")
+    return result
+
+
+def parse_json_content(content, strict=True):
+    # 兼容性处理：如果返回的内容带了 Markdown 代码块
+    if "```json" in content:
+        content = content.split("```json")[1].split("```")[0].strip()
+    elif "```" in content:
+        content = content.split("```")[1].split("```")[0].strip()
+
+    return json.loads(content, strict=strict)
+
+
+def is_retryable(e) -> bool:
+    if isinstance(e, (openai.RateLimitError, openai.APIConnectionError)):
+        return True
+    return isinstance(e, openai.APIStatusError) and e.status_code >= 500
+
+
+def retry_wait(e, attempt: int) -> float:
+    """Honours Retry-After when the server sends one, else jittered backoff."""
+    response = getattr(e, "response", None)
+    if response is not None:
+        retry_after = response.headers.get("retry-after")
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+    return backoff_delay(attempt)
+
+
+# 按线程累计的 token 用量, 供按预算运行的任务 (如 enrichment) 计量自己的花费
+_usage = threading.local()
+
+
+def tokens_used() -> int:
+    """Total tokens reported by DeepSeek for calls made from the current thread."""
+    return getattr(_usage, "tokens", 0)
+
+
+def chat_json(messages, strict=True, max_tokens=None):
     """
-    使用 OpenAI 库 (v1.0+) 调用 DeepSeek API。
+    Rate-limited, retried DeepSeek call that returns the parsed JSON body.
+    Raises on non-retryable errors or when retries are exhausted.
     """
-    print(f"DeepSeek (v1.0+) is analyzing: {tool_name}...")
+    extra = {"max_tokens": max_tokens} if max_tokens else {}
+    est = estimate_tokens("".join(m["content"] for m in messages))
+    attempt = 0
+    while True:
+        with METRICS.span("llm.rate_wait"):
+            LLM_LIMITER.acquire(est)
+        try:
+            with METRICS.span("llm.request"):
+                response = get_client().chat.completions.create(
+                    model=MODEL,
+                    messages=messages,
+                    response_format={"type": "json_object"},
+                    **extra,
+                )
+        except Exception as e:
+            if not is_retryable(e) or attempt >= LLM_MAX_RETRIES:
+                raise
+            METRICS.incr("llm_retries")
+            wait = retry_wait(e, attempt)
+            print(f"DeepSeek transient error ({e.__class__.__name__}), retrying in {wait:.1f}s...")
+            time.sleep(wait)
+            attempt += 1
+            continue
+
+        usage = getattr(response, "usage", None)
+        LLM_LIMITER.settle(est, usage.total_tokens if usage else None)
+        if usage:
+            METRICS.incr("llm_tokens", usage.total_tokens)
+            _usage.tokens = tokens_used() + usage.total_tokens
+        return parse_json_content(response.choices[0].message.content, strict=strict)
 
-    prompt = f"""
+
+def build_tool_prompt(raw_description, tool_name):
+    return f"""
     你是一个全球领先的 AIGC 工具评测专家。请根据以下工具的基本信息，生成一个标准的 JSON 格式响应。
     
     工具名称: {tool_name}
@@ -51,45 +169,257 @@ def process_tool_content(raw_description, tool_name):
     备注：考虑到你是一个严苛的评测员，请在 aiScore 字段给出一个 1 到 10 的客观评分。大部分普通工具应当在 5-7 分左右。如果是极具创新或者不可替代的神器，再给 8-10分。如果纯粹套壳毫无新意，给 1-4分。
     """
 
-    try:
-        response = client.chat.completions.create(
-            model="deepseek-chat",
-            messages=[{"role": "user", "content": prompt}],
-            response_format={"type": "json_object"},
-        )
-        content = response.choices[0].message.content
 
-        # 兼容性处理：如果返回的内容带了 Markdown 代码块
-        if "```json" in content:
-            content = content.split("```json")[1].split("```")[0].strip()
-        elif "```" in content:
-            content = content.split("```")[1].split("```")[0].strip()
+def fallback_tool_content(raw_description, tool_name):
+    # 降级方案
+    return {
+        "title_zh": tool_name,
+        "title_en": tool_name,
+        "summary_zh": raw_description[:50],
+        "summary_en": "AI-powered innovation tool for creative workflows.",
+        "coreValue": "暂无",
+        "useCases": "通用",
+        "prosCons": "待评测",
+        "aiScore": 5.0,
+        "content_zh": f"# {tool_name}\n\n{raw_description}\n\n(AI 解析失败，保留原始描述)",
+        "content_en": f"# {tool_name}\n\n{raw_description}\n\n(AI generation failed, raw desc preserved)",
+    }
+
 
-        return json.loads(content)
+def process_tool_content(raw_description, tool_name):
+    """
+    使用 OpenAI 库 (v1.0+) 调用 DeepSeek API。
+    """
+    key = cache_key("tool", raw_description, tool_name)
+    cached = cached_result(key, tool_name)
+    if cached is not None:
+        return cached
+    return analyze_tool(key, raw_description, tool_name)
+
+
+def analyze_tool(key, raw_description, tool_name):
+    """Single-item DeepSeek call for a tool already looked up in the cache (and missed)."""
+    print(f"DeepSeek (v1.0+) is analyzing: {tool_name}...")
+
+    prompt = build_tool_prompt(raw_description, tool_name)
+    try:
+        result = chat_json([{"role": "user", "content": prompt}])
     except Exception as e:
         print(f"DeepSeek Processing Error: {e}")
-        # 降级方案
-        return {
-            "title_zh": tool_name,
-            "title_en": tool_name,
-            "summary_zh": raw_description[:50],
-            "summary_en": "AI-powered innovation tool for creative workflows.",
-            "coreValue": "暂无",
-            "useCases": "通用",
-            "prosCons": "待评测",
-            "aiScore": 5.0,
-            "content_zh": f"# {tool_name}\n\n{raw_description}\n\n(AI 解析失败，保留原始描述)",
-            "content_en": f"# {tool_name}\n\n{raw_description}\n\n(AI generation failed, raw desc preserved)",
-        }
+        return fallback_tool_content(raw_description, tool_name)
+    LLM_CACHE.put(key, "tool", result)
+    return result
 
 
-def process_news_content(title_en, link, description_en="", external_context=""):
+def build_tool_batch_prompt(tools):
+    """`tools` is a list of (id, raw_description, tool_name); the reply is keyed by those ids."""
+    listing = json.dumps(
+        [{"id": tool_id, "name": name, "description": desc} for tool_id, desc, name in tools],
+        ensure_ascii=False,
+        indent=1,
+    )
+    return f"""
+    你是一个全球领先的 AIGC 工具评测专家。下面是 {len(tools)} 个工具的基本信息，请逐个独立评测，生成一个标准的 JSON 格式响应。
+    
+    工具列表:
+    {listing}
+    
+    输出要求 (严格遵循 JSON 格式): 一个对象，"tools" 数组中每个工具对应一个元素，"id" 原样返回，不要遗漏或合并工具:
+    {{
+      "tools": [
+        {{
+          "id": "工具 id",
+          "title_zh": "中文工具名",
+          "title_en": "English Tool Name",
+          "summary_zh": "一句精炼的中文摘要 (35字以内)",
+          "summary_en": "One concise English summary (18 words max)",
+          "coreValue": "该工具最核心的价值体现，一句话概括",
+          "useCases": "适用的人群或商业场景。例如：独立开发者起步、自媒体博主分发",
+          "prosCons": "优缺点分析。例如：优点：功能强大。缺点：有学习门槛，费用昂贵。",
+          "aiScore": 8.5,
+          "content_zh": "## 功能特性\n- 特性1\n- 特性2\n\n## 专家评价\n这里写一段深入的中文 Markdown 评测 (300-400 字)...",
+          "content_en": "## Key Features\n- Feature 1\n- Feature 2\n\n## Expert Review\nA focused English Markdown review (200-250 words)..."
+        }}
+      ]
+    }}
+    篇幅：每个工具的 content_zh 控制在 300-400 字, content_en 控制在 200-250 词, 所有工具的评测都要写完整, 不要越写越短。
+    备注：考虑到你是一个严苛的评测员，请在 aiScore 字段给出一个 1 到 10 的客观评分。大部分普通工具应当在 5-7 分左右。如果是极具创新或者不可替代的神器，再给 8-10分。如果纯粹套壳毫无新意，给 1-4分。
     """
-    专门处理英文科技快讯的 LLM 函数，结合外部搜索情报，生成 AI 搜索 (GEO) 优化的结构化 Markdown 文章。
+
+
+# 批量结果中每个元素必须带齐的字段
+TOOL_REQUIRED_FIELDS = ("title_zh", "title_en", "summary_zh", "summary_en", "content_zh", "content_en")
+
+
+def valid_tool_result(result) -> bool:
+    if not isinstance(result, dict):
+        return False
+    if not all(isinstance(result.get(f), str) and result[f].strip() for f in TOOL_REQUIRED_FIELDS):
+        return False
+    try:
+        float(result.get("aiScore", 5.0))
+    except (TypeError, ValueError):
+        return False
+    return True
+
+
+def split_tool_batch(reply, ids) -> dict:
+    """Valid elements of a batch reply by id; anything missing or malformed is left out."""
+    elements = reply.get("tools") if isinstance(reply, dict) else None
+    if not isinstance(elements, list):
+        return {}
+    wanted = set(ids)
+    results = {}
+    for element in elements:
+        if not isinstance(element, dict):
+            continue
+        tool_id = str(element.pop("id", ""))
+        if tool_id in wanted and tool_id not in results and valid_tool_result(element):
+            results[tool_id] = element
+    return results
+
+
+def tool_cache_lookup(tools):
+    """Returns (results, misses): cached results by index and the (index, key, desc, name) still to ask."""
+    results, misses = {}, []
+    for i, (desc, name) in enumerate(tools):
+        key = cache_key("tool", desc, name)
+        cached = cached_result(key, name)
+        if cached is not None:
+            results[i] = cached
+        else:
+            misses.append((i, key, desc, name))
+    return results, misses
+
+
+def tool_batch_max_tokens(count: int) -> int:
+    """Output budget for a batch request of `count` tools; truncated replies fall back to single calls."""
+    return min(LLM_MAX_OUTPUT_TOKENS, LLM_TOOL_ITEM_MAX_TOKENS * count)
+
+
+def tool_batches(misses, batch_size):
+    for start in range(0, len(misses), max(1, batch_size)):
+        yield misses[start : start + max(1, batch_size)]
+
+
+def store_tool_batch(batch, reply, results) -> list:
+    """Caches and records the valid elements of `reply`; returns the batch entries that need a retry."""
+    answers = split_tool_batch(reply, [f"t{n}" for n in range(len(batch))]) if reply else {}
+    retry = []
+    for n, (i, key, desc, name) in enumerate(batch):
+        result = answers.get(f"t{n}")
+        if result is None:
+            retry.append((i, key, desc, name))
+            continue
+        LLM_CACHE.put(key, "tool", result)
+        results[i] = result
+    METRICS.incr("llm_batch_items", len(batch) - len(retry), result="ok")
+    if retry:
+        METRICS.incr("llm_batch_items", len(retry), result="retried")
+    return retry
+
+
+def process_tool_contents(tools, batch_size=LLM_TOOL_BATCH_SIZE):
     """
-    print(f"DeepSeek is deeply analyzing News: {title_en}...")
+    Batched process_tool_content for a list of (raw_description, tool_name):
+    cache misses are packed `batch_size` per request, each element of the reply
+    is validated on its own, and only elements that fail get a single-item call.
+    Results keep the input order.
+    """
+    results, misses = tool_cache_lookup(tools)
+    analyze_tools(misses, results, batch_size)
+    return [results[i] for i in range(len(tools))]
+
+
+def analyze_tools(misses, results, batch_size=LLM_TOOL_BATCH_SIZE):
+    """Fills `results` for cache misses [(index, key, desc, name)] without looking them up again."""
+    for batch in tool_batches(misses, batch_size):
+        if len(batch) == 1:
+            i, key, desc, name = batch[0]
+            results[i] = analyze_tool(key, desc, name)
+            continue
+        print(f"DeepSeek (batch of {len(batch)}) is analyzing: {', '.join(name for _, _, _, name in batch)}...")
+        prompt = build_tool_batch_prompt([(f"t{n}", desc, name) for n, (_, _, desc, name) in enumerate(batch)])
+        try:
+            reply = chat_json([{"role": "user", "content": prompt}], max_tokens=tool_batch_max_tokens(len(batch)))
+        except Exception as e:
+            print(f"DeepSeek Batch Processing Error: {e}")
+            reply = None
+        for i, key, desc, name in store_tool_batch(batch, reply, results):
+            results[i] = analyze_tool(key, desc, name)
+
+
+class ToolBatcher:
+    """
+    Lets pipeline workers that each hold one tool share batched requests:
+    `process(desc, name)` blocks until the batch containing the tool is done.
+    A batch is sent once `batch_size` tools are waiting or the oldest has
+    waited `wait_seconds`; the thread that completes a batch sends it.
+    """
+
+    def __init__(self, batch_size=LLM_TOOL_BATCH_SIZE, wait_seconds=LLM_TOOL_BATCH_WAIT_SECONDS):
+        self.batch_size = max(1, batch_size)
+        self.wait_seconds = wait_seconds
+        self._pending = []
+        # 每取走一批 +1; 定时器只刷新自己启动时的那一批, 不会提前发出后来凑的半批
+        self._generation = 0
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def process(self, raw_description, tool_name):
+        key = cache_key("tool", raw_description, tool_name)
+        cached = cached_result(key, tool_name)
+        if cached is not None:
+            return cached
+        future = Future()
+        with self._lock:
+            self._pending.append((key, raw_description, tool_name, future))
+            if len(self._pending) >= self.batch_size:
+                batch = self._take()
+            else:
+                batch = None
+                if len(self._pending) == 1:
+                    self._timer = threading.Timer(self.wait_seconds, self._flush, args=(self._generation,))
+                    self._timer.daemon = True
+                    self._timer.start()
+        if batch:
+            self._run(batch)
+        return future.result()
+
+    def _take(self):
+        # 调用方持有 self._lock
+        batch, self._pending = self._pending, []
+        self._generation += 1
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        return batch
+
+    def _flush(self, generation):
+        with self._lock:
+            if generation != self._generation:
+                return
+            batch = self._take()
+        if batch:
+            self._run(batch)
 
-    prompt = f"""
+    def _run(self, batch):
+        # process() 已经查过缓存, 这里直接按未命中处理
+        results = {}
+        try:
+            analyze_tools([(i, key, desc, name) for i, (key, desc, name, _) in enumerate(batch)], results, self.batch_size)
+        except Exception as e:
+            print(f"DeepSeek Batch Processing Error: {e}")
+        for i, (_, desc, name, future) in enumerate(batch):
+            future.set_result(results.get(i) or fallback_tool_content(desc, name))
+
+
+# 进程级共享
+TOOL_BATCHER = ToolBatcher()
+
+
+def build_news_prompt(title_en, link, description_en="", external_context=""):
+    return f"""
     你是一个资深的全球 AI 科技专栏作者。请将以下抓取到的新闻线索与全网背景情报结合，撰写一篇高质量的、适合 AI 搜索优化 (GEO) 的【中文科技深度总结】（约 300-500 字）。
     这篇内容将被用于网站的专属新闻详情页，因此需要逻辑严密，并且使用结构化的 Markdown 排版。
     
@@ -107,38 +437,51 @@ def process_news_content(title_en, link, description_en="", external_context="")
     }}
     """
 
-    try:
-        response = client.chat.completions.create(
-            model="deepseek-chat",
-            messages=[{"role": "user", "content": prompt}],
-            response_format={"type": "json_object"},
-        )
-        content = response.choices[0].message.content
 
-        if "```json" in content:
-            content = content.split("```json")[1].split("```")[0].strip()
-        elif "```" in content:
-            content = content.split("```")[1].split("```")[0].strip()
+def fallback_news_content(title_en, link, description_en=""):
+    return {
+        "title_zh": f"[自动翻译失败] {title_en}",
+        "content_zh": f"AI 新闻解析失败。原始链接: {link}\n摘要: {description_en}"
+    }
+
 
-        return json.loads(content)
+def process_news_content(title_en, link, description_en="", external_context=""):
+    """
+    专门处理英文科技快讯的 LLM 函数，结合外部搜索情报，生成 AI 搜索 (GEO) 优化的结构化 Markdown 文章。
+    """
+    # 搜索情报每次都会变化, 不参与缓存键, 否则同一条新闻永远命中不了
+    key = cache_key("news", title_en, link, description_en)
+    cached = cached_result(key, title_en)
+    if cached is not None:
+        return cached
+
+    print(f"DeepSeek is deeply analyzing News: {title_en}...")
+
+    prompt = build_news_prompt(title_en, link, description_en, external_context)
+    try:
+        result = chat_json([{"role": "user", "content": prompt}])
     except Exception as e:
         print(f"DeepSeek News Processing Error: {e}")
-        return {
-            "title_zh": f"[自动翻译失败] {title_en}",
-            "content_zh": f"AI 新闻解析失败。原始链接: {link}\n摘要: {description_en}"
-        }
+        return fallback_news_content(title_en, link, description_en)
+    LLM_CACHE.put(key, "news", result)
+    return result
 
 
-def process_youtube_transcript(title_en, channel_name, video_url, transcript_text):
-    """
-    处理 YouTube 视频的原始字幕，提取核心信息并转化为深度科技新闻/总结文章。
-    """
-    print(f"DeepSeek is deeply analyzing YouTube Transcript: {title_en} from {channel_name}...")
+YOUTUBE_SYSTEM_PROMPT = "You are a professional AI tech journalist."
+YOUTUBE_TRANSCRIPT_LIMIT = 15000
 
-    # Substring transcript to avoid context window explosion (e.g. max 15000 chars)
-    transcript_text = transcript_text[:15000]
 
-    prompt = f"""
+# 单次与分段两种写法共用的输出格式要求
+YOUTUBE_OUTPUT_SPEC = """    输出要求 (严格遵循 JSON 格式):
+    {
+      "title_zh": "一个极具网感、吸引眼球的中文标题（如：Andrej Karpathy 亲自下场教你写代码！万字硬核笔记）",
+      "content_zh": "这里输出一篇 600-800 字的详细文章。必须使用【纯 Markdown】格式，绝对禁止使用任何 HTML 标签（如 <ul>, <li>, <strong> 等）。\n\n必须包含以下要素，并且每个标题前后必须有空行：\n\n## 导语与核心看点\n（用极其口语化、接地气的方式介绍这个视频为什么值得看，不要用“本视频探讨了”这种机器味十足的废话。直接给读者放猛料，介绍最牛逼的点。）\n\n## 硬核细节提炼\n（深入字幕提取具体的数据、算法名词、工具名称或者教程的详细步骤。使用标准的 Markdown 无序列表 `- `。要多写细节，不要泛泛而谈。保留原汁原味的技术深度。）\n\n## 个人神评与行业启发\n（以主观的博主视角，锐评一下这个技术/教程的优缺点，或者是对普通人和开发者的实际建议。语言要犀利、有态度。）\n\n注意：请确保使用 `\\n\\n` 来换行，保证排版在前端可以正确渲染。加粗请使用 `**文本**`，禁止使用 HTML 标签！"
+    }
+"""
+
+
+def build_youtube_prompt(title_en, channel_name, video_url, transcript_text):
+    return f"""
     你是一个风格幽默、见解犀利的硅谷资深科技博主（类似 The Verge 或 Marques Brownlee 的文字风格）。请阅读以下 YouTube AI 视频的【原始机器字幕】，从中提取最硬核的技术细节、情报或教程步骤，写一篇引人入胜的【中文科技深度长文】（约 600-800 字）。
     
     视频标题: {title_en}
@@ -148,33 +491,129 @@ def process_youtube_transcript(title_en, channel_name, video_url, transcript_tex
     原始字幕:
     {transcript_text}
     
-    输出要求 (严格遵循 JSON 格式):
-    {{
-      "title_zh": "一个极具网感、吸引眼球的中文标题（如：Andrej Karpathy 亲自下场教你写代码！万字硬核笔记）",
-      "content_zh": "这里输出一篇 600-800 字的详细文章。必须使用【纯 Markdown】格式，绝对禁止使用任何 HTML 标签（如 <ul>, <li>, <strong> 等）。\n\n必须包含以下要素，并且每个标题前后必须有空行：\n\n## 导语与核心看点\n（用极其口语化、接地气的方式介绍这个视频为什么值得看，不要用“本视频探讨了”这种机器味十足的废话。直接给读者放猛料，介绍最牛逼的点。）\n\n## 硬核细节提炼\n（深入字幕提取具体的数据、算法名词、工具名称或者教程的详细步骤。使用标准的 Markdown 无序列表 `- `。要多写细节，不要泛泛而谈。保留原汁原味的技术深度。）\n\n## 个人神评与行业启发\n（以主观的博主视角，锐评一下这个技术/教程的优缺点，或者是对普通人和开发者的实际建议。语言要犀利、有态度。）\n\n注意：请确保使用 `\\n\\n` 来换行，保证排版在前端可以正确渲染。加粗请使用 `**文本**`，禁止使用 HTML 标签！"
-    }}
+{YOUTUBE_OUTPUT_SPEC}    """
+
+
+def fallback_youtube_content(title_en, channel_name, video_url):
+    return {
+        "title_zh": f"[视频解析] {title_en}",
+        "content_zh": f"This is an automated extraction from YouTube channel {channel_name}.\n\nSource: {video_url}\n\n*Transcript was successfully pulled but the AI abstraction agent timed out or failed.*"
+    }
+
+
+def process_youtube_transcript(title_en, channel_name, video_url, transcript_text):
     """
-    
+    处理 YouTube 视频的原始字幕，提取核心信息并转化为深度科技新闻/总结文章。
+    """
+    # Substring transcript to avoid context window explosion (e.g. max 15000 chars)
+    transcript_text = transcript_text[:YOUTUBE_TRANSCRIPT_LIMIT]
+
+    key = cache_key("youtube", title_en, channel_name, video_url, transcript_text)
+    cached = cached_result(key, title_en)
+    if cached is not None:
+        return cached
+
+    print(f"DeepSeek is deeply analyzing YouTube Transcript: {title_en} from {channel_name}...")
+
+    prompt = build_youtube_prompt(title_en, channel_name, video_url, transcript_text)
     try:
-        response = client.chat.completions.create(
-            model="deepseek-chat",
-            messages=[
-                {"role": "system", "content": "You are a professional AI tech journalist."},
+        result = chat_json(
+            [
+                {"role": "system", "content": YOUTUBE_SYSTEM_PROMPT},
                 {"role": "user", "content": prompt}
             ],
-            response_format={"type": "json_object"},
+            strict=False,
         )
-        content = response.choices[0].message.content
-
-        if "```json" in content:
-            content = content.split("```json")[1].split("```")[0].strip()
-        elif "```" in content:
-            content = content.split("```")[1].split("```")[0].strip()
-
-        return json.loads(content, strict=False)
     except Exception as e:
         print(f"DeepSeek YouTube Transcript Error: {e}")
-        return {
-            "title_zh": f"[视频解析] {title_en}",
-            "content_zh": f"This is an automated extraction from YouTube channel {channel_name}.\n\nSource: {video_url}\n\n*Transcript was successfully pulled but the AI abstraction agent timed out or failed.*"
-        }
+        return fallback_youtube_content(title_en, channel_name, video_url)
+    LLM_CACHE.put(key, "youtube", result)
+    return result
+
+
+# --- 长字幕分段摘要 (map-reduce) ---
+# 每段字幕的目标长度, 以及一个视频最多切成多少段 (更长时自动放大每段)
+YOUTUBE_CHUNK_CHARS = int(os.getenv("YOUTUBE_CHUNK_CHARS", "6000"))
+YOUTUBE_MAX_CHUNKS = int(os.getenv("YOUTUBE_MAX_CHUNKS", "24"))
+# 某一段摘要失败时, 用这段字幕开头的这么多字代替笔记
+YOUTUBE_CHUNK_FALLBACK_CHARS = 1200
+
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?。！？])\s+")
+
+
+def _clock(seconds) -> str:
+    seconds = int(seconds or 0)
+    h, rest = divmod(seconds, 3600)
+    m, s = divmod(rest, 60)
+    return f"{h}:{m:02d}:{s:02d}" if h else f"{m}:{s:02d}"
+
+
+def chunk_transcript(segments, chunk_chars=YOUTUBE_CHUNK_CHARS, max_chunks=YOUTUBE_MAX_CHUNKS):
+    """
+    Splits a transcript into consecutive chunks of about `chunk_chars`.
+    `segments` is a list of (start_seconds, text) caption lines, cut between
+    lines and labelled with their time range, or a plain string, cut between
+    sentences. Returns [(label, text)].
+    """
+    if isinstance(segments, str):
+        segments = [(None, s) for s in _SENTENCE_END_RE.split(segments) if s.strip()]
+    total = sum(len(text) + 1 for _, text in segments)
+    size = max(chunk_chars, -(-total // max(1, max_chunks)))
+
+    chunks, current, first_start, length = [], [], None, 0
+
+    def close(end_start):
+        if not current:
+            return
+        if first_start is None:
+            label = f"part {len(chunks) + 1}"
+        else:
+            label = f"{_clock(first_start)}-{_clock(end_start)}"
+        chunks.append((label, " ".join(current)))
+
+    last_start = None
+    for start, text in segments:
+        text = text.strip()
+        if not text:
+            continue
+        if current and length + len(text) > size:
+            close(last_start)
+            current, first_start, length = [], None, 0
+        if not current:
+            first_start = start
+        current.append(text)
+        length += len(text) + 1
+        last_start = start
+    close(last_start)
+    return chunks
+
+
+def build_youtube_chunk_prompt(title_en, label, chunk_text):
+    return f"""
+    下面是 YouTube 视频《{title_en}》中 {label} 这一段的机器字幕。请把这一段压缩成给后续写作用的要点笔记：
+    保留具体的数据、模型/算法/工具名称、代码或操作步骤、关键论断和例子，去掉寒暄和重复。术语保留原文。
+    
+    字幕片段:
+    {chunk_text}
+    
+    输出要求 (严格遵循 JSON 格式):
+    {{
+      "notes": "- 要点1\\n- 要点2\\n... (Markdown 无序列表, 不超过 12 条, 总共不超过 250 字)"
+    }}
+    """
+
+
+def build_youtube_synthesis_prompt(title_en, channel_name, video_url, notes):
+    """`notes` is [(label, notes)] in video order."""
+    outline = "\n\n".join(f"[{label}]\n{text}" for label, text in notes)
+    return f"""
+    你是一个风格幽默、见解犀利的硅谷资深科技博主（类似 The Verge 或 Marques Brownlee 的文字风格）。下面是一个完整 YouTube AI 视频按时间顺序整理的【分段要点笔记】（覆盖整个视频），请从中提取最硬核的技术细节、情报或教程步骤，写一篇引人入胜的【中文科技深度长文】（约 600-800 字）。
+    
+    视频标题: {title_en}
+    频道: {channel_name}
+    视频链接: {video_url}
+    
+    分段要点笔记:
+    {outline}
+    
+{YOUTUBE_OUTPUT_SPEC}    """
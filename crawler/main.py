@@ -1,27 +1,31 @@
 import os
+import itertools
 import requests
 import time
-import re
 import mimetypes
 import sys
-from bs4 import BeautifulSoup
-from playwright.sync_api import sync_playwright
-from llm_processor import process_tool_content
-from dotenv import load_dotenv
+import queue
+import threading
+import crawler_env  # noqa: F401
+from llm_processor import process_tool_content, TOOL_BATCHER, LLM_TOOL_BATCH_SIZE, check_config as check_llm_config
+from llm_cache import LLM_CACHE
+from dedup_index import DEDUP, normalize_url, refresh_tool_index
+from inject_writer import BatchWriter, TOOLS_BULK_API_URL
+from media_store import store_by_digest, MediaTooLarge, MB
+from media_index import MEDIA_INDEX
+from media_transcode import transcode
+from html_parse import parse_cards, AIGC_CN_CARDS
+from crawl_journal import JOURNAL, reached
+from browser_pool import get_pool, BROWSER_POOL_SIZE
+import screenshot_service
+from pipeline import Pipeline, Stage
+from metrics import METRICS
 
 try:
     import boto3
 except ImportError:
     boto3 = None
 
-CRAWLER_ENV_PATH = os.path.join(os.path.dirname(__file__), ".env")
-
-if not os.path.exists(CRAWLER_ENV_PATH):
-    print(f"Startup aborted: crawler env file not found: {CRAWLER_ENV_PATH}")
-    sys.exit(1)
-
-load_dotenv(CRAWLER_ENV_PATH)
-
 
 def _require_env(name: str) -> str:
     value = os.getenv(name)
@@ -31,49 +35,85 @@ def _require_env(name: str) -> str:
 
 
 # --- 全局配置 ---
-try:
-    API_URL = _require_env("CRAWLER_API_URL")
-    API_KEY = _require_env("API_SECRET_KEY")
-
+# 必填项在 check_config 里校验, R2 客户端首次上传时才创建:
+# 解析/转码的 spawn 子进程会重新导入入口模块, 导入时不能退出进程或建连接
+REQUIRED_ENV = (
+    "CRAWLER_API_URL",
+    "API_SECRET_KEY",
     # Cloudflare R2 (S3 Compatible)
-    R2_ENDPOINT_URL = _require_env("R2_ENDPOINT_URL")
-    R2_ACCESS_KEY_ID = _require_env("R2_ACCESS_KEY_ID")
-    R2_SECRET_ACCESS_KEY = _require_env("R2_SECRET_ACCESS_KEY")
-    R2_BUCKET_NAME = _require_env("R2_BUCKET_NAME")
-    R2_REGION = _require_env("R2_REGION")
-    R2_PUBLIC_URL = _require_env("R2_PUBLIC_URL").rstrip("/")
-
-    if boto3 is None:
-        raise RuntimeError(
-            "boto3 is required for Cloudflare R2 uploads. Install with: pip install boto3"
-        )
-
-    s3 = boto3.client(
-        "s3",
-        endpoint_url=R2_ENDPOINT_URL,
-        aws_access_key_id=R2_ACCESS_KEY_ID,
-        aws_secret_access_key=R2_SECRET_ACCESS_KEY,
-        region_name=R2_REGION,
-    )
-except RuntimeError as e:
-    print(f"Startup aborted: {e}")
-    sys.exit(1)
-
-print(f"R2 enabled. Uploading media to bucket: {R2_BUCKET_NAME}")
+    "R2_ENDPOINT_URL",
+    "R2_ACCESS_KEY_ID",
+    "R2_SECRET_ACCESS_KEY",
+    "R2_BUCKET_NAME",
+    "R2_REGION",
+    "R2_PUBLIC_URL",
+)
+BOTO3_MISSING = "boto3 is required for Cloudflare R2 uploads. Install with: pip install boto3"
+R2_BUCKET_NAME = os.getenv("R2_BUCKET_NAME")
+R2_PUBLIC_URL = (os.getenv("R2_PUBLIC_URL") or "").rstrip("/")
+
+s3 = None
+_s3_lock = threading.Lock()
+
+
+def check_config():
+    """Startup check for entry points: aborts the process when the crawler env or R2 is not configured."""
+    check_llm_config()
+    try:
+        for name in REQUIRED_ENV:
+            _require_env(name)
+        if boto3 is None:
+            raise RuntimeError(BOTO3_MISSING)
+    except RuntimeError as e:
+        print(f"Startup aborted: {e}")
+        sys.exit(1)
+    print(f"R2 enabled. Uploading media to bucket: {R2_BUCKET_NAME}")
+
+
+def get_s3():
+    global s3
+    with _s3_lock:
+        if s3 is None:
+            if boto3 is None:
+                raise RuntimeError(BOTO3_MISSING)
+            s3 = boto3.client(
+                "s3",
+                endpoint_url=_require_env("R2_ENDPOINT_URL"),
+                aws_access_key_id=_require_env("R2_ACCESS_KEY_ID"),
+                aws_secret_access_key=_require_env("R2_SECRET_ACCESS_KEY"),
+                region_name=_require_env("R2_REGION"),
+            )
+        return s3
+
+
+# 媒体下载上限与 R2 分片上传参数 (R2/S3 要求除最后一片外每片 >= 5MB)
+MEDIA_MAX_BYTES = int(float(os.getenv("MEDIA_MAX_MB", "500")) * MB)
+R2_PART_SIZE = max(5 * MB, int(float(os.getenv("R2_PART_SIZE_MB", "8")) * MB))
+R2_UPLOAD_CONCURRENCY = int(os.getenv("R2_UPLOAD_CONCURRENCY", "4"))
+# 超过该大小的图片不做转码 (也不整体读入内存)
+TRANSCODE_MAX_BYTES = int(float(os.getenv("MEDIA_TRANSCODE_MAX_MB", "20")) * MB)
+# 已知媒体 URL 在该时间内直接复用, 超时后再用 ETag/Last-Modified 条件请求校验
+MEDIA_REVALIDATE_SECONDS = float(os.getenv("MEDIA_REVALIDATE_HOURS", "24")) * 3600
+
+# 流水线各阶段并发度与队列长度
+# 批量提示词开启时, LLM 工人多数时间在等批次凑齐, 保证能同时凑出两批
+PIPELINE_LLM_WORKERS = int(os.getenv("PIPELINE_LLM_WORKERS", str(max(4, 2 * LLM_TOOL_BATCH_SIZE))))
+PIPELINE_BROWSER_WORKERS = int(os.getenv("PIPELINE_BROWSER_WORKERS", str(BROWSER_POOL_SIZE)))
+PIPELINE_MEDIA_WORKERS = int(os.getenv("PIPELINE_MEDIA_WORKERS", "4"))
+PIPELINE_API_WORKERS = int(os.getenv("PIPELINE_API_WORKERS", "2"))
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "16"))
+
+# 采集源地址 (基准测试时指向本地替身服务)
+AIGC_CN_URL = os.getenv("AIGC_CN_URL", "https://www.aigc.cn/")
+IZZI_CN_URL = os.getenv("IZZI_CN_URL", "https://aigc.izzi.cn/")
 
-# 缓存已存在 URL 列表
-EXISTING_URLS = set()
+def fetch_existing_urls():
+    # 本地持久化去重索引, 只增量拉取上次同步之后变更过的工具 URL
+    refresh_tool_index()
 
 
-def fetch_existing_urls():
-    global EXISTING_URLS
-    try:
-        r = requests.get(f"{API_URL}?urlsOnly=true", timeout=10)
-        if r.status_code == 200:
-            EXISTING_URLS = set(r.json())
-            print(f"Loaded {len(EXISTING_URLS)} existing tools for deduplication.")
-    except Exception as e:
-        print(f"Could not fetch existing URLs: {e}")
+# 工具入库批量写入器 (共享 keep-alive 连接)
+TOOL_WRITER = BatchWriter(TOOLS_BULK_API_URL)
 
 
 # 分类映射
@@ -99,28 +139,116 @@ def get_standard_cat(text):
     return ("热门与资讯", "hot")
 
 
-def _clean_filename(name: str) -> str:
-    cleaned = re.sub(r"[^a-zA-Z0-9_-]", "", name).lower()
-    return cleaned[:80] if cleaned else "tool"
-
-
 def _build_public_url(key: str) -> str:
     return f"{R2_PUBLIC_URL}/{key}"
 
 
-def _upload_bytes_to_r2(data: bytes, key: str, content_type: str) -> str | None:
+def _media_key(folder: str, ext: str):
+    # 以内容 SHA-256 为键: 同一文件无论来自哪个 URL、哪次运行, 都只存一份
+    return lambda digest: f"{folder}/{digest}{ext}"
+
+
+def _r2_has(key: str) -> bool:
+    if MEDIA_INDEX.object_by_key(key):
+        return True
     try:
-        s3.put_object(
-            Bucket=R2_BUCKET_NAME,
-            Key=key,
-            Body=data,
-            ContentType=content_type,
-            CacheControl="public, max-age=31536000",
+        get_s3().head_object(Bucket=R2_BUCKET_NAME, Key=key)
+        return True
+    except Exception:
+        return False
+
+
+def _store_media(chunks, folder: str, ext: str, content_type: str) -> tuple[str, str] | None:
+    """Content-addressed upload. Returns (public_url, digest), or None for an empty body."""
+    with METRICS.span("r2.store"):
+        key, digest, size, reused = store_by_digest(
+            get_s3(),
+            R2_BUCKET_NAME,
+            chunks,
+            _media_key(folder, ext),
+            _r2_has,
+            content_type,
+            part_size=R2_PART_SIZE,
+            concurrency=R2_UPLOAD_CONCURRENCY,
+            max_bytes=MEDIA_MAX_BYTES,
         )
-        return _build_public_url(key)
-    except Exception as e:
-        print(f"  R2 upload failed ({key}): {e}")
+    if not size:
         return None
+    METRICS.incr("media_objects", result="reused" if reused else "uploaded")
+    if not reused:
+        METRICS.incr("media_uploaded_bytes", size)
+    public_url = _build_public_url(key)
+    MEDIA_INDEX.put_object(digest, key, public_url, size, content_type)
+    if reused:
+        print(f"  Media already in R2 (sha256 {digest[:12]}), upload skipped")
+    return public_url, digest
+
+
+def _fetch_media(url: str, folder: str, fallback_ext: str, keep_body: bool = False):
+    """
+    Downloads `url` into R2 (content-addressed, conditional GET for known URLs).
+    Returns (public_url, digest, body) or None. `body` is only kept when asked
+    for and the file is small enough to transcode; otherwise it is None.
+    """
+    known = MEDIA_INDEX.source(url)
+    if known and time.time() - known["checked_at"] < MEDIA_REVALIDATE_SECONDS:
+        METRICS.incr("media_fetches", result="fresh")
+        return known["public_url"], known["digest"], None
+
+    headers = {"User-Agent": "Mozilla/5.0"}
+    if known:
+        # 条件请求: 远端未变化时只花一个 304
+        if known["etag"]:
+            headers["If-None-Match"] = known["etag"]
+        if known["last_modified"]:
+            headers["If-Modified-Since"] = known["last_modified"]
+
+    with requests.get(url, timeout=20, headers=headers, stream=True) as resp:
+        if resp.status_code == 304 and known:
+            METRICS.incr("media_fetches", result="not_modified")
+            MEDIA_INDEX.touch_source(url)
+            return known["public_url"], known["digest"], None
+        if resp.status_code != 200:
+            print(f"  Skip upload ({url}): status={resp.status_code}")
+            return None
+
+        # 下载开始前先按 Content-Length 拦截超大文件
+        length = int(resp.headers.get("content-length") or 0)
+        if length > MEDIA_MAX_BYTES:
+            print(f"  Skip upload ({url}): {length} bytes exceeds cap")
+            return None
+
+        content_type = resp.headers.get(
+            "content-type", "application/octet-stream"
+        ).split(";")[0]
+        ext = mimetypes.guess_extension(content_type) or fallback_ext
+
+        # 流式分片上传, 内存占用与文件大小无关
+        chunks = resp.iter_content(chunk_size=256 * 1024)
+        body = None
+        if keep_body and content_type.startswith("image/") and length <= TRANSCODE_MAX_BYTES:
+            # 边下载边缓冲, 不依赖 Content-Length (CDN 图片常用分块传输, 没有这个头); 超过转码上限就接着流式上传
+            head, size = [], 0
+            for chunk in chunks:
+                head.append(chunk)
+                size += len(chunk)
+                if size > TRANSCODE_MAX_BYTES:
+                    break
+            if size <= TRANSCODE_MAX_BYTES:
+                body = b"".join(head)
+                chunks = [body]
+            else:
+                chunks = itertools.chain(head, chunks)
+
+        stored = _store_media(chunks, folder, ext, content_type)
+        if stored is None:
+            print(f"  Skip upload ({url}): empty body")
+            return None
+        public_url, digest = stored
+        MEDIA_INDEX.put_source(
+            url, digest, resp.headers.get("etag"), resp.headers.get("last-modified")
+        )
+        return public_url, digest, body
 
 
 def _download_and_upload_media(
@@ -133,162 +261,391 @@ def _download_and_upload_media(
         return url
 
     try:
-        resp = requests.get(url, timeout=20, headers={"User-Agent": "Mozilla/5.0"})
-        if resp.status_code != 200 or not resp.content:
-            print(f"  Skip upload ({url}): status={resp.status_code}")
-            return None
-
-        content_type = resp.headers.get(
-            "content-type", "application/octet-stream"
-        ).split(";")[0]
-        ext = mimetypes.guess_extension(content_type) or fallback_ext
-        key = f"{folder}/{int(time.time())}_{abs(hash(url))}{ext}"
-        uploaded = _upload_bytes_to_r2(resp.content, key, content_type)
-        return uploaded
+        with METRICS.span("media.fetch"):
+            fetched = _fetch_media(url, folder, fallback_ext)
+        return fetched[0] if fetched else None
+    except MediaTooLarge as e:
+        print(f"  Skip upload ({url}): {e}")
+        return None
     except Exception as e:
         print(f"  Media download/upload failed ({url}): {e}")
         return None
 
 
-def capture(url, name):
-    clean_name = _clean_filename(name)
-    fname = f"{clean_name}_{int(time.time())}.png"
+def _media_variants(digest: str, body: bytes | None, folder: str, kind: str) -> dict:
+    """
+    WebP/AVIF re-encodes plus a fixed-size thumbnail of one stored original,
+    e.g. {"full_webp": url, "thumb_avif": url, ...}. Cached per digest.
+    """
+    manifest = MEDIA_INDEX.variants(digest)
+    if manifest is not None or not body:
+        return manifest or {}
+
+    manifest = {}
+    with METRICS.span("media.transcode"):
+        variants = transcode(body, kind)
+    for v in variants:
+        stored = _store_media([v["data"]], f"{folder}/variants", v["ext"], v["content_type"])
+        if stored:
+            manifest[f"{v['name']}_{v['format']}"] = stored[0]
+    if manifest:
+        MEDIA_INDEX.put_variants(digest, manifest)
+    return manifest
+
+
+def _download_and_upload_image(url: str | None, folder: str, kind: str) -> tuple[str | None, dict]:
+    """Like _download_and_upload_media, plus the transcoded variant manifest."""
+    if not url:
+        return None, {}
 
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        # 模拟真实的浏览器视口
-        context = browser.new_context(viewport={"width": 1280, "height": 720})
-        page = context.new_page()
-        try:
-            print(f"  Capturing screenshot for: {url}")
-            page.goto(url, timeout=60000, wait_until="networkidle")
-            # 额外等待渲染
-            time.sleep(3)
-            screenshot_bytes = page.screenshot(type="png")
-
-            r2_key = f"screenshots/{fname}"
-            uploaded_url = _upload_bytes_to_r2(screenshot_bytes, r2_key, "image/png")
-            if uploaded_url:
-                print(f"  Screenshot uploaded to R2: {uploaded_url}")
-            return uploaded_url
-        except Exception as e:
-            print(f"  Screenshot FAIL {url}: {e}")
-            return None
-        finally:
-            browser.close()
+    if R2_PUBLIC_URL and url.startswith(R2_PUBLIC_URL):
+        return url, {}
+
+    try:
+        with METRICS.span("media.fetch"):
+            fetched = _fetch_media(url, folder, ".png", keep_body=True)
+        if not fetched:
+            return None, {}
+        public_url, digest, body = fetched
+        return public_url, _media_variants(digest, body, folder, kind)
+    except MediaTooLarge as e:
+        print(f"  Skip upload ({url}): {e}")
+        return None, {}
+    except Exception as e:
+        print(f"  Media download/upload failed ({url}): {e}")
+        return None, {}
 
 
-def process_one_item(name, url, desc, logo=None, video=None, raw_cat=""):
-    if url in EXISTING_URLS:
-        print(f"Skipping (Exists): {name}")
-        return
+def upload_screenshot(screenshot_bytes: bytes | None) -> tuple[str | None, dict]:
+    """
+    Upload stage for screenshot_service captures: stores the PNG content-addressed
+    in R2 and returns (public_url, variant manifest).
+    """
+    if not screenshot_bytes:
+        return None, {}
+    try:
+        stored = _store_media([screenshot_bytes], "screenshots", ".png", "image/png")
+        if not stored:
+            return None, {}
+        print(f"  Screenshot uploaded to R2: {stored[0]}")
+        return stored[0], _media_variants(stored[1], screenshot_bytes, "screenshots", "screenshot")
+    except Exception as e:
+        print(f"  Screenshot upload failed: {e}")
+        return None, {}
 
-    print(f"Processing NEW Tool: {name} ({url})")
-    ai_info = process_tool_content(desc, name)
-    shot = capture(url, name)
-    logo_url = _download_and_upload_media(logo, "logos", ".png")
-    video_url = _download_and_upload_media(video, "videos", ".mp4")
-    zh_cat, slug = get_standard_cat(raw_cat + name + desc)
+
+def _checkpoint(item, stage):
+    try:
+        JOURNAL.record(item["raw_cat"], item, stage)
+    except Exception as e:
+        print(f"  Journal write failed ({item['url']}): {e}")
+
+
+def _stage_llm(item):
+    if reached(item, "llm"):
+        return item
+    if LLM_TOOL_BATCH_SIZE > 1:
+        item["ai_info"] = TOOL_BATCHER.process(item["desc"], item["name"])
+    else:
+        item["ai_info"] = process_tool_content(item["desc"], item["name"])
+    _checkpoint(item, "llm")
+    return item
+
+
+def _stage_screenshot(item):
+    if reached(item, "screenshot"):
+        return item
+    # 浏览器阶段只负责截图, 上传和转码放到 media 阶段, 尽快释放浏览器槽位
+    shot = screenshot_service.capture(item["url"])
+    item["shot_bytes"] = shot.data
+    item["shot_meta"] = shot.meta()
+    _checkpoint(item, "screenshot")
+    return item
+
+
+def _stage_media(item):
+    if reached(item, "media"):
+        return item
+    variants = {}
+    item["shot"], variants["screenshot"] = upload_screenshot(item.pop("shot_bytes", None))
+    item["logo_url"], variants["logo"] = _download_and_upload_image(item.get("logo"), "logos", "logo")
+    item["video_url"] = _download_and_upload_media(item.get("video"), "videos", ".mp4")
+    item["variants"] = {k: v for k, v in variants.items() if v}
+    _checkpoint(item, "media")
+    return item
+
+
+def _stage_inject(item):
+    name, url = item["name"], item["url"]
+    zh_cat, slug = get_standard_cat(item["raw_cat"] + name + item["desc"])
 
     payload = {
-        **ai_info,
+        **item["ai_info"],
         "url": url,
-        "logo": logo_url,
-        "screenshotUrl": shot,
-        "videoUrl": video_url,
+        "logo": item.get("logo_url"),
+        "screenshotUrl": item.get("shot"),
+        "videoUrl": item.get("video_url"),
+        "mediaVariants": item.get("variants") or None,
         "region": "Global",
         "categorySlug": slug,
     }
 
-    headers = {"Authorization": f"Bearer {API_KEY}", "Content-Type": "application/json"}
+    # 批量写入, 结果在刷出后回调
+    TOOL_WRITER.add(payload, on_result=lambda _, result: _on_injected(item, result))
+    return item
+
+
+def _on_injected(item, result):
+    name, url = item["name"], item["url"]
     try:
-        r = requests.post(API_URL, headers=headers, json=payload, timeout=20)
-        if r.status_code == 200:
+        METRICS.incr("items", source=item["raw_cat"], result="injected" if result.get("success") else "inject_failed")
+        if result.get("success"):
             print(f"✅ Success: {name}")
-            EXISTING_URLS.add(url)
+            DEDUP.add(url, source="main")
+            _checkpoint(item, "injected")
         else:
-            print(f"❌ API Error {name}: {r.status_code}")
-    except Exception as e:
-        print(f"❌ Push error {name}: {e}")
+            print(f"❌ API Error {name}: {result.get('status')} {result.get('error')}")
+    finally:
+        _release_url(url)
+
+
+# 正在流水线中处理的 URL, 防止同一轮里重复卡片被处理两次
+_IN_FLIGHT = set()
+_IN_FLIGHT_LOCK = threading.Lock()
+
+
+def _claim_url(url) -> bool:
+    key = normalize_url(url)
+    with _IN_FLIGHT_LOCK:
+        if key in _IN_FLIGHT or DEDUP.contains(url):
+            return False
+        _IN_FLIGHT.add(key)
+        return True
+
+
+def _release_url(url):
+    with _IN_FLIGHT_LOCK:
+        _IN_FLIGHT.discard(normalize_url(url))
+
+
+def _new_item(name, url, desc, logo=None, video=None, raw_cat=""):
+    return {
+        "name": name,
+        "url": url,
+        "desc": desc,
+        "logo": logo,
+        "video": video,
+        "raw_cat": raw_cat,
+        "stage": "parsed",
+    }
+
+
+def _resume_or_new(name, url, desc, logo=None, video=None, raw_cat=""):
+    """Picks up the journaled item for `url` if a previous run left one behind."""
+    item = JOURNAL.get(raw_cat, url)
+    if item is not None:
+        print(f"Resuming Tool: {name} after stage '{item['stage']}'")
+        return item
+    item = _new_item(name, url, desc, logo, video, raw_cat)
+    _checkpoint(item, "parsed")
+    return item
+
+
+def process_one_item(name, url, desc, logo=None, video=None, raw_cat=""):
+    if not _claim_url(url):
+        print(f"Skipping (Exists): {name}")
+        return
+
+    print(f"Processing NEW Tool: {name} ({url})")
+    item = _resume_or_new(name, url, desc, logo, video, raw_cat)
+    try:
+        for stage in (_stage_llm, _stage_screenshot, _stage_media):
+            item = stage(item)
+    except Exception:
+        _release_url(url)
+        raise
+    _stage_inject(item)
+    TOOL_WRITER.flush()
+
+
+def build_ingest_pipeline() -> Pipeline:
+    """LLM -> screenshot -> media -> inject, each stage with its own worker pool."""
+    return Pipeline(
+        [
+            Stage("llm", _stage_llm, PIPELINE_LLM_WORKERS, PIPELINE_QUEUE_SIZE),
+            Stage("browser", _stage_screenshot, PIPELINE_BROWSER_WORKERS, PIPELINE_QUEUE_SIZE),
+            Stage("media", _stage_media, PIPELINE_MEDIA_WORKERS, PIPELINE_QUEUE_SIZE),
+            Stage("api", _stage_inject, PIPELINE_API_WORKERS, PIPELINE_QUEUE_SIZE),
+        ],
+        name="ingest",
+    )
+
+
+def enqueue_item(pipe: Pipeline, name, url, desc, logo=None, video=None, raw_cat=""):
+    if not _claim_url(url):
+        print(f"Skipping (Exists): {name}")
+        METRICS.incr("items", source=raw_cat, result="skipped")
+        return
+    print(f"Queued NEW Tool: {name} ({url})")
+    METRICS.incr("items", source=raw_cat, result="queued")
+    pipe.submit(_resume_or_new(name, url, desc, logo, video, raw_cat))
+
+
+def _resume_pending(pipe: Pipeline, raw_cat):
+    """Re-queues items an interrupted run of `raw_cat` left unfinished, before the fresh listing."""
+    pending = JOURNAL.pending(raw_cat)
+    if pending:
+        print(f"Resuming {len(pending)} unfinished {raw_cat} items from the crawl journal")
+    for item in pending:
+        if _claim_url(item["url"]):
+            print(f"Resuming Tool: {item['name']} after stage '{item['stage']}'")
+            pipe.submit(item)
+
+
+def _finish_pipeline(pipe: Pipeline, raw_cat):
+    pipe.close()
+    TOOL_WRITER.flush()
+    pruned = JOURNAL.prune(raw_cat)
+    print(f"Crawl journal: {pruned} injected {raw_cat} items pruned, {len(JOURNAL.pending(raw_cat))} left to resume")
+    # 被中途丢弃的条目不会走到 inject 阶段, 这里统一释放
+    with _IN_FLIGHT_LOCK:
+        _IN_FLIGHT.clear()
+    print(f"Ingest pipeline finished: {pipe.summary()}")
+    print(f"LLM cache: {LLM_CACHE.stats()}")
 
 
 # --- 采集引擎 1: AIGC.CN ---
 def run_aigc_cn():
     print("\n--- 全量采集 AIGC.CN ---")
-    url = "https://www.aigc.cn/"
-    r = requests.get(url, headers={"User-Agent": "Mozilla/5.0"})
-    soup = BeautifulSoup(r.text, "html.parser")
+    with METRICS.span("aigc_cn.listing_fetch"):
+        r = requests.get(AIGC_CN_URL, headers={"User-Agent": "Mozilla/5.0"})
 
-    # 获取首页所有的工具列表
-    cards = soup.select(".url-card")
+    # 获取首页所有的工具列表 (在解析进程池里完成)
+    with METRICS.span("html.parse_cards"):
+        cards = parse_cards(r.text, AIGC_CN_CARDS)
     print(f"Total potential tools found on AIGC.CN: {len(cards)}")
+    pipe = build_ingest_pipeline().start()
+    _resume_pending(pipe, "AIGC_CN")
     for card in cards:
         try:
-            # 修改选择器以适应 OneNav 主题
-            title_el = card.select_one(".item-title, strong, h4")
-            if not title_el:
+            name = card["name"]
+            if not name:
                 continue
-            name = title_el.get_text(strip=True)
 
-            link_el = card.select_one("a")
-            link = link_el.get("data-url") or link_el.get("href") if link_el else None
+            link = card["link"]
             if not link or "javascript" in link:
                 continue
 
-            desc_el = card.select_one(".item-desc, .xe-content")
-            desc = desc_el.get_text(strip=True) if desc_el else f"{name} AI tool"
+            desc = card["desc"] or f"{name} AI tool"
 
-            img_el = card.select_one("img")
-            logo = img_el.get("data-src") or img_el.get("src") if img_el else None
-
-            # 推入队列处理
-            process_one_item(name, link, desc, logo, raw_cat="AIGC_CN")
-            time.sleep(2)  # 保护 DeepSeek API
+            # 推入队列处理 (LLM 并发由 llm 阶段的 worker 数限制)
+            enqueue_item(pipe, name, link, desc, card["logo"], raw_cat="AIGC_CN")
         except Exception as e:
             print(f"Card processing error: {e}")
+    _finish_pipeline(pipe, "AIGC_CN")
 
 
 # --- 采集引擎 2: AIGC.IZZI.CN ---
+# 每次滚动后等待新卡片出现的最长时间
+IZZI_SCROLL_WAIT_MS = int(os.getenv("IZZI_SCROLL_WAIT_MS", "8000"))
+# 连续遇到这么多已收录的 URL 后停止滚动 (0 = 始终滚动到底)
+IZZI_KNOWN_STOP = int(os.getenv("IZZI_KNOWN_STOP", "60"))
+
+# 只收集上次之后新出现的卡片, 并打上标记; 一次 evaluate 完成全部字段读取
+_IZZI_HARVEST_JS = """
+() => Array.from(document.querySelectorAll('.card:not([data-harvested])')).map(card => {
+    card.setAttribute('data-harvested', '1');
+    const text = sel => { const el = card.querySelector(sel); return el ? el.innerText.trim() : ''; };
+    const a = card.querySelector('a');
+    return { name: text('.card-title'), link: a ? a.getAttribute('href') : null, desc: text('.card-text') };
+})
+"""
+
+# 滚动到底后, 用 MutationObserver 等待新卡片插入; 超时返回 false
+_IZZI_SCROLL_JS = """
+(timeout) => new Promise(resolve => {
+    const count = () => document.querySelectorAll('.card').length;
+    const before = count();
+    const observer = new MutationObserver(() => {
+        if (count() > before) { observer.disconnect(); resolve(true); }
+    });
+    observer.observe(document.body, { childList: true, subtree: true });
+    setTimeout(() => { observer.disconnect(); resolve(count() > before); }, timeout);
+    window.scrollTo(0, document.body.scrollHeight);
+})
+"""
+
+
+def _harvest_izzi_cards(page, on_batch):
+    """
+    Scrolls IZZI.CN and hands each batch of newly rendered cards to
+    `on_batch` as (name, link, desc) tuples while the page keeps loading.
+    """
+    page.goto(IZZI_CN_URL, timeout=60000, wait_until="domcontentloaded")
+    page.wait_for_selector(".card", timeout=30000)
+
+    known_run = 0
+    harvested = 0
+    while True:
+        batch = []
+        for card in page.evaluate(_IZZI_HARVEST_JS):
+            if not card["name"] or not card["link"]:
+                continue
+            batch.append((card["name"], card["link"], card["desc"]))
+            known_run = known_run + 1 if DEDUP.contains(card["link"]) else 0
+        if batch:
+            harvested += len(batch)
+            on_batch(batch)
+
+        if IZZI_KNOWN_STOP and known_run >= IZZI_KNOWN_STOP:
+            print(f"IZZI: {known_run} known tools in a row, stopping early after {harvested} cards")
+            break
+        if not page.evaluate(_IZZI_SCROLL_JS, IZZI_SCROLL_WAIT_MS):
+            # 观察期内没有新卡片: 再给懒加载请求一次 networkidle 的机会
+            try:
+                page.wait_for_load_state("networkidle", timeout=IZZI_SCROLL_WAIT_MS)
+            except Exception:
+                pass
+            if not page.evaluate("document.querySelector('.card:not([data-harvested])') !== null"):
+                break
+        print(f"Scrolling for more data... ({harvested} cards so far)")
+    return harvested
+
+
 def run_izzi_cn():
     print("\n--- 全量采集 IZZI.CN ---")
-    with sync_playwright() as p:
-        browser = p.chromium.launch()
-        page = browser.new_page()
+    pipe = build_ingest_pipeline().start()
+    _resume_pending(pipe, "IZZI_CN")
+
+    # 滚动任务占一个浏览器槽位, 通过无界队列把卡片交给当前线程入流水线;
+    # 浏览器线程永远不会因流水线反压而阻塞 (截图阶段也需要槽位)
+    batches = queue.Queue()
+    harvest = get_pool().submit(_harvest_izzi_cards, batches.put)
+    started = time.monotonic()
+    while True:
         try:
-            page.goto("https://aigc.izzi.cn/", timeout=60000)
-
-            # --- 自动滚动到底部以加载全量数据 ---
-            last_height = page.evaluate("document.body.scrollHeight")
-            while True:
-                page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-                page.wait_for_timeout(2000)  # 等待渲染新卡片
-                new_height = page.evaluate("document.body.scrollHeight")
-                if new_height == last_height:
-                    break
-                last_height = new_height
-                print("Scrolling for more data...")
-
-            cards = page.query_selector_all(".card")
-            print(f"Total potential tools found on IZZI.CN: {len(cards)}")
-            for card in cards:
-                try:
-                    name = card.query_selector(".card-title").inner_text()
-                    link = card.query_selector("a").get_attribute("href")
-                    desc = (
-                        card.query_selector(".card-text").inner_text()
-                        if card.query_selector(".card-text")
-                        else ""
-                    )
-
-                    process_one_item(name, link, desc, raw_cat="IZZI_CN")
-                    time.sleep(2)
-                except Exception as e:
-                    print(f"IZZI tool error: {e}")
-        finally:
-            browser.close()
+            batch = batches.get(timeout=1)
+        except queue.Empty:
+            if harvest.done() and batches.empty():
+                break
+            continue
+        for name, link, desc in batch:
+            try:
+                enqueue_item(pipe, name, link, desc, raw_cat="IZZI_CN")
+            except Exception as e:
+                print(f"IZZI tool error: {e}")
+
+    try:
+        print(f"Total potential tools found on IZZI.CN: {harvest.result()}")
+        METRICS.observe("izzi.harvest", time.monotonic() - started)
+    except Exception as e:
+        METRICS.observe("izzi.harvest", time.monotonic() - started, failed=True)
+        print(f"IZZI harvest failed: {e}")
+    _finish_pipeline(pipe, "IZZI_CN")
 
 
 if __name__ == "__main__":
+    check_config()
     fetch_existing_urls()
     run_aigc_cn()
     run_izzi_cn()
@@ -0,0 +1,87 @@
+"""
+Image decoding and re-encoding, the target of the media_transcode process
+pool. Spawned workers import only this module and Pillow, so keep crawler
+config, metrics and shared state out of it.
+"""
+import io
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+try:
+    import pillow_avif  # noqa: F401  旧版 Pillow 通过插件获得 AVIF 支持
+except ImportError:
+    pass
+
+# 每类素材输出的尺寸: (变体名, 宽, 高); 高为 None 表示按比例缩放且不放大
+VARIANT_SPECS = {
+    "screenshot": [("full", 1280, None), ("thumb", 480, 270)],
+    "logo": [("full", 256, None), ("thumb", 64, 64)],
+}
+
+FORMATS = {
+    "webp": ("WEBP", "image/webp", ".webp"),
+    "avif": ("AVIF", "image/avif", ".avif"),
+}
+
+
+def available() -> bool:
+    return Image is not None
+
+
+def _formats():
+    exts = Image.registered_extensions()
+    return [f for f, (_, _, ext) in FORMATS.items() if ext in exts]
+
+
+def _resize(img, width, height, kind):
+    if height is None:
+        img = img.copy()
+        img.thumbnail((width, width * 4))
+        return img
+    if kind == "logo":
+        # Logo 不裁切, 透明补边成正方形
+        return ImageOps.pad(img, (width, height), color=(0, 0, 0, 0))
+    return ImageOps.fit(img, (width, height))
+
+
+def encode_variants(data: bytes, kind: str, webp_quality: int = 80, avif_quality: int = 55) -> list[dict]:
+    """
+    Decodes one image and re-encodes every size in VARIANT_SPECS[kind] to
+    every supported modern format. Runs inside the worker processes.
+    Returns [] for anything Pillow cannot handle (SVG, ICO quirks, animation).
+    """
+    try:
+        img = Image.open(io.BytesIO(data))
+        if getattr(img, "is_animated", False):
+            return []
+        img.load()
+    except Exception:
+        return []
+
+    img = img.convert("RGBA" if img.mode in ("RGBA", "LA", "P") else "RGB")
+    variants = []
+    for name, width, height in VARIANT_SPECS[kind]:
+        resized = _resize(img, width, height, kind)
+        for fmt in _formats():
+            pil_format, content_type, ext = FORMATS[fmt]
+            quality = avif_quality if fmt == "avif" else webp_quality
+            buf = io.BytesIO()
+            try:
+                resized.save(buf, pil_format, quality=quality)
+            except Exception:
+                continue
+            variants.append(
+                {
+                    "name": name,
+                    "format": fmt,
+                    "data": buf.getvalue(),
+                    "content_type": content_type,
+                    "ext": ext,
+                    "width": resized.width,
+                    "height": resized.height,
+                }
+            )
+    return variants
@@ -0,0 +1,115 @@
+import json
+import time
+import threading
+import state_db
+
+
+class MediaIndex:
+    """
+    Local record of what is already in R2.
+
+    `objects` maps a SHA-256 content digest to its R2 key / public URL;
+    `variants` keeps the transcoded-variant manifest of an original digest;
+    `sources` maps a remote media URL to the digest it last resolved to plus
+    the ETag / Last-Modified validators used to revalidate it cheaply.
+    """
+
+    def __init__(self, filename: str = "media_index.sqlite"):
+        self._filename = filename
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _db(self):
+        if self._conn is None:
+            self._conn = state_db.connect(self._filename)
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS objects (
+                    digest TEXT PRIMARY KEY,
+                    key TEXT NOT NULL,
+                    public_url TEXT NOT NULL,
+                    size INTEGER,
+                    content_type TEXT,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS variants (digest TEXT PRIMARY KEY, manifest TEXT NOT NULL)"
+            )
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS sources (
+                    url TEXT PRIMARY KEY,
+                    digest TEXT NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    checked_at REAL NOT NULL
+                )
+                """
+            )
+        return self._conn
+
+    def object_by_key(self, key: str) -> dict | None:
+        with self._lock:
+            row = self._db().execute(
+                "SELECT digest, public_url FROM objects WHERE key = ?", (key,)
+            ).fetchone()
+        return {"digest": row[0], "public_url": row[1]} if row else None
+
+    def put_object(self, digest: str, key: str, public_url: str, size: int, content_type: str):
+        with self._lock:
+            self._db().execute(
+                "INSERT OR REPLACE INTO objects (digest, key, public_url, size, content_type, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (digest, key, public_url, size, content_type, time.time()),
+            )
+
+    def variants(self, digest: str) -> dict | None:
+        with self._lock:
+            row = self._db().execute(
+                "SELECT manifest FROM variants WHERE digest = ?", (digest,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_variants(self, digest: str, manifest: dict):
+        with self._lock:
+            self._db().execute(
+                "INSERT OR REPLACE INTO variants (digest, manifest) VALUES (?, ?)",
+                (digest, json.dumps(manifest)),
+            )
+
+    def source(self, url: str) -> dict | None:
+        with self._lock:
+            row = self._db().execute(
+                "SELECT s.digest, s.etag, s.last_modified, s.checked_at, o.public_url "
+                "FROM sources s JOIN objects o ON o.digest = s.digest WHERE s.url = ?",
+                (url,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "digest": row[0],
+            "etag": row[1],
+            "last_modified": row[2],
+            "checked_at": row[3],
+            "public_url": row[4],
+        }
+
+    def put_source(self, url: str, digest: str, etag: str | None, last_modified: str | None):
+        with self._lock:
+            self._db().execute(
+                "INSERT OR REPLACE INTO sources (url, digest, etag, last_modified, checked_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (url, digest, etag, last_modified, time.time()),
+            )
+
+    def touch_source(self, url: str):
+        with self._lock:
+            self._db().execute(
+                "UPDATE sources SET checked_at = ? WHERE url = ?", (time.time(), url)
+            )
+
+
+# 进程级共享索引
+MEDIA_INDEX = MediaIndex()
@@ -0,0 +1,174 @@
+import uuid
+import hashlib
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+MB = 1024 * 1024
+
+
+class MediaTooLarge(Exception):
+    pass
+
+
+def _read_part(chunks, part_size: int) -> bytes:
+    buf = bytearray()
+    for chunk in chunks:
+        if chunk:
+            buf += chunk
+            if len(buf) >= part_size:
+                break
+    return bytes(buf)
+
+
+def stream_upload(
+    s3,
+    bucket: str,
+    key: str,
+    chunks,
+    content_type: str,
+    part_size: int = 8 * MB,
+    concurrency: int = 4,
+    max_bytes: int | None = None,
+    cache_control: str = "public, max-age=31536000",
+) -> int:
+    """
+    Streams an iterator of byte chunks into R2/S3 and returns the byte count.
+
+    Bodies that fit in one part go out as a plain put_object. Larger ones use
+    a multipart upload with at most `concurrency` parts in flight, so peak
+    memory stays around (concurrency + 1) * part_size whatever the file size.
+    Raises MediaTooLarge (after aborting the upload) past `max_bytes`.
+    """
+    chunks = iter(chunks)
+    first = _read_part(chunks, part_size)
+    if max_bytes is not None and len(first) > max_bytes:
+        raise MediaTooLarge(f"{key}: exceeds {max_bytes} bytes")
+    second = _read_part(chunks, part_size)
+
+    if not second:
+        s3.put_object(
+            Bucket=bucket,
+            Key=key,
+            Body=first,
+            ContentType=content_type,
+            CacheControl=cache_control,
+        )
+        return len(first)
+
+    upload_id = s3.create_multipart_upload(
+        Bucket=bucket, Key=key, ContentType=content_type, CacheControl=cache_control
+    )["UploadId"]
+    slots = threading.BoundedSemaphore(concurrency)
+
+    def _put(number: int, body: bytes):
+        try:
+            res = s3.upload_part(
+                Bucket=bucket, Key=key, UploadId=upload_id, PartNumber=number, Body=body
+            )
+            return {"PartNumber": number, "ETag": res["ETag"]}
+        finally:
+            slots.release()
+
+    def _parts():
+        yield first
+        yield second
+        while True:
+            part = _read_part(chunks, part_size)
+            if not part:
+                return
+            yield part
+
+    total = 0
+    futures = []
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for number, part in enumerate(_parts(), start=1):
+                total += len(part)
+                if max_bytes is not None and total > max_bytes:
+                    raise MediaTooLarge(f"{key}: exceeds {max_bytes} bytes")
+                failed = next((f for f in futures if f.done() and f.exception()), None)
+                if failed is not None:
+                    raise failed.exception()
+                slots.acquire()  # 反压: 在途分片达到上限时暂停读取下载流
+                futures.append(pool.submit(_put, number, part))
+
+            parts = [f.result() for f in futures]
+
+        s3.complete_multipart_upload(
+            Bucket=bucket, Key=key, UploadId=upload_id, MultipartUpload={"Parts": parts}
+        )
+        return total
+    except BaseException:
+        try:
+            s3.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id)
+        except Exception:
+            pass
+        raise
+
+
+def _hashing(chunks, hasher):
+    for chunk in chunks:
+        if chunk:
+            hasher.update(chunk)
+            yield chunk
+
+
+def store_by_digest(
+    s3,
+    bucket: str,
+    chunks,
+    make_key,
+    is_stored,
+    content_type: str,
+    part_size: int = 8 * MB,
+    concurrency: int = 4,
+    max_bytes: int | None = None,
+    cache_control: str = "public, max-age=31536000",
+):
+    """
+    Stores a body under a key derived from its SHA-256 (`make_key(digest)`),
+    skipping the write when `is_stored(key)` says it is already there.
+
+    Small bodies are hashed in memory before any request is made. Large ones
+    are streamed to a temporary key while hashing, then server-side copied to
+    the digest key (or dropped if that key already exists).
+
+    Returns (key, digest, size, reused).
+    """
+    chunks = iter(chunks)
+    first = _read_part(chunks, part_size)
+    second = _read_part(chunks, part_size)
+
+    if not second:
+        if max_bytes is not None and len(first) > max_bytes:
+            raise MediaTooLarge(f"exceeds {max_bytes} bytes")
+        digest = hashlib.sha256(first).hexdigest()
+        key = make_key(digest)
+        if is_stored(key):
+            return key, digest, len(first), True
+        stream_upload(s3, bucket, key, [first], content_type, part_size, concurrency, max_bytes, cache_control)
+        return key, digest, len(first), False
+
+    hasher = hashlib.sha256()
+    body = _hashing(itertools.chain([first, second], chunks), hasher)
+    tmp_key = f"tmp/{uuid.uuid4().hex}"
+    size = stream_upload(
+        s3, bucket, tmp_key, body, content_type, part_size, concurrency, max_bytes, cache_control
+    )
+    digest = hasher.hexdigest()
+    key = make_key(digest)
+    try:
+        reused = is_stored(key)
+        if not reused:
+            s3.copy_object(
+                Bucket=bucket,
+                Key=key,
+                CopySource={"Bucket": bucket, "Key": tmp_key},
+                ContentType=content_type,
+                CacheControl=cache_control,
+                MetadataDirective="REPLACE",
+            )
+    finally:
+        s3.delete_object(Bucket=bucket, Key=tmp_key)
+    return key, digest, size, reused
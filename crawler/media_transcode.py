@@ -0,0 +1,44 @@
+import os
+import atexit
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import crawler_env  # noqa: F401
+from media_encode import available, encode_variants
+
+# 图片转码进程数 (0 = 在调用线程内直接编码)
+MEDIA_TRANSCODE_WORKERS = int(os.getenv("MEDIA_TRANSCODE_WORKERS", "2"))
+MEDIA_WEBP_QUALITY = int(os.getenv("MEDIA_WEBP_QUALITY", "80"))
+MEDIA_AVIF_QUALITY = int(os.getenv("MEDIA_AVIF_QUALITY", "55"))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn: 父进程里有 Playwright 等线程, fork 出来的子进程可能死锁.
+            # 子进程只需要 media_encode; 入口模块仍会被重新导入, 所以入口模块导入时不能有副作用
+            _executor = ProcessPoolExecutor(
+                max_workers=MEDIA_TRANSCODE_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            atexit.register(_executor.shutdown)
+        return _executor
+
+
+def transcode(data: bytes, kind: str) -> list[dict]:
+    """Encodes variants in the process pool so CPU work never blocks crawler threads."""
+    if not available() or not data:
+        return []
+    # 画质在父进程里读好再传给子进程, 子进程不读配置
+    args = (data, kind, MEDIA_WEBP_QUALITY, MEDIA_AVIF_QUALITY)
+    if MEDIA_TRANSCODE_WORKERS <= 0:
+        return encode_variants(*args)
+    try:
+        return _get_executor().submit(encode_variants, *args).result(timeout=120)
+    except Exception as e:
+        print(f"  [Transcode] Failed ({kind}): {e}")
+        return []
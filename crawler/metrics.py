@@ -0,0 +1,257 @@
+import os
+import json
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import crawler_env  # noqa: F401
+import state_db
+
+# Prometheus 直方图桶 (秒)
+SPAN_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+# 每个 span 保留的最近样本数, 用于运行摘要里的 p50/p95
+SPAN_SAMPLES = int(os.getenv("METRICS_SPAN_SAMPLES", "5000"))
+# 运行摘要 (JSONL) 的存放位置
+RUN_LOG_PATH = os.getenv("CRAWLER_RUN_LOG") or os.path.join(state_db.STATE_DIR, "runs.jsonl")
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted(labels.items()))
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _fmt_labels(key: tuple, extra: dict | None = None) -> str:
+    pairs = list(key) + sorted((extra or {}).items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class _Span:
+    def __init__(self):
+        self.buckets = [0] * len(SPAN_BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+        self.errors = 0
+        self.samples = deque(maxlen=SPAN_SAMPLES)  # (结束时间, 耗时)
+
+
+class Metrics:
+    """
+    Process-wide counters, gauges and timed spans.
+
+    Spans land in one histogram (`crawler_span_seconds{span=...}`) plus an
+    error counter; counters are exported as `crawler_<name>_total`. Label
+    values should stay low-cardinality (stage names, outcomes), never URLs.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._spans = {}
+
+    def incr(self, name: str, value: float = 1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        with self._lock:
+            self._gauges[(name, _label_key(labels))] = value
+
+    def observe(self, span: str, seconds: float, failed: bool = False):
+        with self._lock:
+            s = self._spans.get(span)
+            if s is None:
+                s = self._spans[span] = _Span()
+            for i, bound in enumerate(SPAN_BUCKETS):
+                if seconds <= bound:
+                    s.buckets[i] += 1
+            s.count += 1
+            s.sum += seconds
+            if failed:
+                s.errors += 1
+            s.samples.append((time.time(), seconds))
+
+    @contextmanager
+    def span(self, name: str):
+        """Times the block under `name`; exceptions count as errors and propagate."""
+        started = time.monotonic()
+        failed = False
+        try:
+            yield
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            self.observe(name, time.monotonic() - started, failed)
+
+    def counters(self) -> dict:
+        with self._lock:
+            return dict(self._counters)
+
+    def span_stats(self, since: float = 0.0) -> dict:
+        """count / errors / total / p50 / p95 per span, over samples that ended after `since`."""
+        with self._lock:
+            spans = {name: (list(s.samples), s.errors) for name, s in self._spans.items()}
+        stats = {}
+        for name, (samples, _) in spans.items():
+            xs = sorted(d for t, d in samples if t >= since)
+            if not xs:
+                continue
+            stats[name] = {
+                "count": len(xs),
+                "total_s": round(sum(xs), 3),
+                "p50_s": round(xs[len(xs) // 2], 3),
+                "p95_s": round(xs[min(len(xs) - 1, int(0.95 * len(xs)))], 3),
+            }
+        return stats
+
+    def span_errors(self) -> dict:
+        with self._lock:
+            return {name: s.errors for name, s in self._spans.items()}
+
+    def render(self) -> str:
+        """Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            counter_names = sorted({name for name, _ in self._counters})
+            for name in counter_names:
+                metric = f"crawler_{name}_total"
+                lines.append(f"# TYPE {metric} counter")
+                for (n, key), value in sorted(self._counters.items()):
+                    if n == name:
+                        lines.append(f"{metric}{_fmt_labels(key)} {value}")
+
+            gauge_names = sorted({name for name, _ in self._gauges})
+            for name in gauge_names:
+                metric = f"crawler_{name}"
+                lines.append(f"# TYPE {metric} gauge")
+                for (n, key), value in sorted(self._gauges.items()):
+                    if n == name:
+                        lines.append(f"{metric}{_fmt_labels(key)} {value}")
+
+            if self._spans:
+                lines.append("# TYPE crawler_span_seconds histogram")
+                for name, s in sorted(self._spans.items()):
+                    label = (("span", name),)
+                    for bound, n in zip(SPAN_BUCKETS, s.buckets):
+                        lines.append(f"crawler_span_seconds_bucket{_fmt_labels(label, {'le': bound})} {n}")
+                    lines.append(f"crawler_span_seconds_bucket{_fmt_labels(label, {'le': '+Inf'})} {s.count}")
+                    lines.append(f"crawler_span_seconds_sum{_fmt_labels(label)} {round(s.sum, 6)}")
+                    lines.append(f"crawler_span_seconds_count{_fmt_labels(label)} {s.count}")
+                lines.append("# TYPE crawler_span_errors_total counter")
+                for name, s in sorted(self._spans.items()):
+                    lines.append(f"crawler_span_errors_total{_fmt_labels((('span', name),))} {s.errors}")
+        return "\n".join(lines) + "\n"
+
+
+# 进程级共享
+METRICS = Metrics()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = METRICS.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_metrics_server(port: int, host: str = "0.0.0.0"):
+    """Serves /metrics for Prometheus from a daemon thread."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True, name="metrics-http").start()
+    print(f"Prometheus metrics on http://{host}:{port}/metrics")
+    return server
+
+
+def run_summary(job: str, started_at: float, counters_before: dict, errors_before: dict,
+                status: str, error: str | None = None) -> dict:
+    """
+    Structured summary of one job run, shaped like a CrawlerLog row
+    ({status, message}) with the numbers under `details`. Runs of other jobs
+    that overlap in time share the process-wide metrics, so their spans show
+    up in each other's summaries.
+    """
+    finished_at = time.time()
+    counters = {}
+    for (name, key), value in METRICS.counters().items():
+        delta = value - counters_before.get((name, key), 0)
+        if delta:
+            label = name + ("" if not key else "{" + ",".join(f"{k}={v}" for k, v in key) + "}")
+            counters[label] = delta
+    spans = METRICS.span_stats(since=started_at)
+    for name, errors in METRICS.span_errors().items():
+        if name in spans:
+            spans[name]["errors"] = errors - errors_before.get(name, 0)
+
+    duration = round(finished_at - started_at, 1)
+    slowest = sorted(spans.items(), key=lambda kv: kv[1]["total_s"], reverse=True)[:3]
+    message = f"{job} {'finished' if status == 'SUCCESS' else 'failed'} in {duration}s"
+    if slowest:
+        message += "; time in " + ", ".join(f"{n} {s['total_s']:.0f}s" for n, s in slowest)
+    if error:
+        message += f"; error: {error[:200]}"
+    return {
+        "status": status,
+        "message": message,
+        "details": {
+            "job": job,
+            "started_at": started_at,
+            "finished_at": finished_at,
+            "duration_s": duration,
+            "counters": counters,
+            "spans": spans,
+            "error": error,
+        },
+    }
+
+
+def write_run_summary(summary: dict, path: str = RUN_LOG_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(summary, ensure_ascii=False) + "\n")
+
+
+@contextmanager
+def recorded_run(job: str, on_summary=None):
+    """
+    Wraps one job run: appends its summary to RUN_LOG_PATH and hands it to
+    `on_summary` (e.g. to post it as a CrawlerLog). Exceptions propagate.
+    """
+    started_at = time.time()
+    counters_before = METRICS.counters()
+    errors_before = METRICS.span_errors()
+    status, error = "SUCCESS", None
+    try:
+        yield
+    except Exception as e:
+        status, error = "FAILED", str(e)
+        raise
+    finally:
+        METRICS.incr("job_runs", job=job, status=status.lower())
+        METRICS.set_gauge("job_last_run_timestamp_seconds", time.time(), job=job)
+        METRICS.set_gauge("job_last_run_duration_seconds", round(time.time() - started_at, 3), job=job)
+        summary = run_summary(job, started_at, counters_before, errors_before, status, error)
+        try:
+            write_run_summary(summary)
+            if on_summary is not None:
+                on_summary(summary)
+        except Exception as e:
+            print(f"[Metrics] Could not record run summary for {job}: {e}")
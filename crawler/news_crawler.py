@@ -1,22 +1,14 @@
 import os
-import requests
-import time
-import feedparser
-from duckduckgo_search import DDGS
-from dotenv import load_dotenv
-from llm_processor import process_news_content
-
-# Setup Env
-CRAWLER_ENV_PATH = os.path.join(os.path.dirname(__file__), ".env")
-load_dotenv(CRAWLER_ENV_PATH)
-
-API_URL = os.getenv("CRAWLER_API_URL")
-if API_URL:
-    NEWS_API_URL = API_URL.replace("/tools/inject", "/news/inject")
-else:
-    NEWS_API_URL = "http://localhost:3000/api/admin/news/inject"
-
-API_KEY = os.getenv("API_SECRET_KEY")
+import asyncio
+import crawler_env  # noqa: F401
+from llm_async import process_news_content_async
+from llm_processor import check_config
+from dedup_index import DEDUP
+from inject_writer import BatchWriter, NEWS_BULK_API_URL
+from feed_fetcher import FEEDS, fetch_feeds
+from metrics import METRICS
+import search_service
+from story_cluster import cluster_entries, canonical_links
 
 # RSS Feeds targeting AI News
 RSS_FEEDS = [
@@ -25,81 +17,106 @@ RSS_FEEDS = [
     "https://www.reddit.com/r/artificial/.rss",
     "https://www.reddit.com/r/MachineLearning/.rss"
 ]
+# 逗号分隔, 覆盖默认源 (如基准测试的本地 RSS)
+if os.getenv("NEWS_RSS_FEEDS"):
+    RSS_FEEDS = [u.strip() for u in os.getenv("NEWS_RSS_FEEDS").split(",") if u.strip()]
 
 KEYWORDS = ["ai", "llm", "openai", "chatgpt", "deepseek", "claude", "midjourney", "gemini", "anthropic", "llama", "artificial intelligence", "machine learning"]
 
+
+def _report(story):
+    def on_result(payload, result):
+        if result.get("success"):
+            print(f"✅ Success injected News: {payload['title']}")
+            # 同一事件的其他条目随代表条目一起处理完毕
+            links = [payload["sourceUrl"]] + [link for _, e in story.members for link in canonical_links(e)]
+            DEDUP.add_many(links, "news", source="news")
+            for feed_url, entry in story.members:
+                FEEDS.mark_seen(feed_url, [entry])
+        else:
+            print(f"❌ Failed to inject news: {result.get('status')} {result.get('error')}")
+    return on_result
+
+
+async def _write_article(job, search_future):
+    # 搜索在 search_service 的线程池里预取, 先到的条目先进 LLM
+    results = await asyncio.wrap_future(search_future)
+    title_en, link, desc_en, sibling_context = job
+    external_context = sibling_context + search_service.format_context(results)
+    return await process_news_content_async(title_en, link, desc_en, external_context)
+
+
+async def _write_articles(jobs, searches):
+    return await asyncio.gather(*(_write_article(job, f) for job, f in zip(jobs, searches)))
+
+
 def crawl_news():
     print("\n--- Starting Multi-Source AI News Crawler ---")
     
-    # Reddit and some RSS endpoints block default python user-agents
-    feedparser.USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-    
     ai_entries = []
 
-    for feed_url in RSS_FEEDS:
-        print(f"Fetching RSS: {feed_url}")
-        try:
-            # Use requests to fetch the content first as feedparser struggles with CDNs/Cloudflare
-            headers = {"User-Agent": feedparser.USER_AGENT}
-            r = requests.get(feed_url, headers=headers, timeout=15)
-            r.raise_for_status()
-            
-            feed = feedparser.parse(r.text)
-            if not feed.entries:
-                print(f"  Empty RSS feed returned from {feed_url}")
-                continue
-
-            # Filter entries
-            for entry in feed.entries:
-                title_lower = entry.title.lower()
-                if any(kw in title_lower for kw in KEYWORDS):
-                    ai_entries.append(entry)
-        except Exception as e:
-            print(f"  Error fetching {feed_url}: {e}")
-
-    print(f"Found {len(ai_entries)} recent AI-related news items across all sources.")
+    # 条件请求并发抓取; 304 的源只重放上次未处理完的条目
+    for feed_url, result in fetch_feeds(RSS_FEEDS).items():
+        print(f"Fetched RSS: {feed_url} ({result.status}, {len(result.new)} unseen)")
+        if result.status == "error":
+            print(f"  Error fetching {feed_url}: {result.error}")
+            continue
+        if not result.entries:
+            print(f"  Empty RSS feed returned from {feed_url}")
+            continue
+
+        # Filter entries; irrelevant or already published ones are never looked at again
+        skipped = []
+        for entry in result.new:
+            title_lower = entry.title.lower()
+            published = any(DEDUP.contains(link, "news") for link in canonical_links(entry))
+            if any(kw in title_lower for kw in KEYWORDS) and not published:
+                ai_entries.append((feed_url, entry))
+            else:
+                skipped.append(entry)
+        FEEDS.mark_seen(feed_url, skipped)
+
+    print(f"Found {len(ai_entries)} new AI-related news items across all sources.")
+    METRICS.incr("news_candidates", len(ai_entries))
+
+    # 同一事件常被多个源同时报道: 先按规范链接 / 标题相似度聚成故事, 每个故事只写一篇
+    stories = cluster_entries(ai_entries)
+    print(f"Clustered into {len(stories)} distinct stories ({len(ai_entries) - len(stories)} duplicates merged).")
+    METRICS.incr("news_duplicates", len(ai_entries) - len(stories))
     
-    # Process up to Top 8 items to avoid rate limits but ensure fresh content
-    for entry in ai_entries[:8]:
+    # Process up to Top 8 stories to avoid rate limits but ensure fresh content
+    jobs = []
+    searches = []
+    sources = []
+    for story in stories[:8]:
+        entry = story.entry
         title_en = entry.title
         link = entry.link
         desc_en = entry.get("description", "")[:200]
         
-        print(f"Processing News: {title_en}")
+        print(f"Processing News: {title_en}" + (f" (+{len(story.siblings)} related)" if story.siblings else ""))
         
-        # --- Gather Deep Context via DDGS ---
+        # --- Gather Deep Context via DDGS (queued for the whole batch up front, cached per query) ---
         print(f"  [Web Search] Gathering deep background info for: {title_en}...")
-        external_context = ""
-        try:
-             # Search for recent news and discussions about this topic
-             results = DDGS().text(f"{title_en} AI technology news OR review", max_results=4)
-             for res in results:
-                 external_context += f"- [{res['title']}]({res['href']}): {res['body']}\n"
-        except Exception as e:
-             print(f"  [Web Search] DDG search failed: {e}")
-             
-        # Call deepseek brain with deep context
-        llm_res = process_news_content(title_en, link, desc_en, external_context)
-        
-        payload = {
-            "title": llm_res.get("title_zh", title_en),
-            "content": llm_res.get("content_zh", f"Source: {link}\n{desc_en}"),
-            "sourceUrl": link,
-            "status": "PUBLISHED"
-        }
-        
-        headers = {"Authorization": f"Bearer {API_KEY}", "Content-Type": "application/json"}
-        try:
-            r = requests.post(NEWS_API_URL, headers=headers, json=payload, timeout=10)
-            if r.status_code == 200:
-                print(f"✅ Success injected News: {payload['title']}")
-            else:
-                print(f"❌ Failed to inject news: {r.status_code}")
-        except Exception as e:
-            print(f"❌ API Request failed: {e}")
-            
-        time.sleep(3)
+        searches.append(search_service.submit(f"{title_en} AI technology news OR review", max_results=4))
+
+        jobs.append((title_en, link, desc_en, story.context()))
+        sources.append(story)
+
+    # Call deepseek brain with deep context, all items concurrently (paced by the shared rate limiter)
+    with METRICS.span("news.write_articles"):
+        llm_results = asyncio.run(_write_articles(jobs, searches))
 
+    with BatchWriter(NEWS_BULK_API_URL) as writer:
+        for (title_en, link, desc_en, _), llm_res, story in zip(jobs, llm_results, sources):
+            payload = {
+                "title": llm_res.get("title_zh", title_en),
+                "content": llm_res.get("content_zh", f"Source: {link}\n{desc_en}"),
+                "sourceUrl": link,
+                "status": "PUBLISHED"
+            }
+            writer.add(payload, on_result=_report(story))
 
 if __name__ == "__main__":
+    check_config()
     crawl_news()
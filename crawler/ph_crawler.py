@@ -1,81 +1,99 @@
 import os
-import requests
-import time
-from dotenv import load_dotenv
-from llm_processor import process_tool_content
-
-CRAWLER_ENV_PATH = os.path.join(os.path.dirname(__file__), ".env")
-load_dotenv(CRAWLER_ENV_PATH)
-
-API_URL = os.getenv("CRAWLER_API_URL")
-if not API_URL:
-    API_URL = "http://localhost:3000/api/admin/tools/inject"
-
-API_KEY = os.getenv("API_SECRET_KEY")
+import re
+import asyncio
+import crawler_env  # noqa: F401
+from llm_async import process_tool_contents_async
+from llm_processor import check_config
+from dedup_index import DEDUP, refresh_tool_index
+from inject_writer import BatchWriter, TOOLS_BULK_API_URL
+from feed_fetcher import FEEDS, fetch_feed
+from metrics import METRICS
 
 # Simple GraphQL endpoint for ProductHunt. No auth token required for basic query (though they heavily rate limit without it, we'll spoof user-agent & stick to homepage lists).
 # If block occurs, we fallback to public RSS or a scraper. Usually their public frontend gql is accessible.
 PH_GQL_URL = "https://www.producthunt.com/frontend/graphql"
+PH_FEED_URL = os.getenv("PH_FEED_URL", "https://www.producthunt.com/feed")
+
+async def _analyze_products(candidates):
+    return await process_tool_contents_async([(desc, name) for name, _, desc in candidates])
+
+
+def _report(name, link, entry):
+    def on_result(_, result):
+        if result.get("success"):
+            print(f"✅ Auto-Sandboxed: {name} -> PENDING")
+            DEDUP.add(link, source="producthunt")
+            FEEDS.mark_seen(PH_FEED_URL, [entry])
+        else:
+            print(f"❌ Failed to sandbox {name}: {result.get('status')} {result.get('error')}")
+    return on_result
+
 
 def crawl_producthunt_ai():
     print("\n--- Starting Premium Source: ProductHunt AI Crawler ---")
+    refresh_tool_index()
     
     # We use a known public GQL query structure commonly open to anonymous traffic to get daily lists.
     # To be extremely safe from bot-blocking, we'll grab the standard PH RSS feed which includes top active products of the day.
     # PH Official RSS: https://www.producthunt.com/feed
     
-    import feedparser
-    feed = feedparser.parse("https://www.producthunt.com/feed")
-    
+    feed = fetch_feed(PH_FEED_URL)
+    if feed.status == "error":
+        print(f"ProductHunt RSS fetch failed: {feed.error}")
+        return
     if not feed.entries:
         print("Empty RSS from ProductHunt.")
         return
+    print(f"ProductHunt RSS: {feed.status}, {len(feed.new)} unseen entries")
         
     ai_entries = []
     # Keywords to filter AI products on PH
     keywords = ["ai", "gpt", "model", "llm", "deepseek", "claude", "generate", "agent"]
     
-    for entry in feed.entries:
+    skipped = []
+    for entry in feed.new:
         desc_lower = entry.get('description', '').lower()
         title_lower = entry.title.lower()
         
+        if DEDUP.contains(entry.link):
+            skipped.append(entry)
+            continue
         if any(kw in title_lower for kw in keywords) or any(kw in desc_lower for kw in keywords):
             ai_entries.append(entry)
+        else:
+            skipped.append(entry)
+    FEEDS.mark_seen(PH_FEED_URL, skipped)
             
     print(f"Found {len(ai_entries)} premium AI products on ProductHunt today.")
     
+    candidates = []
+    entries = []
     for entry in ai_entries[:5]: # Take top 5 to avoid API spamming
         name = entry.title.split("-")[0].strip() if "-" in entry.title else entry.title
         link = entry.link
         desc_raw = entry.get('description', 'A trending AI product from ProductHunt.')
-        
+
         print(f"Processing Premium Tool: {name} | {link}")
-        
+
         # We strip HTML from the description if present
-        import re
         clean_desc = re.sub('<[^<]+>', '', desc_raw).strip()
-        
-        # DeepSeek processes the english abstract
-        ai_info = process_tool_content(clean_desc, name)
-        
-        payload = {
-            **ai_info,
-            "url": link,
-            "region": "Global",
-            "categorySlug": "hot", # Let's throw PH into hot or let admin re-categorize in Sandbox
-        }
-        
-        headers = {"Authorization": f"Bearer {API_KEY}", "Content-Type": "application/json"}
-        try:
-            r = requests.post(API_URL, headers=headers, json=payload, timeout=15)
-            if r.status_code == 200:
-                print(f"✅ Auto-Sandboxed: {name} -> PENDING")
-            else:
-                print(f"❌ Failed to sandbox {name}: {r.status_code}")
-        except Exception as e:
-            print(f"❌ API Request failed: {e}")
-            
-        time.sleep(3)
+        candidates.append((name, link, clean_desc))
+        entries.append(entry)
+
+    # DeepSeek processes the english abstracts concurrently (paced by the shared rate limiter)
+    with METRICS.span("producthunt.analyze"):
+        ai_infos = asyncio.run(_analyze_products(candidates))
+
+    with BatchWriter(TOOLS_BULK_API_URL) as writer:
+        for (name, link, _), ai_info, entry in zip(candidates, ai_infos, entries):
+            payload = {
+                **ai_info,
+                "url": link,
+                "region": "Global",
+                "categorySlug": "hot", # Let's throw PH into hot or let admin re-categorize in Sandbox
+            }
+            writer.add(payload, on_result=_report(name, link, entry))
 
 if __name__ == "__main__":
+    check_config()
     crawl_producthunt_ai()
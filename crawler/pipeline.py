@@ -0,0 +1,119 @@
+import queue
+import threading
+import time
+from metrics import METRICS
+
+
+class Stage:
+    """
+    One pipeline step: `fn(item)` runs on `workers` threads and returns the
+    item for the next stage, or None to drop it. `queue_size` bounds the
+    inbox so a slow stage pushes back on the ones before it.
+    """
+
+    def __init__(self, name: str, fn, workers: int = 1, queue_size: int = 16):
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, workers)
+        self.inbox = queue.Queue(maxsize=max(1, queue_size))
+        self.threads = []
+        self.durations = []
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def record(self, elapsed: float, failed: bool = False):
+        with self._lock:
+            self.durations.append(elapsed)
+            if failed:
+                self.errors += 1
+
+    def summary(self) -> dict:
+        with self._lock:
+            xs = sorted(self.durations)
+        if not xs:
+            return {"count": 0, "errors": self.errors}
+
+        def _pct(p):
+            return round(xs[min(len(xs) - 1, int(p * len(xs)))], 3)
+
+        return {
+            "count": len(xs),
+            "errors": self.errors,
+            "workers": self.workers,
+            "p50_s": _pct(0.50),
+            "p95_s": _pct(0.95),
+            "busy_s": round(sum(xs), 3),
+        }
+
+
+class Pipeline:
+    """
+    Staged worker pipeline with bounded queues between stages.
+
+    Usage:
+        pipe = Pipeline([Stage("llm", f, 4), Stage("api", g, 2)]).start()
+        for item in items:
+            pipe.submit(item)  # blocks while the first stage is saturated
+        pipe.close()           # drains every stage in order
+    """
+
+    def __init__(self, stages: list[Stage], name: str = "pipeline"):
+        self.name = name
+        self.stages = stages
+        self.started_at = None
+        self.finished_at = None
+
+    def _worker(self, index: int):
+        stage = self.stages[index]
+        next_stage = self.stages[index + 1] if index + 1 < len(self.stages) else None
+        while True:
+            item = stage.inbox.get()
+            if item is None:
+                break
+            started = time.monotonic()
+            try:
+                result = stage.fn(item)
+            except Exception as e:
+                elapsed = time.monotonic() - started
+                stage.record(elapsed, failed=True)
+                METRICS.observe(f"{self.name}.{stage.name}", elapsed, failed=True)
+                print(f"[{self.name}:{stage.name}] Item dropped: {e}")
+                continue
+            elapsed = time.monotonic() - started
+            stage.record(elapsed)
+            METRICS.observe(f"{self.name}.{stage.name}", elapsed)
+            if result is not None and next_stage is not None:
+                next_stage.inbox.put(result)
+
+    def start(self) -> "Pipeline":
+        self.started_at = time.monotonic()
+        for i, stage in enumerate(self.stages):
+            for w in range(stage.workers):
+                t = threading.Thread(
+                    target=self._worker,
+                    args=(i,),
+                    name=f"{self.name}-{stage.name}-{w}",
+                    daemon=True,
+                )
+                t.start()
+                stage.threads.append(t)
+        return self
+
+    def submit(self, item):
+        self.stages[0].inbox.put(item)
+
+    def close(self):
+        # 逐级关闭: 上一级所有线程退出后, 才能保证它的产出都已进入下一级队列
+        for stage in self.stages:
+            for _ in stage.threads:
+                stage.inbox.put(None)
+            for t in stage.threads:
+                t.join()
+        self.finished_at = time.monotonic()
+
+    def summary(self) -> dict:
+        elapsed = (self.finished_at or time.monotonic()) - (self.started_at or time.monotonic())
+        return {
+            "elapsed_s": round(elapsed, 3),
+            "stages": {s.name: s.summary() for s in self.stages},
+        }
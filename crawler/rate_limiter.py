@@ -0,0 +1,94 @@
+import asyncio
+import os
+import random
+import threading
+import time
+import crawler_env  # noqa: F401
+
+# --- DeepSeek 配额 (进程内所有爬虫共享) ---
+LLM_RPM = float(os.getenv("LLM_RPM", "60"))
+LLM_TPM = float(os.getenv("LLM_TPM", "300000"))
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously at `rate_per_min`.
+    Usable from plain threads (`acquire`) and from asyncio (`acquire_async`).
+    """
+
+    def __init__(self, rate_per_min: float, capacity: float | None = None):
+        self.rate = rate_per_min / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_min
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _try_take(self, amount: float) -> float:
+        """Takes `amount` if available and returns 0, else returns seconds to wait."""
+        # 单次请求超过桶容量时按容量扣减, 否则永远等不到
+        amount = min(amount, self.capacity)
+        with self._lock:
+            self._refill()
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return 0.0
+            return (amount - self.tokens) / self.rate
+
+    def acquire(self, amount: float = 1):
+        while True:
+            wait = self._try_take(amount)
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self, amount: float = 1):
+        while True:
+            wait = self._try_take(amount)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    def charge(self, amount: float):
+        """Books usage discovered after the fact (may push the bucket into debt)."""
+        with self._lock:
+            self._refill()
+            self.tokens -= amount
+
+
+class LLMRateLimiter:
+    """Requests-per-minute and tokens-per-minute buckets applied together."""
+
+    def __init__(self, rpm: float = LLM_RPM, tpm: float = LLM_TPM):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+
+    def acquire(self, est_tokens: int):
+        self.requests.acquire(1)
+        self.tokens.acquire(est_tokens)
+
+    async def acquire_async(self, est_tokens: int):
+        await self.requests.acquire_async(1)
+        await self.tokens.acquire_async(est_tokens)
+
+    def settle(self, est_tokens: int, used_tokens: int | None):
+        if used_tokens is not None:
+            self.tokens.charge(used_tokens - est_tokens)
+
+
+def estimate_tokens(prompt: str, max_output: int = 2000) -> int:
+    # 中英混排粗略按 2 字符 / token 估算, 再加上预期输出
+    return len(prompt) // 2 + max_output
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 60.0) -> float:
+    """Full-jitter exponential backoff."""
+    return random.uniform(0, min(cap, base * (2**attempt)))
+
+
+# 进程级共享限流器
+LLM_LIMITER = LLMRateLimiter()
@@ -1,12 +1,32 @@
-import schedule
-import time
+import os
 import datetime
-from main import fetch_existing_urls, run_aigc_cn, run_izzi_cn
+from apscheduler.schedulers.blocking import BlockingScheduler
+from apscheduler.executors.pool import ThreadPoolExecutor
+from apscheduler.triggers.interval import IntervalTrigger
+import crawler_env  # noqa: F401
+from main import check_config, fetch_existing_urls, run_aigc_cn, run_izzi_cn
 from github_crawler import crawl_github_trending
 from news_crawler import crawl_news
 from ph_crawler import crawl_producthunt_ai
 from enrichment_crawler import run_enrichment_cycle
 from youtube_crawler import crawl_youtube
+from health_sweeper import run_health_sweep
+from job_runs import JOB_RUNS, job_lock
+from metrics import recorded_run, start_metrics_server
+from inject_writer import post_crawler_log
+
+# 同时运行的任务数, 长任务不会再阻塞短任务
+SCHEDULER_WORKERS = int(os.getenv("SCHEDULER_WORKERS", "4"))
+# 错过触发时间 (如机器休眠) 后仍允许补跑的宽限期
+SCHEDULER_MISFIRE_GRACE_MINUTES = float(os.getenv("SCHEDULER_MISFIRE_GRACE_MINUTES", "30"))
+# 每次触发的随机抖动, 避免多个任务同时打到同一批上游
+SCHEDULER_JITTER_MINUTES = float(os.getenv("SCHEDULER_JITTER_MINUTES", "5"))
+# 启动时到期的任务依次错开的间隔
+SCHEDULER_STARTUP_STAGGER_SECONDS = float(os.getenv("SCHEDULER_STARTUP_STAGGER_SECONDS", "60"))
+# 全量工具存活检查的间隔
+HEALTH_SWEEP_HOURS = float(os.getenv("HEALTH_SWEEP_HOURS", "12"))
+# Prometheus /metrics 端口 (0 = 不开启)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9464"))
 
 def job_main_tools_crawler():
     print(f"\n--- [{datetime.datetime.now()}] Running Main Tools Crawler ---")
@@ -46,33 +66,89 @@ def job_enrich_crawler():
         print(f"Enrichment crawler failed: {e}")
     print(f"--- Finished DB Enrichment Crawler ---")
 
+def job_health_sweep():
+    print(f"\n--- [{datetime.datetime.now()}] Running Tool Health Sweep ---")
+    run_health_sweep()
+    print(f"--- Finished Tool Health Sweep ---")
+
+# (job id, 函数, 间隔小时, 首次部署时是否立即运行)
+JOBS = [
+    ("main_tools", job_main_tools_crawler, 24, False),
+    ("producthunt", job_ph_crawler, 24, True),
+    ("github", job_github_crawler, 12, False),
+    ("youtube", job_youtube_crawler, 12, True),
+    ("health", job_health_sweep, HEALTH_SWEEP_HOURS, True),
+    ("enrichment", job_enrich_crawler, 6, True),
+    ("news", job_news_crawler, 4, True),
+]
+
+
+def tracked(job_id, fn):
+    """Wraps a job with the cross-process lock, last-run bookkeeping and a run summary."""
+    def run():
+        with job_lock(job_id) as acquired:
+            if not acquired:
+                print(f"[Scheduler] {job_id} is already running in another process, skipping.")
+                return
+            JOB_RUNS.started(job_id)
+            try:
+                with recorded_run(job_id, on_summary=post_crawler_log):
+                    fn()
+            except Exception as e:
+                JOB_RUNS.finished(job_id, "failed", str(e))
+                print(f"[Scheduler] {job_id} failed: {e}")
+                return
+            JOB_RUNS.finished(job_id, "ok")
+    return run
+
+
+def first_run_time(job_id, hours, run_on_first_start, now, stagger):
+    """Next due time from the persisted last start; overdue jobs run soon, staggered."""
+    last = JOB_RUNS.last_run(job_id)
+    if last is None or last["last_start"] is None:
+        if run_on_first_start:
+            return now + stagger
+        return now + datetime.timedelta(hours=hours)
+    due = datetime.datetime.fromtimestamp(last["last_start"]).astimezone() + datetime.timedelta(hours=hours)
+    return max(due, now + stagger)
+
+
+def build_scheduler():
+    scheduler = BlockingScheduler(
+        executors={"default": ThreadPoolExecutor(SCHEDULER_WORKERS)},
+        job_defaults={
+            "coalesce": True,  # 积压的多次触发只补跑一次
+            "max_instances": 1,  # 同一任务不重叠
+            "misfire_grace_time": int(SCHEDULER_MISFIRE_GRACE_MINUTES * 60),
+        },
+    )
+    now = datetime.datetime.now().astimezone()
+    overdue = 0
+    for job_id, fn, hours, run_on_first_start in JOBS:
+        stagger = datetime.timedelta(seconds=SCHEDULER_STARTUP_STAGGER_SECONDS * overdue)
+        next_run = first_run_time(job_id, hours, run_on_first_start, now, stagger)
+        if next_run <= now + stagger:
+            overdue += 1
+        scheduler.add_job(
+            tracked(job_id, fn),
+            IntervalTrigger(hours=hours, jitter=int(SCHEDULER_JITTER_MINUTES * 60)),
+            id=job_id,
+            name=fn.__name__,
+            next_run_time=next_run,
+        )
+        print(f"  {job_id}: every {hours}h, next run at {next_run:%Y-%m-%d %H:%M:%S}")
+    return scheduler
+
+
 if __name__ == "__main__":
+    check_config()
     print("AIGCPilot Autonomous Scheduler Started.")
-    print("1. Main tools crawler runs every 24 hours.")
-    print("2. ProductHunt AI crawler runs every 24 hours.")
-    print("3. GitHub trending crawler runs every 12 hours.")
-    print("4. Enrichment/Healer crawler runs every 6 hours.")
-    print("5. News crawler runs every 4 hours.")
-    print("6. YouTube Video News crawler runs every 12 hours.")
-    
-    # Setup intervals
-    schedule.every(24).hours.do(job_main_tools_crawler)
-    schedule.every(24).hours.do(job_ph_crawler)
-    schedule.every(12).hours.do(job_github_crawler)
-    schedule.every(12).hours.do(job_youtube_crawler)
-    schedule.every(6).hours.do(job_enrich_crawler)
-    schedule.every(4).hours.do(job_news_crawler)
-
-    # Immediately run news and premium on startup (optional but helpful for testing)
-    job_youtube_crawler()
-    job_news_crawler()
-    job_ph_crawler()
-    job_enrich_crawler()
+    if METRICS_PORT:
+        start_metrics_server(METRICS_PORT)
+    scheduler = build_scheduler()
 
     # Keep running forever
     try:
-        while True:
-            schedule.run_pending()
-            time.sleep(60) # check every minute
-    except KeyboardInterrupt:
+        scheduler.start()
+    except (KeyboardInterrupt, SystemExit):
         print("\nScheduler stopped.")
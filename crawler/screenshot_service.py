@@ -0,0 +1,114 @@
+import os
+import time
+from concurrent.futures import Future
+import crawler_env  # noqa: F401
+from browser_pool import get_pool
+from metrics import METRICS
+
+# 页面加载后额外等待渲染的时间
+SCREENSHOT_SETTLE_MS = int(os.getenv("SCREENSHOT_SETTLE_MS", "3000"))
+SCREENSHOT_GOTO_TIMEOUT_MS = int(os.getenv("SCREENSHOT_GOTO_TIMEOUT_MS", "60000"))
+# 整页截图的最大高度, 超长页面只截前面这一段
+SCREENSHOT_FULL_PAGE_MAX_HEIGHT = int(os.getenv("SCREENSHOT_FULL_PAGE_MAX_HEIGHT", "8000"))
+# 默认截首屏 (viewport), 设为 1 改为整页
+SCREENSHOT_FULL_PAGE = os.getenv("SCREENSHOT_FULL_PAGE", "0") == "1"
+
+
+class Shot:
+    """PNG bytes of one capture plus what the browser saw while taking it."""
+
+    def __init__(self, url, data=None, full_page=False, final_url=None, status=None,
+                 title=None, width=None, height=None, elapsed=0.0, error=None):
+        self.url = url
+        self.data = data
+        self.full_page = full_page
+        self.final_url = final_url
+        self.status = status
+        self.title = title
+        self.width = width
+        self.height = height
+        self.elapsed = elapsed
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return bool(self.data)
+
+    def meta(self) -> dict:
+        """Everything but the bytes, JSON-serialisable (for journals and payloads)."""
+        return {k: v for k, v in vars(self).items() if k != "data"}
+
+
+def _capture_page(page, url, full_page):
+    started = time.monotonic()
+    with METRICS.span("browser.goto"):
+        response = page.goto(url, timeout=SCREENSHOT_GOTO_TIMEOUT_MS, wait_until="networkidle")
+    # 额外等待渲染
+    page.wait_for_timeout(SCREENSHOT_SETTLE_MS)
+
+    viewport = page.viewport_size or {}
+    width, height = viewport.get("width"), viewport.get("height")
+    options = {"type": "png"}
+    if full_page:
+        options["full_page"] = True
+        height = page.evaluate("document.documentElement.scrollHeight")
+        if height > SCREENSHOT_FULL_PAGE_MAX_HEIGHT:
+            height = SCREENSHOT_FULL_PAGE_MAX_HEIGHT
+            options["clip"] = {"x": 0, "y": 0, "width": width, "height": height}
+    with METRICS.span("browser.screenshot"):
+        data = page.screenshot(**options)
+    return Shot(
+        url,
+        data,
+        full_page=full_page,
+        final_url=page.url,
+        status=response.status if response else None,
+        title=page.title(),
+        width=width,
+        height=height,
+        elapsed=round(time.monotonic() - started, 3),
+    )
+
+
+def _resolve(url, future: Future, started: float) -> Shot:
+    try:
+        shot = future.result()
+        print(f"  Screenshot taken in {time.monotonic() - started:.1f}s: {url}")
+    except Exception as e:
+        print(f"  Screenshot FAIL {url}: {e}")
+        shot = Shot(url, error=str(e), elapsed=round(time.monotonic() - started, 3))
+    # 包含等待浏览器槽位的时间
+    METRICS.observe("browser.capture", time.monotonic() - started, failed=not shot.ok)
+    return shot
+
+
+def submit(url, full_page=SCREENSHOT_FULL_PAGE) -> Future:
+    """Queues one capture on the warm browser pool; the future resolves to a Shot (never raises)."""
+    started = time.monotonic()
+    inner = get_pool().submit(_capture_page, url, full_page)
+    outer = Future()
+    # 取消外层 future 时, 还没轮到的截图任务也一并取消
+    outer.add_done_callback(lambda f: f.cancelled() and inner.cancel())
+
+    def _done(f):
+        if f.cancelled():
+            outer.cancel()
+        elif outer.set_running_or_notify_cancel():
+            outer.set_result(_resolve(url, f, started))
+
+    inner.add_done_callback(_done)
+    return outer
+
+
+def capture_many(urls, full_page=SCREENSHOT_FULL_PAGE) -> list[Shot]:
+    """
+    Captures every URL on the shared pool; all slots work in parallel on
+    their warm contexts. Results keep the input order.
+    """
+    futures = [submit(url, full_page) for url in urls]
+    return [f.result() for f in futures]
+
+
+def capture(url, full_page=SCREENSHOT_FULL_PAGE) -> Shot:
+    print(f"  Capturing screenshot for: {url}")
+    return capture_many([url], full_page)[0]
@@ -0,0 +1,184 @@
+import os
+import json
+import time
+import random
+import hashlib
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from duckduckgo_search import DDGS
+import crawler_env  # noqa: F401
+import state_db
+from metrics import METRICS
+
+# 同一查询在这段时间内直接用缓存结果
+SEARCH_CACHE_TTL_HOURS = float(os.getenv("SEARCH_CACHE_TTL_HOURS", "72"))
+SEARCH_CACHE_ENABLED = os.getenv("SEARCH_CACHE_ENABLED", "1") != "0"
+# DDG 对并发很敏感, 同时进行的搜索保持在个位数
+SEARCH_WORKERS = int(os.getenv("SEARCH_WORKERS", "3"))
+# 限流 / 超时后的重试: 等待 base * 2^n 秒 (带抖动)
+SEARCH_MAX_RETRIES = int(os.getenv("SEARCH_MAX_RETRIES", "4"))
+SEARCH_BACKOFF_SECONDS = float(os.getenv("SEARCH_BACKOFF_SECONDS", "2"))
+
+
+class SearchCache:
+    """Query -> DDG results, expiring after `ttl` seconds. Failed searches are never stored."""
+
+    def __init__(self, filename: str = "search_cache.sqlite", ttl: float = SEARCH_CACHE_TTL_HOURS * 3600,
+                 enabled: bool = SEARCH_CACHE_ENABLED):
+        self.ttl = ttl
+        self.enabled = enabled
+        self._filename = filename
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _db(self):
+        if self._conn is None:
+            self._conn = state_db.connect(self._filename)
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS searches (
+                    key TEXT PRIMARY KEY,
+                    query TEXT NOT NULL,
+                    results TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+        return self._conn
+
+    @staticmethod
+    def make_key(query: str, max_results: int) -> str:
+        raw = json.dumps([" ".join(query.lower().split()), max_results])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, query: str, max_results: int) -> list | None:
+        if not self.enabled:
+            return None
+        key = self.make_key(query, max_results)
+        with self._lock:
+            db = self._db()
+            row = db.execute("SELECT results, created_at FROM searches WHERE key = ?", (key,)).fetchone()
+            if row is not None and time.time() - row[1] > self.ttl:
+                db.execute("DELETE FROM searches WHERE key = ?", (key,))
+                row = None
+        return json.loads(row[0]) if row else None
+
+    def put(self, query: str, max_results: int, results: list):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._db().execute(
+                "INSERT OR REPLACE INTO searches (key, query, results, created_at) VALUES (?, ?, ?, ?)",
+                (self.make_key(query, max_results), query, json.dumps(results, ensure_ascii=False), time.time()),
+            )
+
+
+# 进程级共享
+SEARCHES = SearchCache()
+
+_executor = None
+# 查询键 -> (共享的执行 future, 各调用方拿到的 future)
+_in_flight = {}
+# 可重入: _release 持锁取消共享 future 时, _settle 会在同一线程里被回调
+_lock = threading.RLock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=SEARCH_WORKERS, thread_name_prefix="search")
+        return _executor
+
+
+def _search(query: str, max_results: int, cache: SearchCache) -> list:
+    for attempt in range(SEARCH_MAX_RETRIES + 1):
+        try:
+            with METRICS.span("search.ddg"):
+                results = list(DDGS().text(query, max_results=max_results) or [])
+        except Exception as e:
+            # RatelimitException / 超时都按同样的方式退避重试
+            if attempt == SEARCH_MAX_RETRIES:
+                METRICS.incr("search_queries", result="error")
+                print(f"  [Web Search] DDG search failed after {attempt + 1} tries ({query[:60]}): {e}")
+                return []
+            delay = SEARCH_BACKOFF_SECONDS * 2 ** attempt * random.uniform(0.75, 1.25)
+            print(f"  [Web Search] {type(e).__name__} for '{query[:60]}', retrying in {delay:.1f}s...")
+            time.sleep(delay)
+            continue
+        METRICS.incr("search_queries", result="miss")
+        cache.put(query, max_results, results)
+        return results
+
+
+def submit(query: str, max_results: int = 5, cache: SearchCache = SEARCHES) -> Future:
+    """
+    Queues one search on the shared executor; the future resolves to the list
+    of `{title, href, body}` results ([] when every retry failed, never raises).
+    Cache hits resolve immediately. Identical in-flight queries share one
+    search, but every caller gets its own future: cancelling it only drops
+    that caller, and the search itself is cancelled once nobody waits for it.
+    """
+    cached = cache.get(query, max_results)
+    if cached is not None:
+        METRICS.incr("search_queries", result="hit")
+        future = Future()
+        future.set_result(cached)
+        return future
+
+    key = cache.make_key(query, max_results)
+    executor = _get_executor()
+    future = Future()
+    with _lock:
+        entry = _in_flight.get(key)
+        shared = None
+        if entry is None:
+            shared = executor.submit(_search, query, max_results, cache)
+            entry = _in_flight[key] = (shared, [])
+        entry[1].append(future)
+    future.add_done_callback(lambda f: _release(key, f))
+    if shared is not None:
+        # 在锁外注册: 已完成的 future 会立即在当前线程回调
+        shared.add_done_callback(lambda f: _settle(key, f))
+    return future
+
+
+def _settle(key, shared):
+    with _lock:
+        entry = _in_flight.get(key)
+        if entry is None or entry[0] is not shared:
+            return
+        del _in_flight[key]
+        waiters = list(entry[1])
+    if shared.cancelled():
+        return
+    for future in waiters:
+        # 调用方已取消的跳过
+        if not future.set_running_or_notify_cancel():
+            continue
+        if shared.exception() is not None:
+            future.set_exception(shared.exception())
+        else:
+            future.set_result(shared.result())
+
+
+def _release(key, future):
+    if not future.cancelled():
+        return
+    with _lock:
+        entry = _in_flight.get(key)
+        if entry is None or future not in entry[1]:
+            return
+        entry[1].remove(future)
+        # 最后一个调用方也不要了, 还在排队的搜索就不再执行 (_settle 负责移除)
+        if not entry[1]:
+            entry[0].cancel()
+
+
+def search(query: str, max_results: int = 5) -> list:
+    return submit(query, max_results).result()
+
+
+def format_context(results: list) -> str:
+    """Search results as the markdown bullet list the prompts expect under external_context."""
+    return "".join(f"- [{res['title']}]({res['href']}): {res['body']}\n" for res in results)
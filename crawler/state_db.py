@@ -0,0 +1,23 @@
+import os
+import sqlite3
+import crawler_env  # noqa: F401
+
+# 爬虫本地状态 (缓存 / 索引 / 断点) 的存放目录
+STATE_DIR = os.getenv("CRAWLER_STATE_DIR") or os.path.join(os.path.dirname(__file__), ".state")
+
+
+def connect(filename: str) -> sqlite3.Connection:
+    """
+    Opens (and creates) a SQLite file under STATE_DIR. The connection may be
+    shared across threads; callers serialise access with their own lock.
+    """
+    os.makedirs(STATE_DIR, exist_ok=True)
+    conn = sqlite3.connect(
+        os.path.join(STATE_DIR, filename),
+        check_same_thread=False,
+        isolation_level=None,  # autocommit, 显式事务用 BEGIN
+        timeout=30,
+    )
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
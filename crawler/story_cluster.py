@@ -0,0 +1,155 @@
+import os
+import re
+import random
+import hashlib
+from collections import defaultdict
+from urllib.parse import urlsplit
+import crawler_env  # noqa: F401
+from dedup_index import normalize_url
+
+# 标题词集合的 Jaccard 相似度达到该值视为同一事件
+NEWS_CLUSTER_THRESHOLD = float(os.getenv("NEWS_CLUSTER_THRESHOLD", "0.5"))
+# 至少共享这么多个词才合并, 避免很短的标题误合并
+NEWS_CLUSTER_MIN_SHARED = int(os.getenv("NEWS_CLUSTER_MIN_SHARED", "3"))
+
+# 64 个哈希分成 32 段, 每段 2 行: 相似度 0.3 以上的标题几乎都会成为候选, 再用精确 Jaccard 复核
+MINHASH_PERMUTATIONS = 64
+LSH_BANDS = 32
+
+# 聚合站的条目链接只是讨论帖, 原文链接在正文里
+AGGREGATOR_HOSTS = {"reddit.com", "old.reddit.com", "redd.it", "news.ycombinator.com"}
+
+# 英文虚词和几乎每条 AI 新闻都有的词, 不参与相似度
+_STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "to", "in", "on", "for", "with", "by", "at", "from", "as",
+    "is", "are", "was", "be", "it", "its", "this", "that", "how", "why", "what", "you", "your",
+    "we", "our", "i", "my", "new", "now", "just", "ai", "news", "show", "hn", "ask", "s", "d",
+}
+_WORD_RE = re.compile(r"[a-z0-9]+|[\u4e00-\u9fff]+")
+# Reddit RSS 正文里指向原文的 "[link]" 锚点
+_REDDIT_LINK_RE = re.compile(r'<a href="([^"]+)">\s*\[link\]\s*</a>')
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(0x5EED)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(_PRIME)) for _ in range(MINHASH_PERMUTATIONS)]
+
+
+def title_tokens(title: str) -> frozenset:
+    """Content words of a title; CJK runs become character bigrams."""
+    tokens = set()
+    for token in _WORD_RE.findall((title or "").lower()):
+        if token[0] >= "\u4e00" and len(token) > 1:
+            tokens.update(token[i : i + 2] for i in range(len(token) - 1))
+        elif token not in _STOPWORDS:
+            tokens.add(token)
+    return frozenset(tokens)
+
+
+def minhash(tokens) -> tuple:
+    hashes = [int.from_bytes(hashlib.blake2b(t.encode("utf-8"), digest_size=8).digest(), "big") for t in tokens]
+    if not hashes:
+        return ()
+    return tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS)
+
+
+def _host(url: str | None) -> str:
+    host = (urlsplit(url or "").hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def canonical_links(entry) -> set:
+    """Normalized entry link, plus the linked article for aggregator posts (Reddit's `[link]`)."""
+    links = {normalize_url(entry.get("link"))}
+    if _host(entry.get("link")) in AGGREGATOR_HOSTS:
+        for href in _REDDIT_LINK_RE.findall(entry.get("summary", "") or entry.get("description", "")):
+            if _host(href) not in AGGREGATOR_HOSTS:
+                links.add(normalize_url(href))
+    links.discard(None)
+    return links
+
+
+class Story:
+    """Feed entries about the same event; the representative is the one that gets written up."""
+
+    def __init__(self, members):
+        self.members = list(members)  # [(feed_url, entry)], 按发现顺序
+        # 原站文章优先于聚合站讨论帖, 其次摘要更长的
+        self.feed_url, self.entry = max(
+            self.members,
+            key=lambda m: (_host(m[1].get("link")) not in AGGREGATOR_HOSTS, len(m[1].get("description", ""))),
+        )
+
+    @property
+    def siblings(self) -> list:
+        return [m for m in self.members if m[1] is not self.entry]
+
+    def context(self) -> str:
+        """Sibling coverage as external_context lines (same format as search_service.format_context)."""
+        seen = canonical_links(self.entry)
+        lines = []
+        for feed_url, entry in self.siblings:
+            links = canonical_links(entry)
+            if links & seen:
+                continue
+            seen |= links
+            lines.append(f"- [{entry.title}]({entry.link}): Same story, also reported via {_host(feed_url)}\n")
+        return "".join(lines)
+
+
+def _similar(a: frozenset, b: frozenset) -> bool:
+    shared = len(a & b)
+    return shared >= NEWS_CLUSTER_MIN_SHARED and shared / len(a | b) >= NEWS_CLUSTER_THRESHOLD
+
+
+def cluster_entries(items) -> list[Story]:
+    """
+    Groups `[(feed_url, entry)]` into stories: entries sharing a canonical link,
+    or whose titles are near-duplicates (MinHash/LSH candidates confirmed by
+    exact Jaccard), end up together. Stories covered by more feeds come first,
+    ties keep feed order.
+    """
+    items = list(items)
+    parent = list(range(len(items)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(i, j):
+        i, j = find(i), find(j)
+        if i != j:
+            parent[max(i, j)] = min(i, j)
+
+    by_link = {}
+    for i, (_, entry) in enumerate(items):
+        for link in canonical_links(entry):
+            if link in by_link:
+                union(i, by_link[link])
+            else:
+                by_link[link] = i
+
+    tokens = [title_tokens(entry.title) for _, entry in items]
+    rows = MINHASH_PERMUTATIONS // LSH_BANDS
+    buckets = defaultdict(list)
+    for i, sig in enumerate(map(minhash, tokens)):
+        if sig:
+            for band in range(LSH_BANDS):
+                buckets[(band, sig[band * rows : (band + 1) * rows])].append(i)
+    checked = set()
+    for bucket in buckets.values():
+        for x in range(len(bucket)):
+            for y in range(x + 1, len(bucket)):
+                pair = (bucket[x], bucket[y])
+                if pair in checked:
+                    continue
+                checked.add(pair)
+                if _similar(tokens[pair[0]], tokens[pair[1]]):
+                    union(*pair)
+
+    groups = defaultdict(list)
+    for i, item in enumerate(items):
+        groups[find(i)].append(item)
+    # 根节点是组内最早的条目, 同样大小时保持原顺序
+    return [Story(groups[root]) for root in sorted(groups, key=lambda r: (-len(groups[r]), r))]
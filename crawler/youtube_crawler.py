@@ -1,22 +1,19 @@
 import os
+import json
 import time
-import requests
-import feedparser
-from dotenv import load_dotenv
-from youtube_transcript_api import YouTubeTranscriptApi
-from llm_processor import process_youtube_transcript
-
-# Setup Env
-CRAWLER_ENV_PATH = os.path.join(os.path.dirname(__file__), ".env")
-load_dotenv(CRAWLER_ENV_PATH)
-
-API_URL = os.getenv("CRAWLER_API_URL")
-if API_URL:
-    NEWS_API_URL = API_URL.replace("/tools/inject", "/news/inject") # Reuse tool endpoint domain
-else:
-    NEWS_API_URL = "http://localhost:3000/api/admin/news/inject"
-
-API_KEY = os.getenv("API_SECRET_KEY")
+import asyncio
+import calendar
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from youtube_transcript_api import YouTubeTranscriptApi, RequestBlocked
+from youtube_transcript_api.proxies import GenericProxyConfig
+import crawler_env  # noqa: F401
+from llm_async import summarize_youtube_transcript_async
+from llm_processor import check_config
+from dedup_index import DEDUP
+from inject_writer import BatchWriter, NEWS_BULK_API_URL
+from feed_fetcher import FEEDS, fetch_feeds
+from metrics import METRICS
 
 # Proxy setup
 http_proxy = os.getenv("HTTP_PROXY") or os.getenv("http_proxy")
@@ -28,6 +25,15 @@ if http_proxy or https_proxy:
     if http_proxy: proxies["http"] = http_proxy
     if https_proxy: proxies["https"] = https_proxy
 
+# 字幕请求轮换使用的代理 (逗号分隔), 被 YouTube 封 IP 时切到下一个; 未配置时沿用 HTTP(S)_PROXY 或直连
+YOUTUBE_PROXIES = [p.strip() for p in os.getenv("YOUTUBE_PROXIES", "").split(",") if p.strip()]
+# 同时拉取字幕的线程数
+YOUTUBE_TRANSCRIPT_WORKERS = int(os.getenv("YOUTUBE_TRANSCRIPT_WORKERS", "4"))
+# 每个频道每轮最多处理的新视频数, 剩下的留到下一轮 (304 时仍会从缓存的 RSS 正文里取出)
+YOUTUBE_MAX_VIDEOS_PER_CHANNEL = int(os.getenv("YOUTUBE_MAX_VIDEOS_PER_CHANNEL", "5"))
+# 发布超过这个天数的视频不再补处理 (新加频道时不会把整个 RSS 都摘要一遍)
+YOUTUBE_BACKLOG_DAYS = float(os.getenv("YOUTUBE_BACKLOG_DAYS", "7"))
+
 # High signal AI channels (Example: Andrej Karpathy, Two Minute Papers, Yannic Kilcher, OpenAI, etc.)
 # You can find the channel_id by viewing the page source of a youtube channel and searching for "channel_id"
 YOUTUBE_CHANNELS = {
@@ -38,97 +44,214 @@ YOUTUBE_CHANNELS = {
     "Matthew Berman": "UCawZsQWqfGSbCI5yjkdVkTA"
 }
 
+
+def load_channels(path):
+    """
+    Channel list from a file: a JSON object {"name": "channel_id"}, or plain
+    text with one `channel_id name` per line (# starts a comment).
+    """
+    with open(path, encoding="utf-8") as f:
+        raw = f.read()
+    if raw.lstrip().startswith("{"):
+        return {str(name): str(cid) for name, cid in json.loads(raw).items()}
+    channels = {}
+    for line in raw.splitlines():
+        line = line.split("#", 1)[0].strip()
+        if not line:
+            continue
+        cid, _, name = line.partition(" ")
+        channels[name.strip() or cid] = cid
+    return channels
+
+
+if os.getenv("YOUTUBE_CHANNELS_FILE"):
+    YOUTUBE_CHANNELS = load_channels(os.getenv("YOUTUBE_CHANNELS_FILE"))
+
+
 def get_channel_rss(channel_id):
     return f"https://www.youtube.com/feeds/videos.xml?channel_id={channel_id}"
 
-def fetch_transcript(video_id):
+
+class ProxyRotator:
+    """
+    Transcript clients, one per configured proxy. Every worker uses the
+    current one; a blocked proxy moves everyone on to the next.
+    """
+
+    def __init__(self, proxy_urls):
+        self._proxies = list(proxy_urls) or [None]
+        self._clients = {}
+        self._index = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._proxies)
+
+    def current(self):
+        """(index, client) of the proxy in use."""
+        with self._lock:
+            index = self._index
+            if index not in self._clients:
+                url = self._proxies[index]
+                config = GenericProxyConfig(http_url=url, https_url=url) if url else None
+                self._clients[index] = YouTubeTranscriptApi(proxy_config=config)
+            return index, self._clients[index]
+
+    def rotate(self, blocked_index):
+        with self._lock:
+            # 多个线程同时被封时只轮换一次
+            if self._index == blocked_index:
+                self._index = (blocked_index + 1) % len(self._proxies)
+
+
+# 进程级共享
+TRANSCRIPT_PROXIES = ProxyRotator(YOUTUBE_PROXIES or [https_proxy or http_proxy])
+
+
+def _fetch_with(client, video_id):
+    # Tries to get english first, otherwise auto-generated english or chinese
+    transcript_list = client.list(video_id)
     try:
-        # Tries to get english first, otherwise auto-generated english or chinese
-        transcript_list = YouTubeTranscriptApi().list(video_id)
-        
+        transcript = transcript_list.find_transcript(['en', 'zh-CN', 'zh-TW', 'zh']).fetch()
+    except RequestBlocked:
+        raise
+    except Exception:
         try:
-            transcript = transcript_list.find_transcript(['en', 'zh-CN', 'zh-TW', 'zh']).fetch()
-        except Exception as transcript_err:
-            if "IpBlocked" in str(type(transcript_err)):
-                print(f"    [Block Error] YouTube IP ban detected. Please switch your proxy/VPN node: {transcript_err}")
-                return None
-            
-            try:
-                # Fallback to translation if it's just a language mismatch
-                transcript = transcript_list.find_transcript(['en']).translate('en').fetch()
-            except Exception as translate_err:
-                print(f"    [Transcript Error] No suitable subtitle track found or translatable: {translate_err}")
-                return None
-            
-        text = " ".join([getattr(t, 'text', '') for t in transcript])
-        return text
-    except Exception as e:
-        if "IpBlocked" in str(type(e)):
-            print(f"    [IP Blocked] YouTube has blocked your proxy IP. Switch VPN nodes. ({e})")
-        else:
+            # Fallback to translation if it's just a language mismatch
+            transcript = transcript_list.find_transcript(['en']).translate('en').fetch()
+        except RequestBlocked:
+            raise
+        except Exception as translate_err:
+            print(f"    [Transcript Error] No suitable subtitle track found or translatable: {translate_err}")
+            return None
+    # 保留时间戳, 长字幕按时间段切分摘要
+    return [(getattr(t, 'start', None), getattr(t, 'text', '')) for t in transcript]
+
+
+def fetch_transcript(video_id, rotator: ProxyRotator = TRANSCRIPT_PROXIES):
+    """
+    Caption lines as [(start_seconds, text)], or None when no usable track
+    exists. On IpBlocked the request is retried through the next proxy, once
+    per configured proxy.
+    """
+    for _ in range(len(rotator)):
+        index, client = rotator.current()
+        try:
+            with METRICS.span("youtube.transcript"):
+                return _fetch_with(client, video_id)
+        except RequestBlocked as e:
+            METRICS.incr("youtube_ip_blocked")
+            print(f"    [IP Blocked] YouTube blocked proxy #{index} for {video_id}, rotating. ({type(e).__name__})")
+            rotator.rotate(index)
+        except Exception as e:
             print(f"    [Transcript Error] Could not fetch subtitles for {video_id}: {e}")
-        return None
+            return None
+    print("    [IP Blocked] Every transcript proxy is blocked; add nodes to YOUTUBE_PROXIES.")
+    return None
+
+
+def _published_ts(entry):
+    parsed = entry.get("published_parsed") or entry.get("updated_parsed")
+    return calendar.timegm(parsed) if parsed else None
+
+
+def _new_videos(channel_name, feed):
+    """
+    Unseen entries of one channel feed worth processing this run, oldest
+    first (they are the ones about to drop out of the 15-entry RSS window).
+    Entries older than YOUTUBE_BACKLOG_DAYS or already published are marked
+    seen; anything beyond the per-channel cap waits for the next run.
+    """
+    if feed.status == "error":
+        print(f"  ❌ Error fetching channel {channel_name}: {feed.error}")
+        return []
+    cutoff = time.time() - YOUTUBE_BACKLOG_DAYS * 86400
+    fresh, skipped = [], []
+    for entry in feed.new:
+        published = _published_ts(entry)
+        if published is not None and published < cutoff:
+            skipped.append(entry)
+        elif DEDUP.contains(entry.link, "news"):
+            skipped.append(entry)
+        else:
+            fresh.append(entry)
+    FEEDS.mark_seen(feed.url, skipped)
+    fresh.sort(key=lambda e: _published_ts(e) or 0)
+    if len(fresh) > YOUTUBE_MAX_VIDEOS_PER_CHANNEL:
+        print(f"  > {channel_name}: {len(fresh) - YOUTUBE_MAX_VIDEOS_PER_CHANNEL} videos deferred to the next run.")
+        fresh = fresh[:YOUTUBE_MAX_VIDEOS_PER_CHANNEL]
+    return [(channel_name, feed.url, entry) for entry in fresh]
+
 
 def crawl_youtube():
     print("\n--- Starting YouTube AI News Crawler ---")
-    feedparser.USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-    
-    # Track to avoid hammering one API endpoint too fast
+
+    # 所有频道的 RSS 并发条件请求, 没有新视频的频道只花一个 304
+    feeds = fetch_feeds([get_channel_rss(cid) for cid in YOUTUBE_CHANNELS.values()], proxies=proxies)
+    videos = []
     for channel_name, channel_id in YOUTUBE_CHANNELS.items():
-        feed_url = get_channel_rss(channel_id)
-        print(f"\nFetching YouTube RSS: {channel_name} ({feed_url})")
-        
-        try:
-            headers = {"User-Agent": feedparser.USER_AGENT}
-            r = requests.get(feed_url, headers=headers, timeout=15, proxies=proxies)
-            r.raise_for_status()
-            
-            feed = feedparser.parse(r.text)
-            if not feed.entries:
-                print(f"  Empty RSS feed returned for {channel_name}")
-                continue
-
-            # Process only the most recent video to save LLM tokens and avoid duplicates
-            recent_entry = feed.entries[0]
-            video_title = recent_entry.title
-            video_link = recent_entry.link
-            video_id = recent_entry.yt_videoid
-            
-            print(f"  > Found latest video: {video_title} (ID: {video_id})")
-            
-            # Fetch transcript
-            print("  > Extracting subtitles...")
-            transcript_text = fetch_transcript(video_id)
-            
-            if not transcript_text:
-                print("  > No transcript available. Skipping.")
-                continue
-                
-            print(f"  > Transcript length: {len(transcript_text)} characters. Sending to DeepSeek...")
-            
-            # LLM Synthesis
-            llm_res = process_youtube_transcript(video_title, channel_name, video_link, transcript_text)
-            
-            # Inject to database
-            payload = {
-                "title": llm_res.get("title_zh", video_title),
-                "content": llm_res.get("content_zh", "Processing failed."),
-                "sourceUrl": video_link,
-                "status": "PUBLISHED"
-            }
-            
-            headers = {"Authorization": f"Bearer {API_KEY}", "Content-Type": "application/json"}
-            post_res = requests.post(NEWS_API_URL, headers=headers, json=payload, timeout=10)
-            
-            if post_res.status_code == 200:
-                print(f"  ✅ Successfully injected YouTube News: {payload['title']}")
-            else:
-                print(f"  ❌ Failed to inject news: {post_res.status_code}")
-                
-        except Exception as e:
-            print(f"  ❌ Error processing channel {channel_name}: {e}")
-            
-        time.sleep(5) # Delay between channels
+        videos.extend(_new_videos(channel_name, feeds[get_channel_rss(channel_id)]))
+    print(f"{len(videos)} new videos across {len(YOUTUBE_CHANNELS)} channels.")
+    if not videos:
+        return
+
+    # 字幕在线程池里拉取, 每拿到一条就开始摘要; DeepSeek 的并发由 llm_async 统一限制
+    with BatchWriter(NEWS_BULK_API_URL) as writer, ThreadPoolExecutor(max_workers=YOUTUBE_TRANSCRIPT_WORKERS) as pool:
+        asyncio.run(_crawl_videos(writer, pool, videos))
+
+
+async def _crawl_videos(writer, pool, videos):
+    await asyncio.gather(*(_crawl_video(writer, pool, *video) for video in videos))
+
+
+def _report(feed_url, entry):
+    def on_result(payload, result):
+        if result.get("success"):
+            print(f"  ✅ Successfully injected YouTube News: {payload['title']}")
+            DEDUP.add(payload["sourceUrl"], "news", source="youtube")
+            FEEDS.mark_seen(feed_url, [entry])
+        else:
+            print(f"  ❌ Failed to inject news: {result.get('status')} {result.get('error')}")
+    return on_result
+
+
+async def _crawl_video(writer, pool, channel_name, feed_url, entry):
+    video_title = entry.title
+    video_link = entry.link
+    video_id = entry.yt_videoid
+
+    try:
+        print(f"  > {channel_name}: {video_title} (ID: {video_id}), extracting subtitles...")
+        loop = asyncio.get_running_loop()
+        transcript = await loop.run_in_executor(pool, fetch_transcript, video_id)
+
+        if not transcript:
+            # 不记为已见: 字幕经常在发布几小时后才生成, 下一轮再试
+            print(f"  > No transcript available for {video_id}. Skipping.")
+            METRICS.incr("youtube_videos", result="no_transcript")
+            return
+
+        print(f"  > Transcript length: {sum(len(text) for _, text in transcript)} characters. Sending to DeepSeek...")
+
+        # LLM Synthesis: whole transcript, chunk notes first, then one article
+        with METRICS.span("youtube.summarize"):
+            llm_res = await summarize_youtube_transcript_async(video_title, channel_name, video_link, transcript)
+
+        # Inject to database
+        payload = {
+            "title": llm_res.get("title_zh", video_title),
+            "content": llm_res.get("content_zh", "Processing failed."),
+            "sourceUrl": video_link,
+            "status": "PUBLISHED"
+        }
+
+        # 凑满一批时 add 会同步 POST, 放到线程池里, 不阻塞其他视频的摘要
+        await loop.run_in_executor(pool, writer.add, payload, _report(feed_url, entry))
+
+    except Exception as e:
+        print(f"  ❌ Error processing video {video_id} from {channel_name}: {e}")
+
 
 if __name__ == "__main__":
+    check_config()
     crawl_youtube()
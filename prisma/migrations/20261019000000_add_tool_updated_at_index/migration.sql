@@ -0,0 +1,2 @@
+-- CreateIndex
+CREATE INDEX "Tool_updatedAt_id_idx" ON "Tool"("updatedAt", "id");
@@ -0,0 +1,35 @@
+import { NextResponse } from "next/server";
+import { injectNews, injectBulk, MAX_BULK_ITEMS } from "@/lib/inject";
+
+// Bulk variant of /api/admin/news/inject: { items: [...] } -> one transaction per item, per-item results
+export async function POST(req: Request) {
+  try {
+    const authHeader = req.headers.get("authorization");
+    const secretKey = process.env.API_SECRET_KEY;
+
+    if (!secretKey || authHeader !== `Bearer ${secretKey}`) {
+      return new NextResponse("Unauthorized", { status: 401 });
+    }
+
+    const body = await req.json();
+    const items = body?.items;
+
+    if (!Array.isArray(items) || items.length === 0) {
+      return new NextResponse("Missing required field (items)", { status: 400 });
+    }
+    if (items.length > MAX_BULK_ITEMS) {
+      return new NextResponse(`Too many items (max ${MAX_BULK_ITEMS})`, { status: 413 });
+    }
+
+    const results = await injectBulk(items, injectNews, (news) => ({
+      id: news.id,
+      sourceUrl: news.sourceUrl,
+    }));
+
+    return NextResponse.json({ success: true, results });
+
+  } catch (error: any) {
+    console.error("Bulk News Injection Error:", error);
+    return new NextResponse(error.message || "Internal Server Error", { status: 500 });
+  }
+}
@@ -0,0 +1,34 @@
+import { NextResponse } from "next/server";
+import { prisma } from "@/lib/prisma";
+
+// Run summaries posted by the Python scheduler: { status, message, details }
+export async function POST(req: Request) {
+  try {
+    const authHeader = req.headers.get("authorization");
+    const secretKey = process.env.API_SECRET_KEY;
+
+    if (!secretKey || authHeader !== `Bearer ${secretKey}`) {
+      return new NextResponse("Unauthorized", { status: 401 });
+    }
+
+    const { status, message, details } = await req.json();
+
+    if (!status || !message) {
+      return new NextResponse("Missing required fields (status, message)", { status: 400 });
+    }
+
+    // CrawlerLog only has a free-text message: keep the one-line summary first, the numbers as JSON after it
+    const log = await prisma.crawlerLog.create({
+      data: {
+        status: String(status),
+        message: details ? `${message}\n${JSON.stringify(details)}` : String(message),
+      }
+    });
+
+    return NextResponse.json({ success: true, id: log.id });
+
+  } catch (error: any) {
+    console.error("Crawler Log Error:", error);
+    return new NextResponse(error.message || "Internal Server Error", { status: 500 });
+  }
+}
@@ -47,7 +47,7 @@ export async function POST(req: Request) {
         // If timeout or 404/500, mark as OFFLINE
         await prisma.tool.update({
           where: { id: tool.id },
-          data: { status: "OFFLINE", updatedAt: new Date() }
+          data: { status: "OFFLINE", statusBeforeOffline: tool.status, updatedAt: new Date() }
         });
         results.offlineCount++;
         results.offlineTools.push(tool.title_zh);
@@ -1,5 +1,6 @@
 import { NextResponse } from "next/server";
 import { prisma } from "@/lib/prisma";
+import { InjectError, MAX_BULK_ITEMS, enrichTool, injectBulk } from "@/lib/inject";
 
 // GET: Fetch tools that need enrichment (e.g., missing deep curation fields or screenshots)
 export async function GET(req: Request) {
@@ -14,13 +15,37 @@ export async function GET(req: Request) {
     const { searchParams } = new URL(req.url);
     const limit = parseInt(searchParams.get("limit") || "5", 10);
 
-    // Prioritize tools that literally have no coreValue, or no screenshot, or are sitting in PENDING.
+    // Health sweeper: every live or OFFLINE tool, paged by id (cursor = last id of the previous page)
+    if (searchParams.get("mode") === "health") {
+      const cursor = searchParams.get("cursor");
+      const tools = await prisma.tool.findMany({
+        where: {
+          isDeleted: false,
+          status: { not: "REJECTED" },
+          ...(cursor ? { id: { gt: cursor } } : {}),
+        },
+        orderBy: { id: "asc" },
+        take: limit,
+        select: { id: true, url: true, status: true },
+      });
+      const last = tools[tools.length - 1];
+      return NextResponse.json({
+        success: true,
+        tools,
+        cursor: last ? last.id : cursor,
+        hasMore: tools.length === limit,
+      });
+    }
+
+    // Candidates that have no coreValue, screenshot or English review. The crawler ranks
+    // this pool itself (missing fields, staleness, popularity), so return the fields it scores on.
     const toolsToEnrich = await prisma.tool.findMany({
       where: {
         OR: [
           { screenshotUrl: null },
           { coreValue: null },
-          { useCases: null }
+          { useCases: null },
+          { content_en: null }
         ],
         // Do not enrich tools we've already marked as permanently dead/rejected
         status: {
@@ -37,11 +62,20 @@ export async function GET(req: Request) {
         summary_en: true,
         summary_zh: true,
         screenshotUrl: true,
+        coreValue: true,
+        useCases: true,
+        content_en: true,
+        isHot: true,
+        likesCount: true,
+        updatedAt: true,
         status: true
       }
     });
 
-    return NextResponse.json({ success: true, count: toolsToEnrich.length, tools: toolsToEnrich });
+    // The crawler only needs to know whether the review exists, not its full text
+    const tools = toolsToEnrich.map((t) => ({ ...t, content_en: Boolean(t.content_en) }));
+
+    return NextResponse.json({ success: true, count: tools.length, tools });
 
   } catch (error: any) {
     console.error("Enrichment Fetch Error:", error);
@@ -60,35 +94,32 @@ export async function PATCH(req: Request) {
     }
 
     const body = await req.json();
-    const { id, title_zh, title_en, summary_zh, summary_en, content_zh, content_en, coreValue, useCases, prosCons, screenshotUrl, status } = body;
 
-    if (!id) {
-       return new NextResponse("Missing Tool ID for enrichment", { status: 400 });
+    // Batch form used by the health sweeper: { items: [{ id, status }, ...] } -> per-item results
+    if (Array.isArray(body?.items)) {
+      if (body.items.length === 0) {
+        return new NextResponse("Missing required field (items)", { status: 400 });
+      }
+      if (body.items.length > MAX_BULK_ITEMS) {
+        return new NextResponse(`Too many items (max ${MAX_BULK_ITEMS})`, { status: 413 });
+      }
+      const results = await injectBulk(body.items, enrichTool, (tool: any) => ({
+        id: tool.id,
+        status: tool.status,
+      }));
+      return NextResponse.json({ success: true, results });
     }
 
-    // Only update fields that are strictly provided (except status checks below)
-    const updateData: any = {};
-    if (title_zh !== undefined) updateData.title_zh = title_zh;
-    if (title_en !== undefined) updateData.title_en = title_en;
-    if (summary_zh !== undefined) updateData.summary_zh = summary_zh;
-    if (summary_en !== undefined) updateData.summary_en = summary_en;
-    if (content_zh !== undefined) updateData.content_zh = content_zh;
-    if (content_en !== undefined) updateData.content_en = content_en;
-    if (coreValue !== undefined) updateData.coreValue = coreValue;
-    if (useCases !== undefined) updateData.useCases = useCases;
-    if (prosCons !== undefined) updateData.prosCons = prosCons;
-    if (screenshotUrl !== undefined) updateData.screenshotUrl = screenshotUrl;
-    
-    // If the crawler determined the site is completely dead
-    if (status === "OFFLINE") {
-        updateData.status = "OFFLINE";
+    let updatedTool;
+    try {
+      updatedTool = await enrichTool(prisma, body);
+    } catch (error) {
+      if (error instanceof InjectError) {
+        return new NextResponse(error.message, { status: error.status });
+      }
+      throw error;
     }
 
-    const updatedTool = await prisma.tool.update({
-      where: { id },
-      data: updateData
-    });
-
     return NextResponse.json({ success: true, tool: updatedTool });
 
   } catch (error: any) {
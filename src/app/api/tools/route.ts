@@ -7,6 +7,36 @@ export async function GET(request: NextRequest) {
   const categoryId = searchParams.get("categoryId");
   const hot = searchParams.get("hot") === "true";
   const urlsOnly = searchParams.get("urlsOnly") === "true";
+  const updatedSince = searchParams.get("updatedSince");
+
+  // Incremental sync for the crawler's local dedup index: pages of URLs
+  // ordered by (updatedAt, id), resumable from the returned cursor
+  // "<updatedAt ISO>|<id>". The id breaks ties, so pages keep advancing even
+  // when more than a page of tools share one timestamp. A bare ISO date
+  // (cursors saved before the id was added) starts at that instant.
+  if (urlsOnly && updatedSince !== null) {
+    const pageSize = 5000;
+    const [since, afterId] = updatedSince.split("|");
+    let where = {};
+    if (since && afterId) {
+      const at = new Date(since);
+      where = { OR: [{ updatedAt: { gt: at } }, { updatedAt: at, id: { gt: afterId } }] };
+    } else if (since) {
+      where = { updatedAt: { gte: new Date(since) } };
+    }
+    const tools = await prisma.tool.findMany({
+      where,
+      select: { id: true, url: true, updatedAt: true },
+      orderBy: [{ updatedAt: "asc" }, { id: "asc" }],
+      take: pageSize,
+    });
+    const last = tools[tools.length - 1];
+    return NextResponse.json({
+      urls: tools.map((t) => t.url),
+      cursor: last ? `${last.updatedAt.toISOString()}|${last.id}` : updatedSince || null,
+      hasMore: tools.length === pageSize,
+    });
+  }
 
   if (urlsOnly) {
     const tools = await prisma.tool.findMany({ select: { url: true } });
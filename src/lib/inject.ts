@@ -0,0 +1,235 @@
+import { Prisma } from "@prisma/client";
+import { prisma } from "@/lib/prisma";
+
+// Shared by the single and bulk crawler inject routes.
+
+type Db = typeof prisma | Prisma.TransactionClient;
+
+export class InjectError extends Error {
+  status: number;
+
+  constructor(message: string, status: number) {
+    super(message);
+    this.status = status;
+  }
+}
+
+export async function injectTool(db: Db, body: any) {
+  const {
+    title_zh,
+    title_en,
+    url,
+    summary_zh,
+    summary_en,
+    content_zh,
+    content_en,
+    coreValue,
+    useCases,
+    prosCons,
+    logo,
+    screenshotUrl,
+    videoUrl,
+    mediaVariants,
+    categorySlug,
+    aiScore // The n8n LLM node should provide a score between 1-10
+  } = body;
+
+  // Validate essential fields
+  if (!title_zh || !url || !categorySlug) {
+    throw new InjectError("Missing required fields (title, url, categorySlug)", 400);
+  }
+
+  const category = await db.category.findUnique({
+    where: { slug: categorySlug }
+  });
+
+  if (!category) {
+    throw new InjectError(`Category ${categorySlug} not found`, 404);
+  }
+
+  // Auto-curation logic based on AI score
+  // Force ALL incoming tools to PENDING so they act as a Draft Sandbox.
+  // The admin must manually review and change status to PUBLISHED.
+  const finalScore = aiScore ? parseFloat(aiScore) : 0;
+  const computedStatus = "PENDING";
+
+  // Media and long-form fields are optional; only overwrite them when the crawler sent them
+  const optional: Record<string, unknown> = {};
+  for (const [key, value] of Object.entries({ content_zh, content_en, logo, screenshotUrl, videoUrl })) {
+    if (value) optional[key] = value as string;
+  }
+  // WebP/AVIF variants and thumbnails, e.g. { logo: { thumb_webp: "...", ... }, screenshot: {...} }
+  if (mediaVariants && typeof mediaVariants === "object") {
+    optional.mediaVariants = mediaVariants;
+  }
+
+  const tool = await db.tool.upsert({
+    where: { url },
+    update: {
+      title_zh,
+      title_en: title_en || title_zh, // Fallback
+      summary_zh,
+      summary_en,
+      coreValue,
+      useCases,
+      prosCons,
+      ...optional,
+      status: computedStatus,
+    },
+    create: {
+      url,
+      title_zh,
+      title_en: title_en || title_zh,
+      summary_zh,
+      summary_en,
+      coreValue,
+      useCases,
+      prosCons,
+      ...optional,
+      categoryId: category.id,
+      status: computedStatus,
+      rate: finalScore > 0 ? (finalScore / 2) : 5.0 // Translate 10-point scale to 5-star optionally
+    }
+  });
+
+  return { status: computedStatus, tool };
+}
+
+export async function injectNews(db: Db, body: any) {
+  const {
+    title,
+    content,
+    sourceUrl,
+    relatedToolUrls, // Array of URLs to link to existing tools
+    status = "PUBLISHED"
+  } = body;
+
+  if (!title) {
+    throw new InjectError("Missing required field (title)", 400);
+  }
+
+  // Attempt to link to existing tools if URLs are provided by the LLM
+  const connectTools = [];
+  if (relatedToolUrls && Array.isArray(relatedToolUrls)) {
+    for (const url of relatedToolUrls) {
+      const tool = await db.tool.findUnique({ where: { url } });
+      if (tool) {
+        connectTools.push({ id: tool.id });
+      }
+    }
+  }
+
+  const newsData: any = {
+    title,
+    content,
+    sourceUrl,
+    status
+  };
+
+  if (connectTools.length > 0) {
+    newsData.relatedTools = { connect: connectTools };
+  }
+
+  return db.news.create({
+    data: newsData,
+    include: {
+      relatedTools: { select: { id: true, title_zh: true } }
+    }
+  });
+}
+
+export const MAX_BULK_ITEMS = 100;
+
+// Status reported for a Prisma error on one bulk item
+function knownErrorStatus(error: Prisma.PrismaClientKnownRequestError) {
+  switch (error.code) {
+    case "P2002": // unique constraint, e.g. two requests racing on the same url
+      return 409;
+    case "P2025": // record to update not found
+      return 404;
+    case "P2000": // value too long for the column
+    case "P2003": // foreign key
+    case "P2006":
+    case "P2011":
+      return 400;
+    default:
+      return 500;
+  }
+}
+
+// Runs `inject` for every item, each in its own transaction, so one bad row
+// (unique race, too-long field, dropped connection) fails only that item and
+// the others are still written. Every item gets a result with its index.
+export async function injectBulk<T>(
+  items: any[],
+  inject: (tx: Prisma.TransactionClient, item: any) => Promise<T>,
+  describe: (result: T) => Record<string, unknown>
+) {
+  const results = [];
+  for (const [index, item] of items.entries()) {
+    try {
+      const result = await prisma.$transaction((tx) => inject(tx, item), { timeout: 20000 });
+      results.push({ index, success: true, ...describe(result) });
+    } catch (error: any) {
+      if (error instanceof InjectError) {
+        results.push({ index, success: false, status: error.status, error: error.message });
+      } else if (error instanceof Prisma.PrismaClientKnownRequestError) {
+        console.error(`Bulk item ${index} failed (${error.code}):`, error.message);
+        results.push({ index, success: false, status: knownErrorStatus(error), error: error.message, code: error.code });
+      } else {
+        console.error(`Bulk item ${index} failed:`, error);
+        results.push({ index, success: false, status: 500, error: error?.message || "Internal Server Error" });
+      }
+    }
+  }
+  return results;
+}
+
+const ENRICH_FIELDS = [
+  "title_zh",
+  "title_en",
+  "summary_zh",
+  "summary_en",
+  "content_zh",
+  "content_en",
+  "coreValue",
+  "useCases",
+  "prosCons",
+  "screenshotUrl",
+] as const;
+
+// Applies one enrichment / health patch from the crawler. Only provided fields
+// are written. status "OFFLINE" takes a dead site down and remembers the status
+// it had; "ONLINE" restores that status for a tool that was OFFLINE, so a
+// PENDING draft comes back as PENDING and still needs admin review. Tools
+// taken offline before the status was recorded come back as PENDING.
+export async function enrichTool(db: Db, body: any) {
+  const { id, status } = body;
+
+  if (!id) {
+    throw new InjectError("Missing Tool ID for enrichment", 400);
+  }
+
+  const current = await db.tool.findUnique({
+    where: { id },
+    select: { status: true, statusBeforeOffline: true },
+  });
+  if (!current) {
+    throw new InjectError(`Tool ${id} not found`, 404);
+  }
+
+  const updateData: any = {};
+  for (const field of ENRICH_FIELDS) {
+    if (body[field] !== undefined) updateData[field] = body[field];
+  }
+  if (status === "OFFLINE" && current.status !== "OFFLINE") {
+    updateData.status = "OFFLINE";
+    updateData.statusBeforeOffline = current.status;
+  }
+  if (status === "ONLINE" && current.status === "OFFLINE") {
+    updateData.status = current.statusBeforeOffline || "PENDING";
+    updateData.statusBeforeOffline = null;
+  }
+
+  return db.tool.update({ where: { id }, data: updateData });
+}